@@ -0,0 +1,150 @@
+# OPT:: levels as in Holm-de Lichtenberg-Thorup would bound the replacement search, but the smaller side search is enough for the sim
+
+class DynamicConnectivity:
+    """ Connectivity of an undirected graph under edge/node insertions and deletions
+        * keeps a spanning forest (tree edges) plus the rest of edges (non tree), and a component label per node
+        * deleting a non tree edge is O(1), deleting a tree edge searches the smaller side for a replacement edge
+        * the smaller side is found with an interleaved BFS from both endpoints, and relabeled on split (small to large)
+        * the replacement search is a linear scan of the non tree edges of the smaller side, so not the amortized polylog bound of HDT
+    """
+
+    def __init__(self):
+        self.tree     : dict[int, set[int]] = dict()
+        self.non_tree : dict[int, set[int]] = dict()
+        self.label    : dict[int, int]      = dict()
+        self.members  : dict[int, set[int]] = dict()
+        self._next_label = 0
+
+    @classmethod
+    def from_graph(cls, nodes, edges) -> "DynamicConnectivity":
+        dc = cls()
+        for n in nodes:
+            dc.add_node(n)
+        for u,v in edges:
+            dc.add_edge(u,v)
+        return dc
+
+    def num_components(self) -> int:
+        return len(self.members)
+
+    def connected(self, u:int, v:int) -> bool:
+        return self.label[u] == self.label[v]
+
+    def has_node(self, n:int) -> bool:
+        return n in self.label
+
+    def has_edge(self, u:int, v:int) -> bool:
+        return u in self.tree and (v in self.tree[u] or v in self.non_tree[u])
+
+    #-------------------------------------------------------------------
+
+    def add_node(self, n:int):
+        if n in self.label:
+            return
+        self.tree[n] = set()
+        self.non_tree[n] = set()
+        self.label[n] = self._next_label
+        self.members[self._next_label] = { n }
+        self._next_label += 1
+
+    def add_edge(self, u:int, v:int):
+        """ Adding edges creates the nodes too (same as networkx) """
+        self.add_node(u)
+        self.add_node(v)
+        if self.has_edge(u,v) or u == v:
+            return
+
+        lu, lv = self.label[u], self.label[v]
+        if lu == lv:
+            self.non_tree[u].add(v)
+            self.non_tree[v].add(u)
+            return
+
+        # join the components, relabel the smaller one
+        self.tree[u].add(v)
+        self.tree[v].add(u)
+        if len(self.members[lu]) < len(self.members[lv]):
+            lu, lv = lv, lu
+        small = self.members.pop(lv)
+        for n in small:
+            self.label[n] = lu
+        self.members[lu] |= small
+
+    def remove_edge(self, u:int, v:int) -> bool:
+        """ Remove the edge (ignored when missing), returns True when the component got split """
+        if not self.has_edge(u,v):
+            return False
+
+        if v in self.non_tree[u]:
+            self.non_tree[u].discard(v)
+            self.non_tree[v].discard(u)
+            return False
+
+        self.tree[u].discard(v)
+        self.tree[v].discard(u)
+        side = self._smaller_side(u, v)
+
+        # any non tree edge leaving the smaller side reconnects both trees
+        for x in side:
+            for y in self.non_tree[x]:
+                if y not in side:
+                    self.non_tree[x].discard(y)
+                    self.non_tree[y].discard(x)
+                    self.tree[x].add(y)
+                    self.tree[y].add(x)
+                    return False
+
+        # split: the smaller side gets a new label
+        lbl = self.label[u]
+        self.members[lbl] -= side
+        new = self._next_label
+        self._next_label += 1
+        self.members[new] = side
+        for n in side:
+            self.label[n] = new
+        return True
+
+    def remove_node(self, n:int) -> bool:
+        """ Remove the node and its edges, returns True when the rest of its component got split (more than one non empty remainder)
+            * removing an isolated or a leaf node is not a split, even if detaching its edges splits the node itself
+        """
+        if n not in self.label:
+            return False
+
+        neighs = self.tree[n] | self.non_tree[n]
+        for m in list(self.non_tree[n]):
+            self.remove_edge(n, m)
+        for m in list(self.tree[n]):
+            self.remove_edge(n, m)
+
+        # now isolated, the remainders are the components of its previous neighbours
+        lbl = self.label.pop(n)
+        self.members.pop(lbl)
+        del self.tree[n]
+        del self.non_tree[n]
+        return len({ self.label[m] for m in neighs }) > 1
+
+    #-------------------------------------------------------------------
+
+    def _smaller_side(self, u:int, v:int) -> set[int]:
+        """ Interleaved BFS over the tree edges from both endpoints, returns the nodes of the first one exhausted """
+        seen_u, seen_v = { u }, { v }
+        queue_u, queue_v = [ u ], [ v ]
+        iu = iv = 0
+        while True:
+            if iu == len(queue_u): return seen_u
+            if iv == len(queue_v): return seen_v
+
+            x = queue_u[iu]
+            iu += 1
+            for y in self.tree[x]:
+                if y not in seen_u:
+                    seen_u.add(y)
+                    queue_u.append(y)
+
+            x = queue_v[iv]
+            iv += 1
+            for y in self.tree[x]:
+                if y not in seen_v:
+                    seen_v.add(y)
+                    queue_v.append(y)
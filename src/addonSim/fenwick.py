@@ -0,0 +1,111 @@
+import numpy as np
+
+class FenwickSampler:
+    """ Weighted sampling with point updates using a Fenwick (binary indexed) tree: O(log n) update and pick
+        * weights are kept too, so zero weight items are never returned even with some float drift
+        * after many point updates the tree is rebuilt from the weights to discard the accumulated float error
+    """
+
+    def __init__(self, size:int):
+        self.size = size
+        self.weights = np.zeros(size, dtype=np.float64)
+        # 1-based tree, tree[i] covers the range (i - lowbit(i), i]
+        self.tree = np.zeros(size+1, dtype=np.float64)
+        self.updates = 0
+
+        # highest power of two <= size, start of the binary descent
+        self._bit = 1 << (size.bit_length()-1) if size else 0
+
+    def rebuild(self, weights:np.ndarray = None):
+        """ Rebuild the whole tree in O(n), optionally with new weights """
+        if weights is not None:
+            self.weights[:] = weights
+        i = np.arange(1, self.size+1)
+        cs = np.concatenate(([0.0], np.cumsum(self.weights)))
+        self.tree[1:] = cs[i] - cs[i - (i & -i)]
+        self.updates = 0
+
+    def update(self, idx:int, w:float):
+        """ Set a single weight """
+        delta = w - self.weights[idx]
+        if not delta:
+            return
+        self.weights[idx] = w
+        i = idx+1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+        self.updates += 1
+        if self.updates > self.size:
+            self.rebuild()
+
+    def update_many(self, ids:np.ndarray, w:np.ndarray):
+        """ Set several weights, rebuilding instead when it is cheaper """
+        if len(ids) * max(self._bit.bit_length(), 1) > self.size:
+            self.weights[ids] = w
+            self.rebuild()
+        else:
+            for idx, wi in zip(ids.tolist(), w.tolist()):
+                self.update(idx, wi)
+
+    def total(self) -> float:
+        s, i = 0.0, self.size
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    #-------------------------------------------------------------------
+
+    def find(self, target:float) -> int:
+        """ Smallest index whose inclusive prefix sum is greater than target """
+        pos, bit = 0, self._bit
+        t = target
+        while bit:
+            nxt = pos + bit
+            if nxt <= self.size and self.tree[nxt] <= t:
+                t -= self.tree[nxt]
+                pos = nxt
+            bit >>= 1
+
+        # float drift could land on an empty item (or past the end)
+        if pos >= self.size or self.weights[pos] <= 0:
+            pos = self._find_linear(np.array([target]))[0]
+        return pos
+
+    def _find_linear(self, targets:np.ndarray) -> np.ndarray:
+        cw = np.cumsum(self.weights)
+        pos = np.searchsorted(cw, np.minimum(targets, cw[-1]), side="right")
+        # skip trailing empty items
+        return np.minimum(pos, np.flatnonzero(self.weights > 0)[-1])
+
+    def sample(self, u:float) -> int:
+        """ Pick an index given a uniform random number in [0,1), -1 when all weights are zero """
+        total = self.total()
+        if not total > 0:
+            return -1
+        return self.find(u * total)
+
+    def sample_many(self, u:np.ndarray) -> np.ndarray:
+        """ Vectorized sample: the binary descent runs for all the targets at once """
+        total = self.total()
+        if not total > 0:
+            return None
+
+        t = u * total
+        pos = np.zeros(len(t), dtype=np.int64)
+        bit = self._bit
+        while bit:
+            nxt = pos + bit
+            val = self.tree[np.minimum(nxt, self.size)]
+            take = (nxt <= self.size) & (val <= t)
+            t = np.where(take, t - val, t)
+            pos = np.where(take, nxt, pos)
+            bit >>= 1
+
+        bad = (pos >= self.size)
+        bad[~bad] = self.weights[pos[~bad]] <= 0
+        if bad.any():
+            pos[bad] = self._find_linear(u[bad] * total)
+        return pos
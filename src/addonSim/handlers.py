@@ -127,6 +127,18 @@ def callback_loadFile(scene=None):
 callback_loadFile_actions = Actions()
 """ Function actions to be called on callback undo: c(scene, fileName) """
 
+@persistent
+def callback_saveFile(scene=None):
+    """ Post saved the file """
+    name = bpy.data.filepath
+    DEV.log_msg(f"callback_saveFile: {name}", {"CALLBACK", "SAVE"})
+
+    global callback_saveFile_actions
+    callback_saveFile_actions.dispatch([scene, name])
+
+callback_saveFile_actions = Actions()
+""" Function actions to be called on callback save: c(scene, fileName) """
+
 
 #-------------------------------------------------------------------
 # Blender events
@@ -137,6 +149,7 @@ def register():
     if DEV.CALLBACK_REGISTER_ALL: registerAllHandlers()
 
     bpy.app.handlers.load_post.append(callback_loadFile)
+    bpy.app.handlers.save_post.append(callback_saveFile)
     bpy.app.handlers.depsgraph_update_post.append(callback_updatePost)
     bpy.app.handlers.undo_post.append(callback_undo)
     bpy.app.handlers.redo_post.append(callback_redo)
@@ -146,6 +159,7 @@ def unregister():
     if DEV.CALLBACK_REGISTER_ALL: unregisterAllHandlers()
 
     bpy.app.handlers.load_post.remove(callback_loadFile)
+    bpy.app.handlers.save_post.remove(callback_saveFile)
     bpy.app.handlers.depsgraph_update_post.remove(callback_updatePost)
     bpy.app.handlers.undo_post.remove(callback_undo)
     bpy.app.handlers.redo_post.remove(callback_redo)
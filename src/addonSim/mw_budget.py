@@ -0,0 +1,97 @@
+from time import time
+
+from .mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM
+
+
+# Budgeted sim runs: simulate for T seconds or until K links broken / X% cells AIR instead of a fixed infiltrations count
+# the infiltrations run in chunks sized from the measured throughput, so the goal is checked (and the UI refreshed) at a steady pace
+# NOTE:: free of bpy, the sim is duck typed (links.storage.ids_perState, cont.cells_perState and cont.foundId)
+#-------------------------------------------------------------------
+
+class SIM_BUDGET_ENUM:
+    """ What ends a budgeted run, COUNT is the plain step_infiltrations run """
+    COUNT = "COUNT"
+    TIME = "TIME"
+    LINKS = "LINKS"
+    AIR = "AIR"
+
+    all = { COUNT, TIME, LINKS, AIR }
+
+class SimBudget:
+    """ Goal of a run plus the throughput estimation used to size the chunks
+        * the time limit also caps the LINKS/AIR goals, so an unreachable goal still returns (-1 to disable it there)
+    """
+
+    chunk_first = 8
+    chunk_max = 10000
+    chunk_growth = 4
+    rate_smooth = 0.5
+
+    def __init__(self, mode: str, limit: float, time_max: float = -1, slice_s: float = 0.05):
+        if mode not in SIM_BUDGET_ENUM.all:
+            raise ValueError(f"unknown budget mode: {mode}")
+        self.mode = mode
+        self.limit = limit
+        self.time_max = limit if mode == SIM_BUDGET_ENUM.TIME else time_max
+        self.slice_s = slice_s
+        self.start()
+
+    def start(self, sim = None):
+        """ Reset the progress, the links goal is relative to the links already broken when starting """
+        self.time_start = time()
+        self.done = 0
+        self.chunk = 0
+        self.rate = 0.0
+        self.links_start = self.get_links(sim) if sim else 0
+
+    #-------------------------------------------------------------------
+
+    def get_links(self, sim) -> int:
+        return len(sim.links.storage.ids_perState[LINK_STATE_ENUM.AIR])
+
+    def get_air(self, sim) -> float:
+        return len(sim.cont.cells_perState[CELL_STATE_ENUM.AIR]) / max(len(sim.cont.foundId), 1) * 100
+
+    def get_elapsed(self) -> float:
+        return time() - self.time_start
+
+    def get_progress(self, sim) -> float:
+        """ Fraction of the goal reached, or of the time limit when larger """
+        p = 0.0
+        if self.time_max > 0:       p = self.get_elapsed() / self.time_max
+        if self.mode == SIM_BUDGET_ENUM.COUNT:   p = max(p, self.done / max(self.limit, 1))
+        elif self.mode == SIM_BUDGET_ENUM.LINKS: p = max(p, (self.get_links(sim) - self.links_start) / max(self.limit, 1))
+        elif self.mode == SIM_BUDGET_ENUM.AIR:   p = max(p, self.get_air(sim) / max(self.limit, 1e-6))
+        return min(p, 1.0)
+
+    def reached(self, sim) -> bool:
+        return self.get_progress(sim) >= 1.0
+
+    #-------------------------------------------------------------------
+
+    def next_chunk(self) -> int:
+        """ Infiltrations that fit in a slice at the measured rate, the growth is limited to absorb timing noise """
+        if self.rate <= 0:
+            n = self.chunk_first
+        else:
+            n = int(self.rate * self.slice_s)
+            n = min(n, self.chunk * self.chunk_growth)
+
+        # avoid overshooting the remaining time / count
+        if self.time_max > 0 and self.rate > 0:
+            n = min(n, int(self.rate * (self.time_max - self.get_elapsed())) + 1)
+        if self.mode == SIM_BUDGET_ENUM.COUNT:
+            n = min(n, int(self.limit) - self.done)
+
+        self.chunk = max(1, min(n, self.chunk_max))
+        return self.chunk
+
+    def update(self, done: int, dt: float):
+        """ Smoothed steps per second from the last chunk """
+        self.done += done
+        if done and dt > 0:
+            r = done / dt
+            self.rate = r if self.rate <= 0 else self.rate * (1-self.rate_smooth) + r * self.rate_smooth
+
+    def get_log_ui(self, sim) -> str:
+        return f"{self.mode} {self.get_progress(sim)*100:.0f}% : {self.done} infiltrations, {self.rate:.1f} steps/s (chunk {self.chunk})"
@@ -0,0 +1,180 @@
+import bpy
+import bpy.types as types
+import numpy as np
+import os
+
+from .preferences import getPrefs
+from .properties_global import MW_global_storage
+
+from .mw_cont import MW_Cont
+from .mw_links import MW_Links, LinkStorage
+from .mw_sim import MW_Sim
+from .mw_rng import SimRNG
+from .mw_state import CELL_ERROR_ENUM
+
+from . import utils_scene
+from .utils_dev import DEV
+from .stats import getStats
+
+
+# Compressed checkpoints of the fracture and sim state, stored next to the .blend as a .npz bundle
+# loading skips voro++, the cont precalculations and the links construction, the cells objects are queried from the scene by id
+#-------------------------------------------------------------------
+
+CHECKPOINT_VERSION = 2
+
+def get_path(root: types.Object, ext = "mw.npz") -> str|None:
+    """ Next to the .blend file using the root name, None when the file is not saved yet """
+    if not bpy.data.filepath:
+        return None
+    base = os.path.splitext(bpy.data.filepath)[0]
+    return f"{base}.{bpy.path.clean_name(root.name)}.{ext}"
+
+#-------------------------------------------------------------------
+# ragged lists as flat values + offsets, error placeholders (cont missing cells) are kept in a separate fill array
+
+def pack_rows(rows: list[list|int], width = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    fill = np.array([ r if isinstance(r, int) else 0 for r in rows ], dtype=np.int64)
+    lens = [ 0 if isinstance(r, int) else len(r) for r in rows ]
+    offsets = np.zeros(len(rows)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lens)
+    values = [ v for r in rows if not isinstance(r, int) for v in r ]
+    values = np.array(values, dtype=np.int64).reshape((-1, width) if width > 1 else (-1,))
+    return values, offsets, fill
+
+def unpack_rows(values: np.ndarray, offsets: np.ndarray, fill: np.ndarray, rowType = list) -> list[list|int]:
+    values, offsets, fill = values.tolist(), offsets.tolist(), fill.tolist()
+    if values and isinstance(values[0], list):
+        values = [ tuple(v) for v in values ]
+    return [ fill[i] if fill[i] != 0 else rowType(values[offsets[i]:offsets[i+1]]) for i in range(len(fill)) ]
+
+def pack_rows_nested(rows: list[list[list]|int]) -> dict[str, np.ndarray]:
+    """ Two levels, e.g. the faces neighbours per face per cell """
+    outer = [ r if isinstance(r, int) else list(range(len(r))) for r in rows ]
+    inner = [ list(face) for r in rows if not isinstance(r, int) for face in r ]
+    _, o_offsets, o_fill = pack_rows(outer)
+    i_values, i_offsets, _ = pack_rows(inner)
+    return { "offsets": o_offsets, "fill": o_fill, "inner_values": i_values, "inner_offsets": i_offsets }
+
+def unpack_rows_nested(d: dict[str, np.ndarray], rowType = list) -> list[list[list]|int]:
+    inner = unpack_rows(d["inner_values"], d["inner_offsets"], np.zeros(len(d["inner_offsets"])-1, dtype=np.int64), rowType)
+    offsets, fill = d["offsets"].tolist(), d["fill"].tolist()
+    return [ fill[i] if fill[i] != 0 else inner[offsets[i]:offsets[i+1]] for i in range(len(fill)) ]
+
+rows_names        = ("values", "offsets", "fill")
+rows_nested_names = ("offsets", "fill", "inner_values", "inner_offsets")
+
+def add_prefixed(data: dict, prefix: str, values: dict|tuple):
+    if isinstance(values, tuple): values = dict(zip(rows_names, values))
+    for k,v in values.items():
+        data[f"{prefix}_{k}"] = v
+
+def get_prefixed(data: dict, prefix: str, names = rows_names) -> dict:
+    return { k: data[f"{prefix}_{k}"] for k in names }
+
+#-------------------------------------------------------------------
+
+def save(fract, path: str):
+    """ Write the cont maps, link arrays, cells state, rnd seed and step counters as a compressed bundle """
+    stats = getStats()
+    cont : MW_Cont = fract.cont
+    links : MW_Links = fract.links
+    sim : MW_Sim = fract.sim
+    data = dict()
+    data["version"] = np.array([CHECKPOINT_VERSION])
+
+    # cont maps
+    data["cont_len"]       = np.array([len(cont.cells_state)])
+    data["cont_foundId"]   = np.array(cont.foundId, dtype=np.int64)
+    data["cont_missingId"] = np.array(cont.missingId, dtype=np.int64)
+    data["cont_deletedId"] = np.array(cont.deletedId, dtype=np.int64)
+    data["cont_wallsId"]   = np.array(cont.wallsId, dtype=np.int64)
+    data["cont_state"]     = np.array(cont.cells_state, dtype=np.int64)
+    data["cont_keys_asymmetry"] = np.array(cont.neighs_keys_asymmetry, dtype=np.int64).reshape((-1,2))
+    data["cont_keys_missing"]   = np.array(cont.neighs_keys_missing, dtype=np.int64).reshape((-1,2))
+    add_prefixed(data, "cont_neighs", pack_rows(cont.neighs))
+    add_prefixed(data, "cont_neighs_faces", pack_rows(cont.neighs_faces))
+    add_prefixed(data, "cont_keys_perCell", pack_rows([ cont.keys_perCell.get(i, CELL_ERROR_ENUM.MISSING) for i in range(len(cont.cells_state)) ], width=2))
+    add_prefixed(data, "cont_keys_perWall", pack_rows([ cont.keys_perWall[w] for w in cont.wallsId ], width=2))
+    add_prefixed(data, "cont_FtoF", pack_rows_nested(cont.cells_meshes_FtoF))
+    stats.logDt("packed cont maps")
+
+    # links arrays and static adjacency
+    for name in LinkStorage.arrays:
+        data[f"links_{name}"] = getattr(links.storage, name)
+    data["links_neighs_offsets"] = links.neighs_offsets
+    data["links_neighs_ids"]     = links.neighs_ids
+    data["links_limits"]         = links.get_limits()
+    data["links_comps_len"]      = np.array([links.comps_len])
+
+    # sim counters and rnd seed (the streams are keyed by the step id)
+    if sim:
+        data["sim_step_id"] = np.array([sim.step_id])
+        data["sim_rng"]     = np.array([sim.rng.seed, sim.rng.mod], dtype=np.int64)
+
+    np.savez_compressed(path, **data)
+    stats.logDt(f"saved checkpoint: {path}")
+
+def load(fract, root: types.Object, path: str) -> bool:
+    """ Fill the fract cont, links and sim from a bundle, returns False when the file is missing, not versioned or from another version """
+    stats = getStats()
+    if not os.path.exists(path):
+        DEV.log_msg(f"Checkpoint not found: {path}", {"CHECKPOINT", "ERROR"})
+        return False
+    with np.load(path) as f:
+        data = dict(f)
+    if "version" not in data:
+        DEV.log_msg(f"Checkpoint without version (not a checkpoint?): {path}", {"CHECKPOINT", "ERROR"})
+        return False
+    if data["version"][0] != CHECKPOINT_VERSION:
+        DEV.log_msg(f"Checkpoint version {data['version'][0]} != {CHECKPOINT_VERSION}: {path}", {"CHECKPOINT", "ERROR"})
+        return False
+    stats.logDt(f"read checkpoint: {path}")
+
+    fract.cont = cont = load_cont(root, data)
+    stats.logDt("loaded cont maps (cells queried from the scene)")
+
+    fract.links = links = MW_Links(cont, build=False)
+    links.set_limits(data["links_limits"])
+    links.comps_len = int(data["links_comps_len"][0])
+    links.load_arrays(get_prefixed(data, "links", LinkStorage.arrays), data["links_neighs_offsets"], data["links_neighs_ids"])
+
+    fract.sim = sim = MW_Sim(cont, links)
+    if "sim_step_id" in data:
+        sim.step_id = int(data["sim_step_id"][0])
+        seed, mod = data["sim_rng"].tolist()
+        sim.rng = SimRNG(seed, mod)
+
+    stats.logDt(f"loaded checkpoint: {links.links_len} links")
+    return links.initialized
+
+def load_cont(root: types.Object, data: dict) -> MW_Cont:
+    """ Build the cont without voro++ nor precalculations, the checkpoint state is kept over the one stored in the scene objects """
+    wallsId = data["cont_wallsId"].tolist()
+    return MW_Cont.from_arrays(
+        root,
+        cells_state           = data["cont_state"].tolist(),
+        foundId               = data["cont_foundId"].tolist(),
+        missingId             = data["cont_missingId"].tolist(),
+        deletedId             = data["cont_deletedId"].tolist(),
+        wallsId               = wallsId,
+        keys_perWall          = dict(zip(wallsId, unpack_rows(**get_prefixed(data, "cont_keys_perWall")))),
+        keys_perCell          = dict(enumerate(unpack_rows(**get_prefixed(data, "cont_keys_perCell")))),
+        neighs                = unpack_rows(**get_prefixed(data, "cont_neighs")),
+        neighs_faces          = unpack_rows(**get_prefixed(data, "cont_neighs_faces")),
+        neighs_keys_missing   = [ tuple(k) for k in data["cont_keys_missing"].tolist() ],
+        neighs_keys_asymmetry = [ tuple(k) for k in data["cont_keys_asymmetry"].tolist() ],
+        cells_meshes_FtoF     = unpack_rows_nested(get_prefixed(data, "cont_FtoF", rows_nested_names), rowType=set),
+    )
+
+#-------------------------------------------------------------------
+
+def save_all_callback(_scene_=None, _name_=None):
+    """ Optionally write the checkpoints of all stored fracts after saving the .blend """
+    if not getPrefs().checkpoint_autoSave:
+        return
+    for id, fract in MW_global_storage.id_fracts.items():
+        root = MW_global_storage.id_fracts_obj[id]
+        if utils_scene.needsSanitize(root) or not fract.links:
+            continue
+        save(fract, get_path(root))
@@ -0,0 +1,195 @@
+import bpy
+import bpy.types as types
+import json
+import os
+
+from .preferences import getPrefs
+from .properties_global import MW_global_storage, MW_global_selected, MW_id_utils
+from . import properties_utils
+
+from .mw_fract import MW_Fract
+from .mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM, SIM_EXIT_FLAG
+from . import mw_setup, mw_checkpoint
+
+from . import utils, utils_scene
+from .utils_dev import DEV
+from .stats import getStats
+
+
+# Headless pipeline for farms: load a model, fracture it, simulate and write the .blend, checkpoint and metrics
+# the entry point is src/cli.py (blender --background --python src/cli.py -- job.json ...)
+# a job is a json/toml file, paths relative to it:
+#   { "name", "model": ".blend/.obj/.stl/.ply", "object", "gen": {MW_gen_cfg}, "sim": {MW_sim_cfg}, "steps",
+#     "output": { "dir", "blend", "checkpoint", "links" } }
+#-------------------------------------------------------------------
+
+def load_job(path: str) -> dict:
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            # NOTE:: tomllib is python 3.11+ (blender 4.1+), the addon itself only needs 3.10
+            try: import tomllib
+            except ImportError: raise ValueError(f"toml jobs need python 3.11+ (blender 4.1+), use a json job: {path}")
+            job = tomllib.load(f)
+        else:
+            job = json.load(f)
+
+    job.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    job["_dir"] = os.path.dirname(os.path.abspath(path))
+    return job
+
+def get_job_path(job: dict, path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(job["_dir"], path)
+
+#-------------------------------------------------------------------
+
+# native importers (blender 3.2+ obj, 3.6+ ply, 4.1+ stl) and the legacy python ones they replaced (removed in 4.x)
+importers = {
+    ".obj": (("wm", "obj_import"), ("import_scene", "obj")),
+    ".stl": (("wm", "stl_import"), ("import_mesh", "stl")),
+    ".ply": (("wm", "ply_import"), ("import_mesh", "ply")),
+}
+
+def load_model(path: str):
+    """ Open a .blend or import a mesh into the current scene, with the importer available in this blender version """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".blend":
+        bpy.ops.wm.open_mainfile(filepath=path)
+        return
+    if ext not in importers:
+        raise ValueError(f"unsupported model format: {path}")
+
+    for module, name in importers[ext]:
+        if name in dir(getattr(bpy.ops, module)):
+            getattr(getattr(bpy.ops, module), name)(filepath=path)
+            return
+    raise ValueError(f"no {ext} importer in this blender version (enable the import addon?): {path}")
+
+def gen_fract(obj: types.Object, gen: dict, context: types.Context) -> tuple[types.Object, MW_Fract]:
+    """ Same as a fresh MW_gen_OT execution with the job cfg, the source object props are restored after the copy """
+    prefs = getPrefs()
+    gen_prev = properties_utils.getProps_dict(obj.mw_gen)
+    try:
+        properties_utils.setProps_dict(obj.mw_gen, gen)
+        obj_root, obj_original = mw_setup.copy_original(obj, obj.mw_gen, context, prefs.names.original_copy)
+        properties_utils.copyProps_groups_rec(obj.mw_gen, obj_root.mw_gen)
+    finally:
+        properties_utils.setProps_dict(obj.mw_gen, gen_prev)
+
+    # rnd seed as the op invoke + execution
+    cfg = obj_root.mw_gen
+    s = None if cfg.debug_rnd.seed_regen else cfg.debug_rnd.seed
+    cfg.debug_rnd.seed = utils.rnd_reset_seed(s)
+    cfg.debug_rnd.seed = utils.rnd_reset_seed(cfg.debug_rnd.seed, cfg.debug_rnd.seed_mod)
+
+    fract = MW_Fract()
+    MW_global_storage.addFract(fract, obj_root)
+    error, msg = mw_setup.gen_fract(fract, obj_root, obj_original, cfg, context)
+    if error:
+        raise RuntimeError(msg)
+
+    MW_id_utils.setMetaType_rec(obj_root, {"CHILD"}, skipParent=True)
+    utils_scene.select_unhide(obj_root, context)
+    MW_global_selected.setSelected(obj_root)
+    return obj_root, fract
+
+def run_sim(obj_root: types.Object, fract: MW_Fract, sim: dict, steps: int) -> int:
+    """ Same as the step operator called steps times (or once when budgeted), returns the infiltrations done """
+    properties_utils.setProps_dict(obj_root.mw_sim, sim)
+    fract.sim.cfg = obj_root.mw_sim
+    fract.sim.rnd_store()
+
+    # budgeted runs ignore the steps, no UI so the goal is only checked every second
+    done = done_step = 0
+    budget = fract.sim.get_budget(1.0)
+    if budget:
+        for done in fract.sim.run_budget_iter(budget):
+            pass
+        if fract.sim.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK:
+            raise RuntimeError("No entry link found... (probably due dir_entry)")
+        return done
+
+    for _ in range(steps):
+        for done_step in fract.sim.run_iter(fract.sim.cfg.step_infiltrations):
+            pass
+        done += done_step
+        if fract.sim.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK:
+            raise RuntimeError("No entry link found... (probably due dir_entry)")
+        if fract.sim.exit_flag >= SIM_EXIT_FLAG.STOP_ON_LINK_BREAK:
+            break
+    return done
+
+def get_metrics(job: dict, obj_root: types.Object, fract: MW_Fract, infiltrations: int) -> dict:
+    links = fract.links
+    cont = fract.cont
+    s = links.storage
+    return {
+        "name": job["name"],
+        "infiltrations": infiltrations,
+        "exit_flag": SIM_EXIT_FLAG.to_str(fract.sim.exit_flag),
+        "cells": { CELL_STATE_ENUM.to_str(state): len(cont.getCells_state(state)) for state in CELL_STATE_ENUM.all },
+        "links": { LINK_STATE_ENUM.to_str(state): len(s.ids_perState[state]) for state in LINK_STATE_ENUM.all },
+        "comps": links.comps_len,
+        "stages": getStats().stages,
+        "cfg": {
+            "gen": properties_utils.getProps_dict(obj_root.mw_gen),
+            "sim": properties_utils.getProps_dict(obj_root.mw_sim),
+        },
+    }
+
+#-------------------------------------------------------------------
+
+def run_job(job: dict) -> dict:
+    """ Full pipeline of a single job, each stage timed with the shared stats, returns the metrics """
+    stats = getStats()
+    stats.reset()
+    DEV.log_msg(f"job: {job['name']}", {"CLI", "JOB"})
+
+    if "model" in job:
+        load_model(get_job_path(job, job["model"]))
+    context = bpy.context
+    obj = bpy.data.objects[job["object"]] if "object" in job else context.view_layer.objects.active
+    if obj is None:
+        raise ValueError("no object to fracture, set the job object")
+    stats.stage("load")
+
+    obj_root, fract = gen_fract(obj, job.get("gen", {}), context)
+    stats.stage("gen")
+
+    infiltrations = run_sim(obj_root, fract, job.get("sim", {}), job.get("steps", 1))
+    stats.stage("sim")
+
+    # visuals stored in the .blend
+    out = job.get("output", {})
+    mw_setup.update_cellsState(fract.cont, obj_root)
+    if out.get("links", False):
+        mw_setup.gen_linksAll(context)
+    stats.stage("vis")
+
+    # outputs, the checkpoint goes next to the .blend when saved (same as the UI)
+    out_dir = get_job_path(job, out.get("dir", "."))
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, job["name"])
+    if out.get("blend", True):
+        bpy.ops.wm.save_as_mainfile(filepath=f"{base}.blend")
+    if out.get("checkpoint", True):
+        path = mw_checkpoint.get_path(obj_root) if out.get("blend", True) else f"{base}.{bpy.path.clean_name(obj_root.name)}.mw.npz"
+        mw_checkpoint.save(fract, path)
+    stats.stage("output")
+
+    metrics = get_metrics(job, obj_root, fract, infiltrations)
+    with open(f"{base}.metrics.json", "w") as f:
+        json.dump(metrics, f, indent=2)
+    stats.logFull(f"job completed: {job['name']}")
+    return metrics
+
+def main(paths: list[str], keep_going = False) -> int:
+    """ Run the jobs in order, returns the number of failed ones """
+    failed = 0
+    for path in paths:
+        try:
+            run_job(load_job(path))
+        except Exception as e:
+            failed += 1
+            DEV.log_msg(f"job FAILED: {path} ({e})", {"CLI", "ERROR"}, cut=False)
+            if not keep_going: break
+    return failed
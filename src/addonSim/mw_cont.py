@@ -11,67 +11,13 @@ from .properties_global import (
 # Using tess voro++ adaptor
 from tess import Container as VORO_Container
 
+from .mw_state import CELL_ERROR_ENUM, CELL_STATE_ENUM, neigh_key_t, neighFaces_key_t
+from . import mw_core
 from . import utils_geo, utils_scene
 from .utils_dev import DEV
 from .stats import getStats
 
 
-#-------------------------------------------------------------------
-
-neigh_key_t      = tuple[int, int]
-neighFaces_key_t = tuple[int, int]
-
-class CELL_ERROR_ENUM:
-    """ Use leftover indices between cont boundaries and custom walls for filler error idx?
-        # NOTE:: could be using any number, sequentiality not used
-        # OPT:: sequential check of id in all, so in case of slow process just use a unique error etc
-    """
-    # could use original ID to preserve it? anyway need to be either very high or between 7-9 (walls id)
-    _zerosForHighlight = 1000000
-
-    MISSING = -1 *_zerosForHighlight
-    """ Missing a whole cell / object """
-    ASYMMETRY = -2 *_zerosForHighlight
-    """ Missing connection at in the supposed neighbour """
-    DELETED = -3 *_zerosForHighlight
-    """ Deleted from the scene """
-    #IGNORED = -4 *_zerosForHighlight
-    #""" Model debug ignored """
-
-    all = { MISSING, ASYMMETRY, DELETED }
-    build_process = { MISSING, ASYMMETRY }
-
-    @classmethod
-    def str(cls, idx):
-        if idx == cls.MISSING:   return "MISSING"
-        if idx == cls.ASYMMETRY: return "ASYMMETRY"
-        if idx == cls.DELETED:   return "DELETED"
-        #if idx == cls.IGNORED:   return "IGNORED"
-        return "unknown"
-
-class CELL_STATE_ENUM:
-    """ Current cell state, preserves some sequentiality"""
-    SOLID = 0
-    AIR = 1
-    CORE = 2
-
-    all = { SOLID, AIR, CORE }
-
-    @classmethod
-    def to_str(cls, e:int):
-        if e == cls.SOLID:  return "SOLID"
-        if e == cls.AIR:    return "AIR"
-        if e == cls.CORE:   return "CORE"
-        if e in CELL_ERROR_ENUM.all: return "ERROR_ENUM"
-        return "none"
-        #raise ValueError(f"CELL_STATE_ENUM: {e} is not in {cls.all}")
-    @classmethod
-    def from_str(cls, s:str):
-        if s == "SOLID":    return cls.SOLID
-        if s == "AIR":      return cls.AIR
-        if s == "CORE":     return cls.CORE
-        raise ValueError(f"CELL_STATE_ENUM: {s} is not in { set(CELL_STATE_ENUM.to_str(s) for s in cls.all) }")
-
 #-------------------------------------------------------------------
 
 class MW_Cont:
@@ -93,6 +39,50 @@ class MW_Cont:
         if self.voro_cont:
             self.initialized = True
 
+    @classmethod
+    def from_arrays(cls, root :types.Object, cells_state: list[int], foundId: list[int], missingId: list[int], deletedId: list[int],
+                    wallsId: list[int], keys_perWall: dict[int, list[neigh_key_t]], keys_perCell: dict[int, list[neigh_key_t] | int],
+                    neighs: list[list[int]|int], neighs_faces: list[list[int]|int], neighs_keys_missing: list[neigh_key_t],
+                    neighs_keys_asymmetry: list[neigh_key_t], cells_meshes_FtoF: list[list[set[int]]|int]) -> "MW_Cont":
+        """ Alternative to building voro++ and the precalculations: the maps come already calculated (e.g. from a checkpoint)
+            * the cells objects are queried from the scene by id, but the given state is kept over the one stored in them
+        """
+        cont = cls.__new__(cls)
+        cont.root = root
+        cont.voro_cont = None
+        """ # NOTE:: not available, only used while generating the cells """
+
+        n = len(cells_state)
+        cont.foundId   = foundId
+        cont.missingId = missingId
+        cont.deletedId = deletedId
+        cont.deletedId_prev = cont.deletedId.copy()
+
+        cont.wallsId = wallsId
+        numWalls = len(cont.wallsId)
+        cont.wallsId_edges = [ (cont.wallsId[i], cont.wallsId[(i+1)%numWalls] ) for i in range(numWalls) ]
+        cont.keys_perWall = keys_perWall
+        cont.keys_perCell = keys_perCell
+
+        cont.neighs       = neighs
+        cont.neighs_faces = neighs_faces
+        cont.neighs_keys_missing   = neighs_keys_missing
+        cont.neighs_keys_asymmetry = neighs_keys_asymmetry
+        cont.cells_meshes_FtoF = cells_meshes_FtoF
+
+        cont.cells_state  = cells_state
+        cont.cells_objs   = [CELL_ERROR_ENUM.MISSING]* n
+        cont.cells_meshes = [CELL_ERROR_ENUM.MISSING]* n
+        cont.query_cells(readState=False)
+        for id in cont.deletedId:
+            cont.cells_objs[id] = CELL_ERROR_ENUM.DELETED
+            cont.cells_meshes[id] = CELL_ERROR_ENUM.DELETED
+
+        cont.recalc_perState()
+        cont.cells_journal = None
+        cont.initialized = cont.precalculated = bool(cont.foundId)
+        return cont
+
     def precalculations(self, cells_list : list[types.Object]):
         """ Precalculate/query data such as valid neighbours and mapping faces, also adds storage and cell id to cell objects """
         stats = getStats()
@@ -104,10 +94,6 @@ class MW_Cont:
         self.keys_perWall: dict[int, list[neigh_key_t]] = {
             id: list() for id in self.wallsId
         }
-        # cell dict lists will have the same size of neighs/faces so fill in the following loop while checking for missing ones
-        self.keys_perCell: dict[int, list[neigh_key_t] | int] = dict()
-        """ # NOTE:: missing cells are filled with a placeholder id to preserve original position idx """
-
 
         # calculate missing cells and query neighs (also with placeholders idx)
         self.foundId   : list[int]           = []
@@ -119,14 +105,9 @@ class MW_Cont:
         for idx_cell, obj_cell in enumerate(self.voro_cont):
             if obj_cell is None:
                 self.missingId.append(idx_cell)
-                self.keys_perCell[idx_cell] = CELL_ERROR_ENUM.MISSING
             else:
                 self.foundId.append(idx_cell)
-                neighs_cell = obj_cell.neighbors()
-                self.neighs[idx_cell] = neighs_cell
-                # prefill with asymmetry keys too
-                key = (CELL_ERROR_ENUM.ASYMMETRY, idx_cell)
-                self.keys_perCell[idx_cell] = [key]*len(neighs_cell)
+                self.neighs[idx_cell] = obj_cell.neighbors()
 
         msg = f"calculated voro cell neighs: {len(self.missingId)} / {len(self.voro_cont)} missing"
         if self.missingId: msg += f" {str(self.missingId[:20])}"
@@ -161,46 +142,21 @@ class MW_Cont:
             #self.cells_meshes_FtoF[idx_cell] = utils_geo.get_meshDicts(mesh)["FtoF"]
             self.cells_meshes_FtoF[idx_cell] = utils_geo.map_FtoF(mesh)
 
+        self.cells_perState : dict[int, set[int]] = dict()
+        """ Found cells id per state, kept up to date by the state setters """
+        self.recalc_perState()
+        self.cells_journal : dict[int, int] = None
+        """ Original state of the cells modified since journal_start, None when not recording """
+
         stats.logDt("calculated cells mesh dicts (interleaved missing cells)")
 
-        # build symmetric face map of the found cells
-        self.neighs_keys_asymmetry : list[neigh_key_t]   = []
-        self.neighs_keys_missing   : list[neigh_key_t]   = []
-        self.neighs_faces          : list[list[int]|int] = [CELL_ERROR_ENUM.MISSING]*len(self.voro_cont)
-        """ # NOTE:: missing cells and neigh asymmetries are filled with a placeholder id too """
-
-        for idx_cell in self.foundId:
-            neighs_cell = self.neighs[idx_cell]
-
-            faces: list[int] = [CELL_ERROR_ENUM.ASYMMETRY] * len(neighs_cell)
-            for idx_face,idx_neigh in enumerate(neighs_cell):
-                # wall connection always ok, so simply add its index
-                if idx_neigh < 0: faces.append(idx_neigh)
-
-                # general cases try retrieving the respective face at the neighbour end
-                else:
-                    neighs_other = self.neighs[idx_neigh]
-
-                    # check missing whole cell (self.neighs default value) -> alter neighs acording to found error
-                    if neighs_other == CELL_ERROR_ENUM.MISSING:
-                        self.neighs_keys_missing.append((idx_cell,idx_neigh))
-                        neighs_cell[idx_face] = CELL_ERROR_ENUM.MISSING
-                        # also reasign the exact error code in the keys_perCell structure too (started as asymmetry)
-                        self.keys_perCell[idx_cell][idx_face] = (CELL_ERROR_ENUM.MISSING, idx_cell)
-
-                    # try to find valid face matching index
-                    else:
-                        try:
-                            neigh_idx_face = neighs_other.index(idx_cell)
-                            faces[idx_face] = neigh_idx_face
-
-                        # symmetry checked with .index exception -> also alter neighs
-                        except ValueError:
-                            self.neighs_keys_asymmetry.append((idx_cell,idx_neigh))
-                            neighs_cell[idx_face] = CELL_ERROR_ENUM.ASYMMETRY
-
-            # add the merged list of faces
-            self.neighs_faces[idx_cell] = faces
+        # build symmetric face map of the found cells, the cell keys lists have the same size of neighs/faces
+        # NOTE:: missing cells and neigh asymmetries are filled with a placeholder id too (preserving the original position idx)
+        self.neighs_faces          : list[list[int]|int]
+        self.keys_perCell          : dict[int, list[neigh_key_t] | int]
+        self.neighs_keys_missing   : list[neigh_key_t]
+        self.neighs_keys_asymmetry : list[neigh_key_t]
+        self.neighs_faces, self.keys_perCell, self.neighs_keys_missing, self.neighs_keys_asymmetry = mw_core.cells_neighs_faces(self.neighs)
 
         stats.logDt(f"calculated cell neighs faces: {len(self.neighs_keys_missing)} broken due missing")
         msg =       f"      ...found {len(self.neighs_keys_asymmetry)} asymmetries"
@@ -253,7 +209,17 @@ class MW_Cont:
         self.root = root
         DEV.log_msg(f"Sanitizing cont", {"CONT", "SANITIZE"})
 
-        # query cell roots and their children
+        cleaned |= self.query_cells()
+
+        # check some deleted obj (meshes not checked)
+        ok, broken, error = self.getCells_splitID_needsSanitize()
+        self.setCells_missing(broken)
+        cleaned |= self.deletedId != self.deletedId_prev
+        return cleaned
+
+    def query_cells(self, readState = True) -> bool:
+        """ Query the cell roots and their children again, matched by their internal id (optionally reading their state too) """
+        cleaned = False
         prefs = getPrefs()
         self.cells_root = utils_scene.get_child(self.root, prefs.names.cells)
         self.cells_root_core = utils_scene.get_child(self.root, prefs.names.cells_core)
@@ -269,13 +235,12 @@ class MW_Cont:
             self.cells_objs[idx_cell] = obj_cell
             self.cells_meshes[idx_cell] = obj_cell.data
             # also recover state from scene
-            cleaned |= self.cells_state[idx_cell] == obj_cell.mw_id.cell_state
-            self.cells_state[idx_cell] = obj_cell.mw_id.cell_state
+            if readState:
+                cleaned |= self.cells_state[idx_cell] == obj_cell.mw_id.cell_state
+                self.cells_state[idx_cell] = obj_cell.mw_id.cell_state
 
-        # check some deleted obj (meshes not checked)
-        ok, broken, error = self.getCells_splitID_needsSanitize()
-        self.setCells_missing(broken)
-        cleaned |= self.deletedId != self.deletedId_prev
+        if readState:
+            self.recalc_perState()
         return cleaned
 
     def getCells_splitID_needsSanitize(self):
@@ -302,19 +267,21 @@ class MW_Cont:
 
         return ok, broken+broken_prev, error
 
-    def getCells_splitID_state(self):
-        """ Split cells by state
-            # OPT:: store and only update?
-        """
-        stateMap = {
-            state : [] for state in CELL_STATE_ENUM.all
-        }
+    def getCells_splitID_state(self) -> dict[int, set[int]]:
+        """ Split cells by state, returns the maintained sets so do not modify them """
+        return self.cells_perState
 
-        for id in self.foundId:
-            state = self.cells_state[id]
-            stateMap[state].append(id)
+    def getCells_state(self, state:int) -> set[int]:
+        """ Cells id with the given state, the maintained set so do not modify it """
+        return self.cells_perState[state]
 
-        return stateMap
+    def recalc_perState(self):
+        """ Full rebuild of the state sets, only needed when the state array is replaced or written directly """
+        self.cells_perState = {
+            state : set() for state in CELL_STATE_ENUM.all
+        }
+        for id in self.foundId:
+            self.cells_perState[self.cells_state[id]].add(id)
 
     #-------------------------------------------------------------------
 
@@ -326,32 +293,54 @@ class MW_Cont:
         for id in broken:
             self.cells_objs[id] = CELL_ERROR_ENUM.DELETED
             self.cells_meshes[id] = CELL_ERROR_ENUM.DELETED
-            self.cells_state[id] = CELL_STATE_ENUM.AIR
+            self._set_state(id, CELL_STATE_ENUM.AIR)
 
     def setCell_state(self, idx:int, state:int):
         """ Mark both the array and the cell object """
         self.cells_objs[idx].mw_id.cell_state = state
-        self.cells_state[idx] = state
+        self._set_state(idx, state)
 
     # OPT:: snake case or no? links getters?
     def setCells_state(self, idx_list:list[int], state:int):
         """ Mark both the array and the cell object """
         for idx in idx_list:
             self.cells_objs[idx].mw_id.cell_state = state
-            self.cells_state[idx] = state
+            self._set_state(idx, state)
+
+    def _set_state(self, idx:int, state:int):
+        # the error placeholders of missing cells are not part of any set
+        prev = self.cells_state[idx]
+        if self.cells_journal is not None and idx not in self.cells_journal:
+            self.cells_journal[idx] = prev
+        if prev in self.cells_perState:
+            self.cells_perState[prev].discard(idx)
+        self.cells_state[idx] = state
+        self.cells_perState[state].add(idx)
 
     #-------------------------------------------------------------------
 
-    # OPT:: reduce stored amoun instead of the whole array
-    def backupState(self):
-        self.backup_cells_state = self.cells_state.copy()
+    def journal_start(self):
+        """ Start recording the original state of the cells modified from now on """
+        self.cells_journal = dict()
 
-    def backupState_restore(self):
-        self.cells_state = self.backup_cells_state.copy()
+    def journal_restore(self) -> list[int]:
+        """ Restore the journaled cells and keep recording from the restored state, returns the ids restored """
+        journal, self.cells_journal = self.cells_journal or dict(), None
+        for idx, state in journal.items():
+            self._set_state(idx, state)
+        self.cells_journal = dict()
+        return list(journal.keys())
 
     def reset(self):
+        if self.cells_journal is not None:
+            for id in self.foundId:
+                self.cells_journal.setdefault(id, self.cells_state[id])
         for id in self.foundId:
             self.cells_state[id] = CELL_STATE_ENUM.SOLID
+        self.cells_perState = {
+            state : set() for state in CELL_STATE_ENUM.all
+        }
+        self.cells_perState[CELL_STATE_ENUM.SOLID].update(self.foundId)
 
     #-------------------------------------------------------------------
 
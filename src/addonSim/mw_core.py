@@ -0,0 +1,936 @@
+import numpy as np
+import itertools
+from dataclasses import dataclass, field, fields
+from typing import Callable
+MIN_ALIGN_MAX = 1.0 - 1e-6
+
+from .mw_state import CELL_ERROR_ENUM, CELL_STATE_ENUM, LINK_STATE_ENUM, neigh_key_t, neighFaces_key_t
+from .mw_sim_batch import MW_SimBatch
+from .mw_rng import SimRNG
+from .dynconn import DynamicConnectivity
+from .unionfind import connected_components_arrays
+from .mw_frontier import LinksFrontier
+from .utils_dev import DEV
+from .stats import getStats
+
+
+# Blender independent core of the fracture: plain arrays in (e.g. the voro++ cells), links topology and sim state out
+# the addon modules are adapters over it: MW_Links gathers the faces from the voro++ cells then builds with build_links,
+# the components/frontier rules are the LinksTopology shared with the snapshot,
+# and the ensemble/sweeps run the batched sim over the snapshot classes in worker processes
+# NOTE:: only imports pure modules, so plain python (tests, benchmarks, workers) can use it without bpy or mathutils
+#-------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class SimCfg:
+    """ Frozen plain values of the MW_sim_cfg read per step, same defaults
+        * reading the property group goes through RNA, so the sim takes this snapshot when the props are set
+        * also precomputes the derived values used per candidate (normalized dirs and the min align normalization)
+        * the min aligns are clamped below 1, otherwise nothing is reachable and the normalization gives inf/nan weights
+    """
+    step_maxDepth               : int   = -1
+    step_stopBreak              : bool  = True
+    step_stopBreak_event        : frozenset = frozenset({"LINK"})
+    water__start                : float = 1.0
+    water_deg                   : float = 0.25
+    water_abs_air               : float = 0.05
+    water_abs_solid             : float = 0.10
+    link_deg                    : float = 0.5
+    link_resist_weight          : float = 0.75
+    dir_entry                   : tuple = (1, -0.5, -0.5)
+    dir_entry_minAlign          : float = 0.05
+    dir_next                    : tuple = (0, 0, -1)
+    dir_next_minAlign           : float = 0.05
+    water_rnd_abs_minCheck      : float = 0.25
+    water_rnd_abs_continueProb  : float = 0.9
+    water_rnd_abs_damage        : float = 0.75
+    link_rnd_break_minCheck     : float = 0.4
+    link_rnd_break_resistProb   : float = 0.9
+    link_next_dir_weight        : float = 0.75
+    link_next_exit_avoidance    : float = 0.75
+    debug_skip_entry_area       : bool  = False
+    debug_skip_next_maxResist   : bool  = False
+
+    # derived values, not part of the cfg
+    dir_entry_inv               : tuple = field(init=False, repr=False, compare=False)
+    dir_entry_minAlign_inv      : float = field(init=False, repr=False, compare=False)
+    dir_next_normalized         : tuple = field(init=False, repr=False, compare=False)
+    dir_next_minAlign_inv       : float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        set_derived = lambda name, v: object.__setattr__(self, name, v)
+        set_derived("step_stopBreak_event", frozenset(self.step_stopBreak_event))
+        set_derived("dir_entry_minAlign", min(self.dir_entry_minAlign, MIN_ALIGN_MAX))
+        set_derived("dir_next_minAlign", min(self.dir_next_minAlign, MIN_ALIGN_MAX))
+        set_derived("dir_entry_inv", tuple(-v for v in normalized(self.dir_entry)))
+        set_derived("dir_next_normalized", normalized(self.dir_next))
+        set_derived("dir_entry_minAlign_inv", 1.0 / (1.0 - self.dir_entry_minAlign))
+        set_derived("dir_next_minAlign_inv", 1.0 / (1.0 - self.dir_next_minAlign))
+
+    @classmethod
+    def names(cls) -> tuple[str]:
+        return tuple(f.name for f in fields(cls) if f.init)
+
+    @classmethod
+    def from_props(cls, cfg) -> "SimCfg":
+        """ Plain values from the property group (vectors to tuples, enum flags to frozensets) """
+        values = dict()
+        for name in cls.names():
+            v = getattr(cfg, name)
+            if isinstance(v, (bool, int, float, str)): values[name] = v
+            elif isinstance(v, (set, frozenset)): values[name] = frozenset(v)
+            else: values[name] = tuple(v)
+        return cls(**values)
+
+    def to_dict(self) -> dict:
+        return { name: getattr(self, name) for name in self.names() }
+
+def normalized(v: tuple) -> tuple:
+    """ Same as mathutils Vector.normalized, null vectors are kept """
+    l = sum(x*x for x in v) ** 0.5
+    return tuple(x/l for x in v) if l > 0 else tuple(float(x) for x in v)
+
+#-------------------------------------------------------------------
+
+def cells_neighs_faces(neighs: list[list[int]|int]) -> tuple[list[list[int]|int], dict[int, list[neigh_key_t]|int], list[neigh_key_t], list[neigh_key_t]]:
+    """ Symmetric face map of the found cells (also used by MW_Cont.precalculations), the neighs list is fixed in place
+        * neighs of the missing cells are CELL_ERROR_ENUM.MISSING, faces towards missing or asymmetric cells get the error id
+        * returns the neigh face per face, the keys per cell prefilled with the error placeholders and the keys broken due missing or asymmetric neighs
+    """
+    neighs_faces : list[list[int]|int] = [CELL_ERROR_ENUM.MISSING]*len(neighs)
+    keys_perCell : dict[int, list[neigh_key_t]|int] = dict()
+    keys_missing, keys_asymmetry = [], []
+    for idx_cell, neighs_cell in enumerate(neighs):
+        if neighs_cell == CELL_ERROR_ENUM.MISSING:
+            keys_perCell[idx_cell] = CELL_ERROR_ENUM.MISSING
+            continue
+
+        keys = keys_perCell[idx_cell] = [(CELL_ERROR_ENUM.ASYMMETRY, idx_cell)]*len(neighs_cell)
+        faces = neighs_faces[idx_cell] = [CELL_ERROR_ENUM.ASYMMETRY]*len(neighs_cell)
+        for idx_face, idx_neigh in enumerate(neighs_cell):
+            if idx_neigh < 0:
+                faces[idx_face] = idx_neigh
+            elif neighs[idx_neigh] == CELL_ERROR_ENUM.MISSING:
+                keys_missing.append((idx_cell, idx_neigh))
+                neighs_cell[idx_face] = CELL_ERROR_ENUM.MISSING
+                keys[idx_face] = (CELL_ERROR_ENUM.MISSING, idx_cell)
+            else:
+                try:
+                    faces[idx_face] = neighs[idx_neigh].index(idx_cell)
+                except ValueError:
+                    keys_asymmetry.append((idx_cell, idx_neigh))
+                    neighs_cell[idx_face] = CELL_ERROR_ENUM.ASYMMETRY
+    return neighs_faces, keys_perCell, keys_missing, keys_asymmetry
+
+def faces_geometry(verts: np.ndarray, faces: list[list[int]], flipN = False) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Center (vertex mean), unit normal and area per face with the Newell method, same values as the blender polygons """
+    verts = np.asarray(verts, dtype=np.float64)
+    nf = len(faces)
+    centers = np.empty((nf,3))
+    normals = np.empty((nf,3))
+    for i, f in enumerate(faces):
+        v = verts[f]
+        centers[i] = v.mean(axis=0)
+        normals[i] = np.cross(v, np.roll(v, -1, axis=0)).sum(axis=0)
+    if flipN: normals *= -1
+
+    areas = np.linalg.norm(normals, axis=1)
+    normals /= np.maximum(areas, 1e-30)[:, None]
+    return centers, normals, areas * 0.5
+
+def faces_voro(verts: np.ndarray, faces: list[list[int]], normals: list, areas: list[float], flipN = False) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Center (vertex mean), unit normal and area per face in bulk from the voro++ cell data, same values as the blender polygons
+        * voro++ normals point outwards, they are oriented as the mesh winding (reversed when flipN) of the largest face
+        * the normals of degenerate faces are null
+    """
+    verts = np.asarray(verts, dtype=np.float64)
+    normals = np.array(normals, dtype=np.float64).reshape((-1,3))
+    areas = np.array(areas, dtype=np.float64)
+    if not len(faces):
+        return np.empty((0,3)), normals, areas
+
+    counts = np.fromiter((len(f) for f in faces), dtype=np.int64, count=len(faces))
+    ids = np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int64, count=int(counts.sum()))
+    starts = np.zeros(len(faces), dtype=np.int64)
+    starts[1:] = np.cumsum(counts)[:-1]
+    centers = np.add.reduceat(verts[ids], starts, axis=0) / counts[:, None]
+
+    # the winding convention is the same for all the faces, so a single one orients the normals
+    i = int(np.argmax(areas))
+    v = verts[faces[i]]
+    n = np.cross(v, np.roll(v, -1, axis=0)).sum(axis=0)
+    if flipN: n *= -1
+    if n @ normals[i] < 0: normals *= -1
+
+    # degenerate faces come with a null (or not unit) normal from voro++, kept exactly null so they align with nothing
+    lengths = np.linalg.norm(normals, axis=1)
+    degenerate = lengths < 1e-12
+    normals[degenerate] = 0.0
+    normals[~degenerate] /= lengths[~degenerate, None]
+    return centers, normals, areas
+
+def faces_FtoF(faces: list[list[int]]) -> list[set[int]]:
+    """ Faces sharing an edge per face (same as utils_geo.map_FtoF over the mesh) """
+    edges : dict[tuple[int,int], list[int]] = dict()
+    for i, f in enumerate(faces):
+        for a, b in zip(f, f[1:] + f[:1]):
+            edges.setdefault((a,b) if a < b else (b,a), []).append(i)
+
+    FtoF = [ set() for f in faces ]
+    for shared in edges.values():
+        for i in shared:
+            FtoF[i].update(j for j in shared if j != i)
+    return FtoF
+
+#-------------------------------------------------------------------
+# resistance fields over the world XZ, same formulas as the mw_resistance ones but without the prefs in/out cfg (flip, invert, round)
+# NOTE:: only these or plain callables can be used without bpy, the mw_resistance fields (including FORMULA and IMAGE) read the addon prefs
+
+def field_layers_side(x: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return 0.5 * np.sin(-1 * x + 0.5 * z) + 0.5
+
+def field_layers_stack(x: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return 0.5 * np.sin(1 * z + -0.15 * x) + 0.5
+
+def field_pockets(x: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (np.sin(x) + np.cos(z) + 2.0) / 4.0
+
+resistance_fields = {
+    "LAYERS_SIDE": field_layers_side,
+    "LAYERS_STACK": field_layers_stack,
+    "POCKETS": field_pockets,
+}
+
+def eval_resistance(pos: np.ndarray, resistance: str|Callable|np.ndarray|None = "LAYERS_SIDE") -> np.ndarray:
+    """ Resistance per position (n,3): a resistance_fields name, a callable of the world x and z arrays or the values themselves
+        * None gives 0, the default field is the addon default one
+    """
+    pos = np.asarray(pos, dtype=np.float64).reshape((-1,3))
+    if resistance is None:
+        return np.zeros(len(pos), dtype=np.float64)
+    if isinstance(resistance, str):
+        resistance = resistance_fields[resistance]
+    if callable(resistance):
+        resistance = resistance(pos[:,0], pos[:,2])
+    return np.array(np.broadcast_to(np.asarray(resistance, dtype=np.float64), (len(pos),)))
+
+#-------------------------------------------------------------------
+
+class LinksBuild:
+    """ Links of the found cells from their faces: LinkStorage arrays, the cont keys maps and the CSR adjacency """
+
+    def __init__(self):
+        self.arrays         : dict[str, np.ndarray]                     = dict()
+        self.keys_cells     : list[neigh_key_t]                         = list()
+        self.keys_faces     : list[neighFaces_key_t]                    = list()
+        self.keys_id        : dict[neigh_key_t, int]                    = dict()
+        self.keys_perCell   : dict[int, list[neigh_key_t]|int]          = dict()
+        self.keys_perWall   : dict[int, list[neigh_key_t]]              = dict()
+        self.neighs_offsets : np.ndarray                                = None
+        self.neighs_ids     : np.ndarray                                = None
+
+    def __len__(self) -> int:
+        return len(self.keys_cells)
+
+def build_links(cells_found: list[int], cells_deleted: list[int], neighs: list[list[int]|int], neighs_faces: list[list[int]|int],
+                keys_perCell: dict[int, list[neigh_key_t]|int], walls: list[int],
+                faces_FtoF: list[list[set[int]]|int], faces_pos: list[np.ndarray], faces_normal: list[np.ndarray], faces_area: list[np.ndarray],
+                skip_alignedY: float = None, resistance: str|Callable|np.ndarray|None = "LAYERS_SIDE") -> LinksBuild:
+    """ Links topology and geometry from the per cell faces data (indexed by cell id, world space)
+        * a link per internal face pair (SOLID) and per wall face (WALL), in the same order MW_Links always used
+        * the neighbours of a link are the links of the faces sharing an edge, at both cells, as a CSR adjacency
+        * skip_alignedY skips faces with a normal |y| above it (fake 2D debug model)
+        * resistance as taken by eval_resistance, None leaves it at 0 for the caller to evaluate (MW_Links uses the addon field)
+    """
+    build = LinksBuild()
+    deleted = set(cells_deleted)
+    build.keys_perCell = { idx: (keys if keys == CELL_ERROR_ENUM.MISSING else list(keys)) for idx, keys in keys_perCell.items() }
+    build.keys_perWall = { w: list() for w in walls }
+
+    cells, faces, pos, dirs, dir_from, area, state = [], [], [], [], [], [], []
+    def add_link(key, key_faces, idx_cell, idx_face, link_state):
+        build.keys_id[key] = len(build.keys_cells)
+        build.keys_cells.append(key)
+        build.keys_faces.append(key_faces)
+        pos.append(faces_pos[idx_cell][idx_face])
+        dirs.append(faces_normal[idx_cell][idx_face])
+        dir_from.append(idx_cell)
+        area.append(faces_area[idx_cell][idx_face])
+        state.append(link_state)
+
+    # FIRST loop over the faces of the found cells
+    cells_alive = [ idx for idx in cells_found if idx not in deleted ]
+    for idx_cell in cells_alive:
+        for idx_face, idx_neighCell in enumerate(neighs[idx_cell]):
+            # skip asymmetric (already prefilled keys_perCell) and missing/deleted cells
+            if idx_neighCell in CELL_ERROR_ENUM.all or idx_neighCell in deleted:
+                continue
+            if skip_alignedY is not None and abs(faces_normal[idx_cell][idx_face][1]) > skip_alignedY:
+                continue
+
+            if idx_neighCell < 0:
+                # link to a wall, wont be repeated
+                key = (idx_neighCell, idx_cell)
+                add_link(key, (idx_neighCell, idx_face), idx_cell, idx_face, LINK_STATE_ENUM.WALL)
+                build.keys_perWall.setdefault(idx_neighCell, []).append(key)
+                build.keys_perCell[idx_cell][idx_face] = key
+
+            else:
+                # internal link, unique between cells
+                swap = idx_cell > idx_neighCell
+                key = (idx_neighCell, idx_cell) if swap else (idx_cell, idx_neighCell)
+                if key in build.keys_id:
+                    continue
+
+                idx_neighFace = neighs_faces[idx_cell][idx_face]
+                key_faces = (idx_neighFace, idx_face) if swap else (idx_face, idx_neighFace)
+                add_link(key, key_faces, idx_cell, idx_face, LINK_STATE_ENUM.SOLID)
+                build.keys_perCell[idx_cell][idx_face] = key
+                build.keys_perCell[idx_neighCell][idx_neighFace] = key
+
+    # SECOND loop to aggregate the links neighbours, the adjacency keeps the insertion order of a networkx graph
+    adj : dict[neigh_key_t, dict[neigh_key_t, None]] = dict()
+    visited : set[neigh_key_t] = set()
+    for idx_cell in cells_alive:
+        keys_perFace = build.keys_perCell[idx_cell]
+        for idx_face, key in enumerate(keys_perFace):
+            if key[0] in CELL_ERROR_ENUM.all or key in visited:
+                continue
+            visited.add(key)
+
+            id = build.keys_id[key]
+            if state[id] == LINK_STATE_ENUM.WALL:
+                # walls only add local faces from the same cell
+                neighs_keys = [ keys_perFace[f] for f in faces_FtoF[idx_cell][idx_face] ]
+            else:
+                # regular links add both neigh faces from same and the other cell
+                (c1, c2), (f1, f2) = key, build.keys_faces[id]
+                neighs_keys = [ build.keys_perCell[c1][f] for f in faces_FtoF[c1][f1] ] + [ build.keys_perCell[c2][f] for f in faces_FtoF[c2][f2] ]
+
+            for nn in neighs_keys:
+                if nn[0] not in CELL_ERROR_ENUM.all:
+                    adj.setdefault(key, dict())[nn] = None
+                    adj.setdefault(nn, dict())[key] = None
+
+    n = len(build.keys_cells)
+    build.neighs_offsets = np.zeros(n+1, dtype=np.int32)
+    ids = []
+    for id, key in enumerate(build.keys_cells):
+        ids.extend(build.keys_id[k] for k in adj.get(key, ()))
+        build.neighs_offsets[id+1] = len(ids)
+    build.neighs_ids = np.array(ids, dtype=np.int32)
+
+    # pack as the LinkStorage arrays with the initial sim props, area factor relative to the avg area
+    area = np.array(area, dtype=np.float64)
+    pos = np.array(pos, dtype=np.float64).reshape((n,3))
+    state_initial = np.array(state, dtype=np.int8)
+    build.arrays = {
+        "cells":        np.array(build.keys_cells, dtype=np.int32).reshape((n,2)),
+        "faces":        np.array(build.keys_faces, dtype=np.int32).reshape((n,2)),
+        "pos":          pos,
+        "dir":          np.array(dirs, dtype=np.float64).reshape((n,3)),
+        "dir_from":     np.array(dir_from, dtype=np.int32),
+        "area":         area,
+        "areaFactor":   area / area.mean() if n else area.copy(),
+        "resistance":   eval_resistance(pos, resistance),
+        "state_initial": state_initial,
+        "state":        state_initial.copy(),
+        "life":         np.ones(n, dtype=np.float64),
+        "picks":        np.zeros(n, dtype=np.int32),
+        "picks_entry":  np.zeros(n, dtype=np.int32),
+    }
+    return build
+
+#-------------------------------------------------------------------
+
+class LinkStorage:
+    """ Structure of arrays holding all links data, indexed by an integer link id
+        * the arrays come packed from the core build (build_links), a snapshot or a checkpoint, see load_arrays
+        * the sim reads/writes the arrays directly, the addon Link is just a thin view kept for the UI and visualization
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.finalized = False
+        self.journal : dict[int, tuple] = None
+        """ Original values of the links touched since journal_start, None when not recording """
+
+        # keys kept as python tuples, they are used as graph nodes and dict keys
+        self.keys_cells : list[neigh_key_t]      = []
+        self.keys_faces : list[neighFaces_key_t] = []
+
+    # all the arrays, e.g. stored by the checkpoints
+    arrays = ("cells", "faces", "pos", "dir", "dir_from", "area", "areaFactor", "resistance",
+              "state_initial", "state", "life", "picks", "picks_entry")
+
+    def load_arrays(self, arrays: dict[str, np.ndarray]):
+        """ Set the packed arrays, e.g. from the core build or a checkpoint """
+        assert(not self.finalized)
+        for name in self.arrays:
+            setattr(self, name, np.array(arrays[name]))
+        self.size = len(self.cells)
+        self.keys_cells = [ tuple(k) for k in self.cells.tolist() ]
+        self.keys_faces = [ tuple(k) for k in self.faces.tolist() ]
+        self.recalc_perState()
+        self.finalized = True
+
+    def recalc_perState(self):
+        """ Full rebuild of the link ids per state, only needed when the state array is written directly """
+        self.ids_perState : dict[int, set[int]] = {
+            state : set(np.flatnonzero(self.state == state).tolist()) for state in LINK_STATE_ENUM.all
+        }
+
+    def set_state(self, id:int, state:int):
+        """ Set the state of a single link keeping the per state sets up to date """
+        prev = int(self.state[id])
+        if prev == state:
+            return
+        self.journal_touch(id)
+        self.ids_perState[prev].discard(id)
+        self.ids_perState[state].add(id)
+        self.state[id] = state
+
+    #-------------------------------------------------------------------
+
+    def reset(self, life=1.0, picks=0, picks_entry=0):
+        """ Reset simulation parameters of all links """
+        self.journal_touch_many(np.arange(self.size))
+        self.state[:] = self.state_initial
+        self.recalc_perState()
+        self.life[:] = life
+        self.picks[:] = picks
+        self.picks_entry[:] = picks_entry
+
+    def journal_start(self):
+        """ Start recording the original values of the links modified from now on (replaces any previous journal) """
+        self.journal = dict()
+
+    def journal_touch(self, id:int):
+        """ Record the link before modifying it, only the first touch keeps its values """
+        if self.journal is not None and id not in self.journal:
+            self.journal[id] = (int(self.state[id]), float(self.life[id]), int(self.picks[id]), int(self.picks_entry[id]),
+                                tuple(self.dir[id]), int(self.dir_from[id]))
+
+    def journal_touch_many(self, ids:np.ndarray):
+        if self.journal is not None:
+            for id in np.unique(ids).tolist():
+                self.journal_touch(id)
+
+    def journal_restore(self) -> list[int]:
+        """ Restore the journaled links and keep recording from the restored state, returns the ids restored """
+        journal, self.journal = self.journal, None
+        if not journal:
+            self.journal = dict()
+            return []
+
+        for id, (state, life, picks, picks_entry, dir, dir_from) in journal.items():
+            self.set_state(id, state)
+            self.life[id] = life
+            self.picks[id] = picks
+            self.picks_entry[id] = picks_entry
+            self.dir[id] = dir
+            self.dir_from[id] = dir_from
+
+        self.journal = dict()
+        return list(journal.keys())
+
+    #-------------------------------------------------------------------
+
+    def set_broken(self, id:int):
+        self.set_state(id, LINK_STATE_ENUM.AIR)
+        self.journal_touch(id)
+        self.life[id] = 0
+
+    def flip_dir(self, id:int):
+        """ Flip the direction and the cell it comes from """
+        self.journal_touch(id)
+        self.dir[id] *= -1
+        c1, c2 = self.keys_cells[id]
+        self.dir_from[id] = c2 if self.dir_from[id] == c1 else c1
+
+    def reset_link(self, id:int, life=1.0, picks=0, picks_entry=0):
+        """ Reset simulation parameters of a single link """
+        self.set_state(id, int(self.state_initial[id]))
+        self.journal_touch(id)
+        self.life[id] = life
+        self.picks[id] = picks
+        self.picks_entry[id] = picks_entry
+
+class LinksTopology:
+    """ Links topology rules shared by MW_Links and the snapshot: solid components, detach, frontier and the cells/links state changes
+        * works with link ids over a LinkStorage, the cont only provides the cells state (MW_Cont or SnapshotCont)
+        * the components are kept by a dynamic connectivity, the frontier is updated incrementally while cells/links turn to AIR
+    """
+
+    def __init__(self, cont, comps_len = 1):
+        self.log = True
+        """ Affects some logs, not all"""
+
+        self.cont = cont
+        """ Shortcut to container """
+
+        self.storage = LinkStorage()
+        """ Links data as contiguous arrays indexed by link id """
+        self.keys_id : dict[neigh_key_t, int] = dict()
+        """ Map from the sorted cells key to the link id """
+
+        self.comps = []
+        """ List of sets with connected components cells id """
+        self.comps_dyn = DynamicConnectivity()  # solid cells and links, checks splits without a full path search
+        self.comps_len = comps_len              # initial expected
+
+        self.air_comps = []
+        """ Used to determine air bubbles inside the model, walls included as negative ids """
+        self.air_comps_len = 1
+        self.air_nodes = np.empty(0, dtype=np.int64)
+        self.air_edges = (self.air_nodes, self.air_nodes)
+
+        self.frontier : LinksFrontier = None
+        """ Maintains the internal/external links """
+        self.frontier_version = 0
+        """ Incremented on every frontier recalculation, lets the sim know when to update its entry sampler """
+        self.frontier_dirty_cells : list[int] = list()
+        self.frontier_dirty_links : list[int] = list()
+        self.frontier_dirty_full = False
+
+    def load_topology(self):
+        """ Keys map, frontier and initial components over the loaded storage """
+        self.keys_id = { key: id for id,key in enumerate(self.storage.keys_cells) }
+        self.frontier = LinksFrontier(self.storage.keys_cells, self.storage, self.cont)
+        self.comps_recalc()
+
+    def get_link_id(self, key:neigh_key_t) -> int:
+        return self.keys_id[key]
+    def get_cell_link_ids(self, idx:int) -> list[int]:
+        """ The link ids from a given cell, walls included """
+        return self.frontier.cells_links.get(idx, ())
+    def get_external_ids(self) -> np.ndarray:
+        return self.frontier.get_ids_external()
+
+    #-------------------------------------------------------------------
+
+    def comps_recalc(self, recalcGraph = True):
+        """ Recalc cell connected componentes, return true when new split """
+        if self.log: DEV.log_msg(f"Recalc COMPS", {"COMPS"})
+        prevLen = self.comps_len
+
+        # recalc subgraph
+        if recalcGraph:
+            self.comps_recalc_subgraph()
+
+        # recount components
+        self.comps_count()
+        newSplit = prevLen != self.comps_len
+        if newSplit:
+            getStats().logDt(f"calculated COMPS: [new SPLIT] from {prevLen}")
+
+        # potential detach of cells
+        if newSplit and self.comps_len > 1:
+            self.comps_detach_frontier()
+            self.comps_count()
+
+        # recalc frontier even for no new splits -> cells turned to AIR changes the front
+        self.comps_recalc_frontier(full=recalcGraph)
+
+        return newSplit
+
+    def comps_recalc_subgraph(self):
+        """ Recalculate the dynamic connectivity of the solid cells """
+        if self.log: DEV.log_msg(f"Recalc COMPS subgraph", {"COMPS"})
+        nodes, c1, c2 = self.comps_get_arrays()
+        self.comps_dyn = DynamicConnectivity.from_graph(nodes.tolist(), zip(c1.tolist(), c2.tolist()))
+
+    def comps_restore(self, cells:list[int], links:list[int]):
+        """ Partial recalc after restoring a state journal: only the restored cells and links are updated in the connectivity and the frontier """
+        if self.log: DEV.log_msg(f"Restore COMPS: {len(cells)} cells {len(links)} links", {"COMPS"})
+        cells_state = self.cont.cells_state
+        for idx in cells:
+            if cells_state[idx] == CELL_STATE_ENUM.AIR: self.comps_dyn.remove_node(idx)
+            else: self.comps_dyn.add_node(idx)
+
+        # the link edges require both cells in the connectivity (no AIR cells nor walls)
+        state = self.storage.state
+        for id in links:
+            c1, c2 = self.storage.keys_cells[id]
+            if state[id] != LINK_STATE_ENUM.AIR and self.comps_dyn.has_node(c1) and self.comps_dyn.has_node(c2):
+                self.comps_dyn.add_edge(c1, c2)
+            else:
+                self.comps_dyn.remove_edge(c1, c2)
+
+        self.comps_count()
+
+        # the debug skip has no partial version
+        if DEV.SKIP_BUBBLE_CHECK:
+            self.comps_recalc_frontier(full=True)
+            return
+        self.frontier_version += 1
+        self.frontier.restore(cells, links)
+        self.frontier_dirty_cells.clear()
+        self.frontier_dirty_links.clear()
+        self.frontier_dirty_full = False
+
+    def comps_get_arrays(self):
+        """ Solid (and core) cell ids and the non AIR links between them, as integer arrays
+            # NOTE:: no missing cells and no walls, WALL links always have a wall at one side
+        """
+        nodes = np.array([ *self.cont.getCells_state(CELL_STATE_ENUM.SOLID), *self.cont.getCells_state(CELL_STATE_ENUM.CORE) ], dtype=np.int64)
+        c1, c2 = self.get_links_within(nodes, self.storage.state != LINK_STATE_ENUM.AIR)
+        return nodes, c1, c2
+
+    def get_links_within(self, nodes:np.ndarray, mask:np.ndarray = None):
+        """ Cells at both sides of the links with both cells in nodes (negative ids for walls), optionally masked """
+        cells = self.storage.cells
+        within = np.isin(cells[:,0], nodes) & np.isin(cells[:,1], nodes)
+        if mask is not None: within &= mask
+        return cells[within,0], cells[within,1]
+
+    def comps_count(self):
+        nodes, c1, c2 = self.comps_get_arrays()
+        self.comps = connected_components_arrays(nodes, c1, c2)
+        self.comps_len = len(self.comps)
+        if DEV.DEBUG_COMPS_NX:
+            self.comps_check_nx(self.comps, nodes, c1, c2)
+        getStats().logDt(f"count COMPS: {self.comps_len}")
+
+    @staticmethod
+    def comps_check_nx(comps:list[set[int]], nodes:np.ndarray, c1:np.ndarray, c2:np.ndarray):
+        """ Verification mode: count the same components with networkx and compare the partitions """
+        import networkx as nx
+        graph = nx.Graph()
+        graph.add_nodes_from(nodes.tolist())
+        graph.add_edges_from(zip(c1.tolist(), c2.tolist()))
+        comps_nx = { frozenset(comp) for comp in nx.connected_components(graph) }
+        assert(comps_nx == { frozenset(comp) for comp in comps })
+
+    def comps_recalc_frontier(self, full = True):
+        """ Update internal and external links: incremental from the cells/links turned to AIR since the last one, or full """
+        if self.log: DEV.log_msg(f"Recalc FRONT", {"COMPS"})
+        self.frontier_version += 1
+
+        # cells going back to solid shrink the outside, also the debug skip has no incremental version
+        if full or self.frontier_dirty_full or DEV.SKIP_BUBBLE_CHECK:
+            stateMap = self.cont.getCells_splitID_state()
+            if DEV.SKIP_BUBBLE_CHECK:
+                # all air cells are considered outside
+                outside = set(stateMap[CELL_STATE_ENUM.AIR])
+            else:
+                # build air graph connecting all external walls -> detecting air bubbles
+                # NOTE:: the air graph/comps are only refreshed on full recalcs, the frontier keeps its own outside set
+                self.air_recalc_graph(stateMap)
+                self.air_comps_count()
+                outside = { cell_id for cell_id in self.air_comps[self.air_comps_wall_id] if cell_id >= 0 }
+            self.frontier.recalc(outside)
+
+        else:
+            self.frontier.update(self.frontier_dirty_cells, self.frontier_dirty_links)
+
+        self.frontier_dirty_cells.clear()
+        self.frontier_dirty_links.clear()
+        self.frontier_dirty_full = False
+
+    def air_recalc_graph(self, stateMap):
+        """ Air cells and walls connected by the links between them, the walls are all connected too """
+        self.air_nodes = np.array([ *stateMap[CELL_STATE_ENUM.AIR], *self.cont.wallsId ], dtype=np.int64)
+        c1, c2 = self.get_links_within(self.air_nodes)
+        walls = np.array(self.cont.wallsId_edges, dtype=np.int64).reshape((-1,2))
+        self.air_edges = (np.concatenate((c1, walls[:,0])), np.concatenate((c2, walls[:,1])))
+
+    def air_comps_count(self):
+        self.air_comps = connected_components_arrays(self.air_nodes, *self.air_edges)
+        self.air_comps_len = len(self.air_comps)
+        if DEV.DEBUG_COMPS_NX:
+            self.comps_check_nx(self.air_comps, self.air_nodes, *self.air_edges)
+
+        # find wall comp
+        self.air_comps_wall_id = -1
+        sampleWall = self.cont.wallsId[0]
+        for i,comp in enumerate(self.air_comps):
+            if sampleWall in comp:
+                self.air_comps_wall_id = i
+                break
+        assert(self.air_comps_wall_id != -1)
+
+        getStats().logDt(f"count AIR COMPS: {self.air_comps_len}")
+
+    def comps_detach_frontier(self):
+        if self.log: DEV.log_msg(f"Recalc DETACH", {"COMPS"})
+
+        # split by core comps
+        cores, nonCores = [],[]
+        for i, comp_cells in enumerate(self.comps):
+            # iterate cells and check for any mark as core
+            foundCore = False
+            for cell_id in comp_cells:
+                if self.cont.cells_state[cell_id] == CELL_STATE_ENUM.CORE:
+                    cores.append(i)
+                    foundCore = True
+                    break
+            # no cell was core
+            if not foundCore:
+                nonCores.append(i)
+
+        # all core, do nothing
+        if not nonCores:
+            return
+
+        # list of candidate comps (not individual cells)
+        candidates = [ self.comps[i] for i in nonCores ]
+        new_air_cells = []
+
+        # if there was at least a single non core one, then flatten the list of candidates and remove all
+        if len(nonCores) != len(self.comps):
+            new_air_cells = list(itertools.chain.from_iterable(candidates))
+
+        # otherwise remove the smaller candidate
+        else:
+            candidates = sorted(candidates, key=len)
+            new_air_cells = list(itertools.chain.from_iterable(candidates[:-1]))
+
+        # set links as air which will trigger link removeal etc
+        self.setState_cells_check(new_air_cells, CELL_STATE_ENUM.AIR, False)
+
+    #-------------------------------------------------------------------
+
+    def setState_link_check(self, key, state:LINK_STATE_ENUM, recalc=True):
+        """ Set state, modify graph, returns True when recalc """
+        if self.log: DEV.log_msg(f"Check link AIR {key}", {"COMPS", "LINK"})
+        s = self.storage
+        id = self.keys_id[key]
+        prev = s.state[id]
+
+        # ignore already set
+        if prev == state:
+            return False
+
+        # broke the link? change graph etc
+        if state == LINK_STATE_ENUM.AIR:
+            # ignore walls and break solid links
+            if prev == LINK_STATE_ENUM.WALL:
+                return False
+            s.set_broken(id)
+            self.frontier_dirty_links.append(id)
+
+            # remove link edges, alredy removed when coming from an setState_cell_check
+            split = self.comps_dyn.remove_edge(*key)
+
+            # potentially flip normals so than they point towards outside (entry alignment and visualization use them)
+            if self.cont.cells_state[s.dir_from[id]] != CELL_STATE_ENUM.SOLID:
+                s.flip_dir(id)
+
+        # link back to solid
+        else:
+            # reset even wall links (number of picks), but for those nothing else to do
+            s.reset_link(id)
+            self.frontier_dirty_full = True
+            if prev == LINK_STATE_ENUM.WALL:
+                return False
+
+            # readd the link, cells should be added beforehand (AIR neighbours are not part of the components)
+            if all(self.cont.cells_state[c] != CELL_STATE_ENUM.AIR for c in key):
+                self.comps_dyn.add_edge(*key)
+            split = False
+
+        breaking = False
+        if recalc:
+            # recalc on link break only when a path between cells ceases to exist
+            c1,c2 = key
+            if DEV.SKIP_PATH_CHECK: breaking = True
+            else: breaking = split
+            if DEV.DEBUG_CONNECTIVITY and state == LINK_STATE_ENUM.AIR and self.comps_dyn.has_node(c1) and self.comps_dyn.has_node(c2):
+                comps = connected_components_arrays(*self.comps_get_arrays())
+                assert(split == (not any(c1 in comp and c2 in comp for comp in comps)))
+            if breaking:
+                self.comps_recalc(False)
+
+        return breaking
+
+    def setState_cell_check(self, idx, state:CELL_STATE_ENUM, recalc = True):
+        """ Set state, modify graph and also set links, returns True when recalc """
+        if self.log: DEV.log_msg(f"Check cell AIR {idx}", {"COMPS", "CELL"})
+        cell_state = self.cont.cells_state[idx]
+
+        # ignore already set
+        if cell_state == state:
+            return False
+        self.cont.setCell_state(idx, state)
+        keys = self.storage.keys_cells
+
+        # cell to air? change graph and also set the links
+        if state == CELL_STATE_ENUM.AIR:
+            # remove cell and attached link
+            self.comps_dyn.remove_node(idx)
+            self.frontier_dirty_cells.append(idx)
+            for id in self.get_cell_link_ids(idx):
+                self.setState_link_check(keys[id], LINK_STATE_ENUM.AIR, False)
+
+        # cell back to solid
+        else:
+            # add cell back and recover links
+            self.comps_dyn.add_node(idx)
+            self.frontier_dirty_full = True
+            for id in self.get_cell_link_ids(idx):
+                self.setState_link_check(keys[id], LINK_STATE_ENUM.SOLID, False)
+
+        if recalc:
+            self.comps_recalc(False)
+        return recalc
+
+    def setState_cells_check(self, idx_list, state:CELL_STATE_ENUM, recalc_afterAll = True):
+        """ Set state, modify graph and also set links, returns True when recalc """
+        for idx in idx_list:
+            self.setState_cell_check(idx, state, False)
+
+        # recalc without building the graph as setState_cell_check already removes/adds missing nodes
+        if recalc_afterAll:
+            self.comps_recalc(False)
+
+#-------------------------------------------------------------------
+
+class SimSnapshot:
+    """ Picklable copy of the sim state: link arrays, static CSR adjacency, cells state and the sim config as plain values
+        * built from a live MW_Sim inside blender, then shipped once per worker process
+    """
+
+    # link arrays copied from the LinkStorage
+    links_arrays = LinkStorage.arrays
+
+    # MW_sim_cfg values read by the batched sim
+    cfg_fields = SimCfg.names()
+
+    def __init__(self):
+        self.arrays         : dict[str, np.ndarray] = dict()
+        self.keys_cells     : list[neigh_key_t]     = list()
+        self.neighs_offsets : np.ndarray            = None
+        self.neighs_ids     : np.ndarray            = None
+
+        self.cells_found    : list[int]                 = list()
+        self.cells_state    : list[int]                 = list()
+        self.wallsId        : list[int]                 = list()
+        self.wallsId_edges  : list[tuple[int,int]]      = list()
+        self.comps_len      : int                       = 1
+
+        self.cfg            : dict = dict()
+
+    @classmethod
+    def from_sim(cls, sim) -> "SimSnapshot":
+        snap = cls()
+        links, cont = sim.links, sim.cont
+
+        s = links.storage
+        snap.arrays = { name: getattr(s, name).copy() for name in cls.links_arrays }
+        snap.keys_cells = list(s.keys_cells)
+        snap.neighs_offsets = links.neighs_offsets
+        snap.neighs_ids = links.neighs_ids
+
+        deleted = set(cont.deletedId)
+        snap.cells_found = [ i for i in cont.foundId if i not in deleted ]
+        snap.cells_state = list(cont.cells_state)
+        snap.wallsId = list(cont.wallsId)
+        snap.wallsId_edges = list(cont.wallsId_edges)
+        snap.comps_len = links.comps_len
+
+        snap.cfg = cls.cfg_copy(sim.cfg)
+        return snap
+
+    @classmethod
+    def from_build(cls, build: LinksBuild, num_cells: int, cells_found: list[int], walls: list[int], cfg: SimCfg = None) -> "SimSnapshot":
+        """ Initial state (all cells SOLID) from the core links build, no blender involved """
+        snap = cls()
+        snap.arrays = { name: build.arrays[name].copy() for name in cls.links_arrays }
+        snap.keys_cells = list(build.keys_cells)
+        snap.neighs_offsets = build.neighs_offsets
+        snap.neighs_ids = build.neighs_ids
+
+        snap.cells_found = list(cells_found)
+        snap.cells_state = [CELL_ERROR_ENUM.MISSING]*num_cells
+        for idx in cells_found:
+            snap.cells_state[idx] = CELL_STATE_ENUM.SOLID
+        snap.wallsId = list(walls)
+        snap.wallsId_edges = [ (walls[i], walls[(i+1)%len(walls)]) for i in range(len(walls)) ]
+
+        snap.cfg = (cfg or SimCfg()).to_dict()
+        return snap
+
+    @classmethod
+    def cfg_copy(cls, cfg) -> dict:
+        """ Plain values from the property group (vectors to tuples, enum flags to frozensets) """
+        return SimCfg.from_props(cfg).to_dict()
+
+#-------------------------------------------------------------------
+
+class SnapshotCont:
+    """ Minimal container state: only what the links topology needs """
+
+    def __init__(self, snap: SimSnapshot):
+        self.foundId       = snap.cells_found
+        self.cells_state   = list(snap.cells_state)
+        self.wallsId       = snap.wallsId
+        self.wallsId_edges = snap.wallsId_edges
+
+        self.cells_perState = { state : set() for state in CELL_STATE_ENUM.all }
+        for idx in self.foundId:
+            self.cells_perState[self.cells_state[idx]].add(idx)
+
+    def setCell_state(self, idx, state):
+        self.cells_perState[self.cells_state[idx]].discard(idx)
+        self.cells_perState[state].add(idx)
+        self.cells_state[idx] = state
+
+    def getCells_splitID_state(self):
+        return self.cells_perState
+
+    def getCells_state(self, state):
+        return self.cells_perState[state]
+
+class SnapshotLinks(LinksTopology):
+    """ Links topology over the snapshot arrays, the same rules as MW_Links (both are a LinksTopology) without the views nor the graphs """
+
+    def __init__(self, snap: SimSnapshot):
+        super().__init__(SnapshotCont(snap), snap.comps_len)
+        self.log = False
+        self.storage.load_arrays(snap.arrays)
+        self.neighs_offsets = snap.neighs_offsets
+        self.neighs_ids = snap.neighs_ids
+        self.load_topology()
+
+
+#-------------------------------------------------------------------
+
+def cells_from_voro(voro_cont) -> tuple[list[dict|None], list[int]]:
+    """ Plain cells data and container walls ids from a tess/voro++ container, e.g. to run the core without any scene objects """
+    cells = [ None if cell is None else {
+        "vertices": cell.vertices(), "faces": cell.face_vertices(), "neighbors": cell.neighbors(),
+        "normals": cell.normals(), "areas": cell.face_areas(),
+    } for cell in voro_cont ]
+    return cells, voro_cont.get_conainerId_limitWalls()+voro_cont.walls_cont_idx
+
+def snapshot_from_cells(cells: list[dict|None], walls: list[int], flipN = False, cfg: SimCfg = None,
+                        resistance: str|Callable|np.ndarray|None = "LAYERS_SIDE") -> tuple[SimSnapshot, LinksBuild]:
+    """ Whole core pipeline from plain cells data, e.g. the voro++ cells: { "vertices": (n,3) world, "faces": [[vertex ids]], "neighbors": [cell id or wall id] }
+        * None cells are missing ones, walls are the container wall ids (negative) in order
+        * the voro++ "normals" and "areas" are used when present, otherwise calculated from the faces
+        * resistance as taken by eval_resistance
+    """
+    neighs = [ CELL_ERROR_ENUM.MISSING if c is None else list(c["neighbors"]) for c in cells ]
+    cells_found = [ i for i,c in enumerate(cells) if c is not None ]
+    neighs_faces, keys_perCell, _, _ = cells_neighs_faces(neighs)
+
+    faces_pos, faces_normal, faces_area, FtoF = [None]*len(cells), [None]*len(cells), [None]*len(cells), [None]*len(cells)
+    for idx in cells_found:
+        c = cells[idx]
+        if "normals" in c: faces_pos[idx], faces_normal[idx], faces_area[idx] = faces_voro(c["vertices"], c["faces"], c["normals"], c["areas"], flipN)
+        else: faces_pos[idx], faces_normal[idx], faces_area[idx] = faces_geometry(c["vertices"], c["faces"], flipN)
+        FtoF[idx] = faces_FtoF(cells[idx]["faces"])
+
+    build = build_links(cells_found, [], neighs, neighs_faces, keys_perCell, walls, FtoF, faces_pos, faces_normal, faces_area, resistance=resistance)
+    return SimSnapshot.from_build(build, len(cells), cells_found, walls, cfg), build
+
+def simulate(snap: SimSnapshot, infiltrations: int, cfg: SimCfg|dict = None, rng: SimRNG = None, batch_size = 256) -> tuple[SnapshotLinks, MW_SimBatch]:
+    """ Run the batched sim from the snapshot state (left untouched), returns the resulting links state and the batch stats """
+    links = SnapshotLinks(snap)
+    if cfg is None: cfg = snap.cfg
+    if isinstance(cfg, dict): cfg = SimCfg(**cfg)
+
+    batch = MW_SimBatch(links, cfg)
+    batch.run(infiltrations, batch_size, rng=rng if rng is not None else SimRNG())
+    return links, batch
@@ -0,0 +1,100 @@
+# Monte Carlo ensembles of the batched sim, run in worker processes over a blender independent snapshot
+#-------------------------------------------------------------------
+
+import numpy as np
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+
+from .mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM
+from .mw_rng import SimRNG
+from .mw_core import SimSnapshot, simulate
+
+from .utils_dev import DEV
+from .stats import getStats
+
+
+#-------------------------------------------------------------------
+
+class EnsembleResult:
+    """ Aggregated statistics over the ensemble members """
+
+    def __init__(self, members: list[dict]):
+        self.members = members
+        self.num = len(members)
+
+        life = np.stack([ m["life"] for m in members ])
+        broken = np.stack([ m["broken"] for m in members ])
+        air = np.stack([ m["air"] for m in members ])
+
+        self.link_life_mean = life.mean(axis=0)
+        """ Mean life per link id """
+        self.link_break_prob = broken.mean(axis=0)
+        """ Fraction of members that broke each link id """
+        self.cell_air_prob = air.mean(axis=0)
+        """ Fraction of members that turned each cell to AIR (indexed by cell id) """
+
+        self.air_cells = np.array([ m["air"].sum() for m in members ])
+        """ Number of new AIR cells per member """
+        self.broken_links = broken.sum(axis=1)
+        """ Number of broken links per member """
+        self.time = np.array([ m["time"] for m in members ])
+
+    def __str__(self):
+        return (f"ensemble({self.num}) air cells: {self.air_cells.mean():.2f} +- {self.air_cells.std():.2f}"
+                f", broken links: {self.broken_links.mean():.2f} +- {self.broken_links.std():.2f}"
+                f", member time: {self.time.mean():.3f}s")
+
+# worker process state, the snapshot is sent once per worker
+_worker_snap : SimSnapshot = None
+
+def _worker_init(snap: SimSnapshot):
+    global _worker_snap
+    _worker_snap = snap
+    DEV.logs = DEV.logs_stats_dt = DEV.logs_stats_total = False
+
+def run_member(snap: SimSnapshot, seed: np.random.SeedSequence, infiltrations: int, batch_size: int, cfg: dict = None) -> dict:
+    """ Run a single simulation from the snapshot, returns the final per link and per cell state """
+    t = time()
+    links, batch = simulate(snap, infiltrations, cfg, SimRNG(seed), batch_size)
+
+    s = links.storage
+    cells_prev = np.array(snap.cells_state)
+    cells = np.array(links.cont.cells_state)
+    return {
+        "life": s.life.copy(),
+        "broken": (s.state == LINK_STATE_ENUM.AIR) & (snap.arrays["state"] == LINK_STATE_ENUM.SOLID),
+        "air": (cells == CELL_STATE_ENUM.AIR) & (cells_prev != CELL_STATE_ENUM.AIR),
+        "depth": batch.depth_total / max(batch.infiltrations, 1),
+        "infiltrations": batch.infiltrations,
+        "time": time() - t,
+    }
+
+def _worker_run(seed: np.random.SeedSequence, infiltrations: int, batch_size: int, cfg: dict) -> dict:
+    return run_member(_worker_snap, seed, infiltrations, batch_size, cfg)
+
+def run_members(snap: SimSnapshot, seeds: list[np.random.SeedSequence], cfgs: list[dict], infiltrations: int, batch_size = 256, workers: int = None) -> list[dict]:
+    """ Run a member per seed and cfg (None uses the snapshot cfg) from the same snapshot, in parallel processes
+        * workers <= 1 runs in the current process (no pickling at all)
+    """
+    if workers is not None and workers <= 1:
+        return [ run_member(snap, s, infiltrations, batch_size, cfg) for s,cfg in zip(seeds, cfgs) ]
+
+    # spawn instead of fork: blender processes should not be forked
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_worker_init, initargs=(snap,)) as pool:
+        return list(pool.map(_worker_run, seeds, itertools.repeat(infiltrations), itertools.repeat(batch_size), cfgs))
+
+def run_ensemble(snap: SimSnapshot, num: int, infiltrations: int, seed = 64, batch_size = 256, workers: int = None) -> EnsembleResult:
+    """ Run num independent simulations with distinct seeds spawned from seed, in parallel processes
+        * the member seeds do not depend on the number of workers, so the results are reproducible
+    """
+    stats = getStats()
+    seeds = np.random.SeedSequence(seed).spawn(num)
+    members = run_members(snap, seeds, [None]*num, infiltrations, batch_size, workers)
+
+    result = EnsembleResult(members)
+    stats.logDt(f"ensemble completed: {num} members x {infiltrations} infiltrations")
+    DEV.log_msg(f"{result}", {"SIM", "ENSEMBLE"}, cut=False)
+    return result
@@ -10,6 +10,7 @@ from .properties import (
 from .mw_cont import MW_Cont
 from .mw_links import MW_Links
 from .mw_sim import MW_Sim
+from . import mw_checkpoint
 
 from .utils_dev import DEV
 from .stats import getStats
@@ -48,8 +49,10 @@ def register():
     DEV.log_msg(f"{_name}", {"ADDON", "INIT", "REG"})
 
     # callbaks for fract classes are called from here?
+    handlers.callback_saveFile_actions.append(mw_checkpoint.save_all_callback)
 
 def unregister():
     DEV.log_msg(f"{_name}", {"ADDON", "INIT", "UN-REG"})
+    handlers.callback_saveFile_actions.removeCheck(mw_checkpoint.save_all_callback)
 
 DEV.log_msg(f"{_name}", {"ADDON", "PARSED"})
\ No newline at end of file
@@ -0,0 +1,136 @@
+import numpy as np
+import itertools
+
+from .mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM, neigh_key_t
+
+
+#-------------------------------------------------------------------
+
+class LinksFrontier:
+    """ Internal/external links maintained incrementally as cells turn to AIR
+        * each link contributes once per solid (or core) cell at its sides, same as iterating the solid cells links:
+            SOLID -> internal, AIR/WALL towards the outside -> external, AIR towards an air bubble -> internal
+        * the outside are the AIR cells connected to the walls, it only grows while cells turn to AIR
+        * cells/links going back to SOLID shrink the outside, so those require a full recalc (or a restore around the changes)
+    """
+
+    def __init__(self, keys_cells: list[neigh_key_t], storage, cont):
+        self.keys_cells = keys_cells
+        self.storage = storage
+        self.cont = cont
+        """ Read the arrays through the owners, a restore could replace them """
+
+        # cells to link ids, walls included (negative ids)
+        self.cells_links : dict[int, list[int]] = dict()
+        for id, (c1, c2) in enumerate(keys_cells):
+            self.cells_links.setdefault(c1, []).append(id)
+            self.cells_links.setdefault(c2, []).append(id)
+        self.walls = [ c for c in self.cells_links if c < 0 ]
+
+        self.outside : set[int] = set()
+        self.count_internal = np.zeros(len(keys_cells), dtype=np.int8)
+        self.count_external = np.zeros(len(keys_cells), dtype=np.int8)
+        self._ids_cache = dict()
+
+    def get_ids_internal(self) -> np.ndarray:
+        """ Link ids repeated per contribution (SOLID links between two cells appear twice) """
+        if "internal" not in self._ids_cache:
+            self._ids_cache["internal"] = np.repeat(np.arange(len(self.keys_cells)), self.count_internal)
+        return self._ids_cache["internal"]
+
+    def get_ids_external(self) -> np.ndarray:
+        if "external" not in self._ids_cache:
+            self._ids_cache["external"] = np.repeat(np.arange(len(self.keys_cells)), self.count_external)
+        return self._ids_cache["external"]
+
+    #-------------------------------------------------------------------
+
+    def get_outside_fromWalls(self) -> set[int]:
+        """ BFS from the walls through the AIR cells """
+        cells_state = self.cont.cells_state
+        queue = list(self.walls)
+        return self._expand(queue, set(), cells_state)
+
+    def recalc(self, outside: set[int] = None):
+        """ Full recalc of all link contributions, the outside AIR cells can be provided (e.g. from an air graph) """
+        self.outside = outside if outside is not None else self.get_outside_fromWalls()
+        for id in range(len(self.keys_cells)):
+            self._update_link(id)
+        self._ids_cache.clear()
+
+    def update(self, cells: list[int], links: list[int] = ()):
+        """ Incremental update after cells turned to AIR (and links broken), proportional to the cells affected """
+        cells_state = self.cont.cells_state
+
+        # grow the outside from the new AIR cells touching it (also opens the bubbles reached)
+        seeds = [ c for c in cells if c not in self.outside and cells_state[c] == CELL_STATE_ENUM.AIR and self._touches_outside(c) ]
+        reached = self._expand(seeds, self.outside, cells_state)
+
+        affected = set(links)
+        for c in itertools.chain(cells, reached):
+            affected.update(self.cells_links.get(c, ()))
+        for id in affected:
+            self._update_link(id)
+        self._ids_cache.clear()
+
+    def restore(self, cells: list[int], links: list[int] = ()):
+        """ Update after restoring cells/links to a previous state (e.g. back to SOLID), the outside can shrink
+            * the outside is searched again from the walls (only walks the AIR cells), then only the links around the changes are updated
+        """
+        outside = self.get_outside_fromWalls()
+        changed = self.outside ^ outside
+        self.outside = outside
+
+        affected = set(links)
+        for c in itertools.chain(cells, changed):
+            affected.update(self.cells_links.get(c, ()))
+        for id in affected:
+            self._update_link(id)
+        self._ids_cache.clear()
+
+    #-------------------------------------------------------------------
+
+    def _touches_outside(self, c: int) -> bool:
+        for id in self.cells_links.get(c, ()):
+            c1, c2 = self.keys_cells[id]
+            o = c2 if c1 == c else c1
+            if o < 0 or o in self.outside:
+                return True
+        return False
+
+    def _expand(self, queue: list[int], outside: set[int], cells_state) -> set[int]:
+        """ Add to outside the AIR cells reachable from the queue, returns the newly added """
+        reached = set()
+        for c in queue:
+            if c >= 0 and c not in outside:
+                outside.add(c)
+                reached.add(c)
+        i = 0
+        while i < len(queue):
+            c = queue[i]
+            i += 1
+            for id in self.cells_links.get(c, ()):
+                c1, c2 = self.keys_cells[id]
+                o = c2 if c1 == c else c1
+                if o >= 0 and o not in outside and cells_state[o] == CELL_STATE_ENUM.AIR:
+                    outside.add(o)
+                    reached.add(o)
+                    queue.append(o)
+        return reached
+
+    def _update_link(self, id: int):
+        cells_state = self.cont.cells_state
+        solid = self.storage.state[id] == LINK_STATE_ENUM.SOLID
+        c1, c2 = self.keys_cells[id]
+
+        n_int = n_ext = 0
+        for c, o in ((c1, c2), (c2, c1)):
+            # walls and AIR cells do not own links
+            if c < 0 or cells_state[c] == CELL_STATE_ENUM.AIR:
+                continue
+            if solid: n_int += 1
+            elif o < 0 or o in self.outside: n_ext += 1
+            else: n_int += 1 # internal broken link in a bubble!
+
+        self.count_internal[id] = n_int
+        self.count_external[id] = n_ext
@@ -1,5 +1,15 @@
+import bpy
 from math import sin,cos
+import numpy as np
+import ast
+import itertools
+import os
+
 from .preferences import getPrefs
+from .mw_rng import _mix_np, TO_FLOAT
+from . import sv_eval_formula
+from . import mw_core
+from .utils_dev import DEV
 # HACK:: simple way to avoid circular import
 #from .properties import MW_resistance_cfg
 
@@ -20,12 +30,36 @@ def user_out_cfg(r):
     if cfg.out_round: r = round(r)
     return r
 
+# NOTE:: the batch versions snapshot the cfg once per call, the scalar ones read the prefs per sample
+def user_cfg_snapshot() -> tuple[bool, bool, bool, bool]:
+    cfg = getPrefs().resist_cfg
+    return cfg.in_flipX, cfg.in_flipY, cfg.out_inv, cfg.out_round
+
+def user_in_np(xs:np.ndarray, ys:np.ndarray, snap:tuple) -> tuple[np.ndarray, np.ndarray]:
+    flipX, flipY, _, _ = snap
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    return (-xs if flipX else xs), (-ys if flipY else ys)
+
+def user_out_np(r:np.ndarray, snap:tuple) -> np.ndarray:
+    _, _, inv, rounded = snap
+    if inv: r = 1-r
+    if rounded: r = np.round(r)
+    return r
+
+#-------------------------------------------------------------------
+
 class LAYERS_SIDE:
     def get2D(x, y):
         x,y = user_in_cfg(x,y)
         r = sin(-1 * x + 0.5 * y)
         r = (0.5 * r + 0.5) # normalize
         return user_out_cfg(r)
+    def get2D_np(xs, ys):
+        snap = user_cfg_snapshot()
+        x,y = user_in_np(xs,ys, snap)
+        r = mw_core.field_layers_side(x, y)
+        return user_out_np(r, snap)
 
 class LAYERS_STACK:
     def get2D(x, y):
@@ -33,6 +67,11 @@ class LAYERS_STACK:
         r = sin(1 * y + -0.15 * x)
         r = (0.5 * r + 0.5) # normalize
         return user_out_cfg(r)
+    def get2D_np(xs, ys):
+        snap = user_cfg_snapshot()
+        x,y = user_in_np(xs,ys, snap)
+        r = mw_core.field_layers_stack(x, y)
+        return user_out_np(r, snap)
 
 class POCKETS:
     def get2D(x, y):
@@ -40,6 +79,261 @@ class POCKETS:
         r = sin(x) + cos(y)
         r = (r+2.0) / 4.0 # normalize
         return user_out_cfg(r)
+    def get2D_np(xs, ys):
+        snap = user_cfg_snapshot()
+        x,y = user_in_np(xs,ys, snap)
+        r = mw_core.field_pockets(x, y)
+        return user_out_np(r, snap)
+
+#-------------------------------------------------------------------
+
+def noise_np(x, y, z = 0.0) -> np.ndarray:
+    """ Vectorized value noise in [-1,1] (hashed lattice values with smooth trilinear interpolation), unit cell size """
+    x, y, z = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (x, y, z)))
+    i = [ np.floor(v) for v in (x, y, z) ]
+    f = [ v - iv for v, iv in zip((x, y, z), i) ]
+    f = [ t*t*(3 - 2*t) for t in f ]
+    i = [ iv.astype(np.int64).astype(np.uint64) for iv in i ]
+
+    def lattice(dx, dy, dz):
+        h = (i[0] + np.uint64(dx)) * np.uint64(0x8DA6B343) + (i[1] + np.uint64(dy)) * np.uint64(0xD8163841) + (i[2] + np.uint64(dz)) * np.uint64(0xCB1AB31F)
+        return (_mix_np(h) >> np.uint64(11)).astype(np.float64) * TO_FLOAT
+
+    lerp = lambda a, b, t: a + (b-a) * t
+    r = lerp(
+        lerp(lerp(lattice(0,0,0), lattice(1,0,0), f[0]), lerp(lattice(0,1,0), lattice(1,1,0), f[0]), f[1]),
+        lerp(lerp(lattice(0,0,1), lattice(1,0,1), f[0]), lerp(lattice(0,1,1), lattice(1,1,1), f[0]), f[1]),
+        f[2])
+    return r * 2 - 1
+
+# whitelist of the formula field, all work element wise over the arrays
+formula_names = {
+    **{ name: getattr(np, name) for name in (
+        "sin", "cos", "tan", "arcsin", "arccos", "arctan", "arctan2", "sinh", "cosh", "tanh",
+        "exp", "log", "log2", "log10", "sqrt", "abs", "sign", "floor", "ceil", "round", "mod",
+        "minimum", "maximum", "clip", "where", "pi", "e",
+    )},
+    "noise": noise_np,
+}
+formula_vars = { "x", "y", "z" }
+formula_rejected = (ast.Attribute, ast.Lambda, ast.comprehension, ast.IfExp, ast.NamedExpr)
+
+class FORMULA:
+    """ User expression of the world x and z (e.g. sin(x*0.3)+noise(x,z)), compiled once and evaluated over whole arrays
+        * only the numpy whitelist is reachable, attributes, lambdas, comprehensions and inline ifs are rejected, the result is clipped to [0,1]
+        * the world y is only available when baked in 3D, otherwise it is 0
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        root = ast.parse(source, mode="eval")
+        for node in ast.walk(root):
+            if isinstance(node, formula_rejected):
+                raise ValueError(f"{type(node).__name__} not allowed in the formula: {source}")
+
+        # all names checked against the whitelist (sv get_variables would drop the sv safe names, not available here)
+        collector = sv_eval_formula.VariableCollector()
+        collector.visit(root)
+        unknown = collector.variables - formula_vars - set(formula_names)
+        if unknown:
+            raise ValueError(f"unknown names in the formula: {unknown}, only x, y, z and the whitelist functions")
+        self.compiled = sv_eval_formula.sv_compile(source)
+
+        # trial evaluation so wrong calls fail here (the field switch keeps the previous one) instead of while evaluating the links
+        try:
+            with np.errstate(all="ignore"):
+                r = sv_eval_formula.safe_eval_compiled(self.compiled, { v: np.zeros(1) for v in formula_vars }, formula_names)
+            np.broadcast_to(np.asarray(r, dtype=np.float64), (1,))
+        except Exception as e:
+            raise ValueError(f"formula evaluation failed: {source} ({e})")
+
+    def get2D(self, x, y):
+        return float(self.get2D_np(np.array([x]), np.array([y]))[0])
+
+    def get2D_np(self, xs, ys):
+        return self.get3D_np(xs, 0.0, ys)
+
+    def get3D_np(self, xs, ys, zs):
+        snap = user_cfg_snapshot()
+        x,z = user_in_np(xs,zs, snap)
+        y = np.broadcast_to(np.asarray(ys, dtype=np.float64), x.shape)
+        r = sv_eval_formula.safe_eval_compiled(self.compiled, {"x": x, "y": y, "z": z}, formula_names)
+        r = np.clip(np.broadcast_to(np.asarray(r, dtype=np.float64), x.shape), 0.0, 1.0)
+        return user_out_np(r, snap)
+
+_formula_cache : dict[str, FORMULA] = dict()
+
+def get_formula(source: str) -> FORMULA:
+    """ Compiled formula field cached by its source """
+    field = _formula_cache.get(source)
+    if field is None:
+        field = _formula_cache[source] = FORMULA(source)
+    return field
+
+#-------------------------------------------------------------------
+
+def read_pgm_header(header: bytes, path = "") -> tuple[list[bytes], int]:
+    """ Magic, width, height and maxval tokens of a pgm header (skipping comments), and the offset of the pixels after them """
+    tokens, pos, n = [], 0, len(header)
+    while len(tokens) < 4:
+        while pos < n and header[pos:pos+1].isspace(): pos += 1
+        if pos < n and header[pos:pos+1] == b"#":
+            pos = header.find(b"\n", pos)
+            if pos < 0: break
+            continue
+        end = pos
+        while end < n and not header[end:end+1].isspace(): end += 1
+        if end == pos or end == n: break
+        tokens.append(header[pos:end])
+        pos = end
+    if len(tokens) < 4:
+        raise ValueError(f"truncated pgm header: {path}")
+    return tokens, pos+1
+
+def open_memmap(path: str, raw_width = 0, raw_dtype = "uint16") -> tuple[np.ndarray, float]:
+    """ Read only memory map of a 2D map file, returns it and the factor normalizing its values to [0,1]
+        * .npy (first channel when several), binary .pgm (8/16 bit) or headerless .raw/.r16/.bin (row major, little endian)
+        # NOTE:: compressed formats (png, tiff...) cannot be mapped, convert them first e.g. np.save of the decoded pixels
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        data = np.load(path, mmap_mode="r")
+        if data.ndim == 3: data = data[..., 0]
+    elif ext == ".pgm":
+        with open(path, "rb") as f:
+            header = f.read(1024)
+        tokens, offset = read_pgm_header(header, path)
+        if tokens[0] != b"P5":
+            raise ValueError(f"only binary (P5) pgm maps are supported: {path}")
+        width, height, maxval = (int(t) for t in tokens[1:])
+        dtype = np.dtype(">u2") if maxval > 255 else np.dtype(np.uint8)
+        if offset + height*width*dtype.itemsize > os.path.getsize(path):
+            raise ValueError(f"pgm map smaller than its {width}x{height} header: {path}")
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(height, width)), 1.0 / maxval
+    elif ext in (".raw", ".r16", ".bin"):
+        dtype = np.dtype(raw_dtype).newbyteorder("<")
+        if raw_width <= 0:
+            raise ValueError(f"raw maps need the width set: {path}")
+        height = os.path.getsize(path) // (raw_width * dtype.itemsize)
+        data = np.memmap(path, dtype=dtype, mode="r", shape=(height, raw_width))
+    else:
+        raise ValueError(f"unsupported map format (use .npy, .pgm or .raw): {path}")
+
+    norm = 1.0 / np.iinfo(data.dtype).max if np.issubdtype(data.dtype, np.integer) else 1.0
+    return data, norm
+
+_image_cache : dict[tuple, tuple[np.ndarray, float]] = dict()
+
+class IMAGE:
+    """ Map file (e.g. a 16 bit strata heightmap) over the world x,z: texel = (world - origin) / texel_size, bilinear sampling
+        * the file is memory mapped once and shared, only the pages of the sampled texels are read from disk
+        * positions outside the map are clamped to the border, rows go along z and columns along x
+    """
+
+    def __init__(self, path: str, origin = (0.0, 0.0), texel_size = 1.0, raw_width = 0, raw_dtype = "uint16"):
+        key = (path, raw_width, raw_dtype)
+        if key not in _image_cache:
+            _image_cache[key] = open_memmap(path, raw_width, raw_dtype)
+        self.data, self.norm = _image_cache[key]
+        self.origin = origin
+        self.texel_size = texel_size
+
+    def get2D(self, x, y):
+        return float(self.get2D_np(np.array([x]), np.array([y]))[0])
+
+    def get2D_np(self, xs, ys):
+        snap = user_cfg_snapshot()
+        x,z = user_in_np(xs,ys, snap)
+        h, w = self.data.shape
+        u = np.clip((x - self.origin[0]) / self.texel_size, 0, w-1)
+        v = np.clip((z - self.origin[1]) / self.texel_size, 0, h-1)
+        c0 = np.minimum(u.astype(np.int64), max(w-2, 0))
+        r0 = np.minimum(v.astype(np.int64), max(h-2, 0))
+        c1 = np.minimum(c0+1, w-1)
+        r1 = np.minimum(r0+1, h-1)
+        tu, tv = u - c0, v - r0
+
+        # sorted unique texels so the memmap reads go in file order
+        flat = np.concatenate([ r0*w+c0, r0*w+c1, r1*w+c0, r1*w+c1 ])
+        texels, inverse = np.unique(flat, return_inverse=True)
+        vals = self.data[texels // w, texels % w].astype(np.float64)[inverse].reshape((4,-1)) * self.norm
+
+        r = (vals[0]*(1-tu) + vals[1]*tu) * (1-tv) + (vals[2]*(1-tu) + vals[3]*tu) * tv
+        return user_out_np(np.clip(r, 0.0, 1.0), snap)
+
+#-------------------------------------------------------------------
+
+class BAKED:
+    """ Any field sampled once on a regular grid over the bounds, later looked up in batch with bilinear/trilinear interpolation
+        * 2D grids cover the world x,z (the get2D inputs), 3D grids also y through the field get3D_np when available
+        * positions outside the bounds are clamped to the border, the in/out cfg is already applied by the baked field
+    """
+
+    def __init__(self, field, lo, hi, res = 128, dims = 2):
+        self.field = field
+        self.res = res
+        self.dims = dims
+        self.axes = [0,2] if dims == 2 else [0,1,2]
+        self.lo = np.array([ lo[a] for a in self.axes ], dtype=np.float64)
+        self.span = np.maximum(np.array([ hi[a] for a in self.axes ], dtype=np.float64) - self.lo, 1e-9)
+
+        # bake the samples, 3D fields without get3D_np are just repeated along y
+        coords = np.meshgrid(*( np.linspace(l, l+s, res) for l,s in zip(self.lo, self.span) ), indexing="ij")
+        coords = [ c.ravel() for c in coords ]
+        if dims == 2:                   vals = field.get2D_np(coords[0], coords[1])
+        elif hasattr(field, "get3D_np"): vals = field.get3D_np(coords[0], coords[1], coords[2])
+        else:                           vals = field.get2D_np(coords[0], coords[2])
+        self.grid = np.asarray(vals, dtype=np.float64).reshape((res,)*dims)
+
+    def sample_np(self, pos: np.ndarray) -> np.ndarray:
+        """ Interpolated values at the world positions (n,3) """
+        pos = np.asarray(pos, dtype=np.float64).reshape((-1,3))
+        u = np.clip((pos[:, self.axes] - self.lo) / self.span * (self.res-1), 0, self.res-1)
+        i0 = np.minimum(u.astype(np.int64), self.res-2)
+        t = u - i0
+
+        r = np.zeros(len(pos))
+        for corner in itertools.product((0,1), repeat=self.dims):
+            w = np.prod([ t[:,d] if c else 1-t[:,d] for d,c in enumerate(corner) ], axis=0)
+            r += w * self.grid[tuple( i0[:,d]+c for d,c in enumerate(corner) )]
+        return r
+
+    def get2D(self, x, y):
+        return float(self.get2D_np(np.array([x]), np.array([y]))[0])
+
+    def get2D_np(self, xs, ys):
+        # 3D grids sampled at the middle height
+        xs = np.asarray(xs, dtype=np.float64)
+        mid = self.lo[1] + self.span[1] * 0.5 if self.dims == 3 else 0.0
+        return self.sample_np(np.stack([ xs, np.full(xs.shape, mid), np.asarray(ys, dtype=np.float64) ], axis=-1))
+
+_baked : BAKED = None
+_baked_key : tuple = None
+
+def get_baked(field, lo, hi) -> BAKED|None:
+    """ Baked version of the field over the bounds when enabled, rebaked when the field, its in/out cfg, the bounds or res change """
+    global _baked, _baked_key
+    cfg = getPrefs().resist_cfg
+    if cfg.bake == 'NONE':
+        return None
+
+    dims = 2 if cfg.bake == '2D' else 3
+    key = (field, user_cfg_snapshot(), tuple(lo), tuple(hi), cfg.bake_res, dims)
+    if key != _baked_key:
+        _baked = BAKED(field, lo, hi, cfg.bake_res, dims)
+        _baked_key = key
+        DEV.log_msg(f"baked resistance field: {dims}D res {cfg.bake_res} ({_baked.grid.size} samples)", {"RESIST", "BAKE"})
+    return _baked
+
+def field_R_eval_np(pos: np.ndarray, lo = None, hi = None) -> np.ndarray:
+    """ Current field at the world positions (n,3), through the baked grid when enabled and the bounds are given """
+    field = field_R_current()
+    baked = get_baked(field, lo, hi) if lo is not None else None
+    if baked:
+        return baked.sample_np(pos)
+    return field.get2D_np(pos[:,0], pos[:,2])
+
+#-------------------------------------------------------------------
 
 # field selector
 _fields_map = {
@@ -54,6 +348,21 @@ def field_R_current_switch():
     cfg = getPrefs().resist_cfg
     names = cfg.field.copy()
     field_name = names.pop()
+
+    # invalid formulas or maps keep the previous field
+    if field_name == "FORMULA":
+        try:
+            _field_R_current = get_formula(cfg.formula)
+        except Exception as e:
+            DEV.log_msg(f"invalid resistance formula: {e}", {"RESIST", "ERROR"}, cut=False)
+        return
+    if field_name == "IMAGE":
+        try:
+            _field_R_current = IMAGE(bpy.path.abspath(cfg.image_path), tuple(cfg.image_origin), cfg.image_texel_size,
+                                     cfg.image_raw_width, cfg.image_raw_dtype.lower())
+        except Exception as e:
+            DEV.log_msg(f"invalid resistance map: {e}", {"RESIST", "ERROR"}, cut=False)
+        return
     _field_R_current = _fields_map[field_name]
 
 def field_R_current():
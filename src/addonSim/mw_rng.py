@@ -0,0 +1,105 @@
+import numpy as np
+import bisect
+import itertools
+
+
+# Counter-based random streams for the sim: a draw is a pure function of (seed, stream id, counter)
+# the stream id is the infiltration index, so the sequential sim, the batched engine and the ensemble members draw the same
+# numbers for the same infiltration no matter the call order, batch grouping or number of workers
+# NOTE:: np.random.Generator streams cannot be drawn vectorized across particles, so the SeedSequence only derives the key
+# and the draws are splitmix64 sequences (one per stream) evaluated at the counters
+#-------------------------------------------------------------------
+
+MASK64 = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+MIX1   = 0xBF58476D1CE4E5B9
+MIX2   = 0x94D049BB133111EB
+TO_FLOAT = 2.0**-53
+
+STREAM_RESET = MASK64
+""" Reserved stream id for the random state reset (the infiltrations count up from 0) """
+
+SEED_DISPLAY = 10000
+""" The cfg seed prop is a 32 bit int, so the full seeds are kept as a string and the prop only displays them modulo this """
+
+def new_seed() -> int:
+    """ Fresh OS entropy, 63 bits so it also fits the signed int64 of the checkpoints """
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> np.uint64(1))
+
+def get_cfg_seed(rnd) -> int:
+    """ Seed of the RND_config: the full one while the displayed seed still matches it, otherwise the edited seed """
+    if rnd.seed_full and rnd.seed == int(rnd.seed_full) % SEED_DISPLAY:
+        return int(rnd.seed_full)
+    return rnd.seed
+
+def set_cfg_seed(rnd, seed: int):
+    rnd.seed = seed % SEED_DISPLAY
+    rnd.seed_full = str(seed)
+
+def _mix(z: int) -> int:
+    z = ((z ^ (z >> 30)) * MIX1) & MASK64
+    z = ((z ^ (z >> 27)) * MIX2) & MASK64
+    return z ^ (z >> 31)
+
+def _mix_np(z: np.ndarray) -> np.ndarray:
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX2)
+    return z ^ (z >> np.uint64(31))
+
+#-------------------------------------------------------------------
+
+class SimRNG:
+    """ Root of the sim streams, immutable so snapshot/restore is just the seed (the counters live in the streams) """
+
+    def __init__(self, seed: int|np.random.SeedSequence = None, mod: int = 0):
+        if seed is None: seed = new_seed()
+        self.seed = seed
+        self.mod = mod
+
+        # the mod spawns a sibling sequence instead of burning numbers
+        ss = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        ss = np.random.SeedSequence(ss.entropy, spawn_key=tuple(ss.spawn_key) + (mod,))
+        self.key = int(ss.generate_state(1, np.uint64)[0])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SimRNG) and self.key == other.key
+
+    def stream(self, id: int) -> "RandomStream":
+        return RandomStream(self.stream_key(id))
+
+    def stream_key(self, id: int) -> int:
+        return _mix((self.key + (id & MASK64) * GOLDEN) & MASK64)
+
+    #-------------------------------------------------------------------
+
+    def stream_keys(self, ids: np.ndarray) -> np.ndarray:
+        """ Vectorized stream_key, e.g. one per particle of a batch """
+        ids = np.asarray(ids, dtype=np.uint64)
+        return _mix_np(np.uint64(self.key) + ids * np.uint64(GOLDEN))
+
+    @staticmethod
+    def random_many(keys: np.ndarray, counters: np.ndarray) -> np.ndarray:
+        """ Next float in [0,1) of each stream, the counters (uint64) are incremented in place """
+        counters += np.uint64(1)
+        z = _mix_np(keys + counters * np.uint64(GOLDEN))
+        return (z >> np.uint64(11)).astype(np.float64) * TO_FLOAT
+
+class RandomStream:
+    """ Scalar stream for the sequential sim, same sequence as SimRNG.random_many with the same key """
+    __slots__ = ("key", "counter")
+
+    def __init__(self, key: int, counter: int = 0):
+        self.key = key
+        self.counter = counter
+
+    def random(self) -> float:
+        self.counter += 1
+        return (_mix((self.key + self.counter * GOLDEN) & MASK64) >> 11) * TO_FLOAT
+
+    def choice_index(self, weights: list[float]) -> int:
+        """ Same as random.choices with k=1 but returns the index, raises ValueError when all weights are null """
+        cum = list(itertools.accumulate(weights))
+        total = cum[-1] if cum else 0.0
+        if not total > 0.0:
+            raise ValueError("Total of weights must be greater than zero")
+        return bisect.bisect(cum, self.random() * total, 0, len(cum)-1)
@@ -3,6 +3,7 @@ import bpy.types as types
 import bmesh
 from mathutils import Vector, Matrix
 from math import radians
+import numpy as np
 
 from .preferences import getPrefs
 from .properties_global import (
@@ -20,6 +21,7 @@ from .mw_sim import MW_Sim, SIM_EXIT_FLAG
 from .mw_fract import MW_Fract # could import all from here
 from .mw_resistance import field_R_current
 
+from . import mw_extraction
 from . import utils, utils_scene, utils_trans, utils_mat, utils_mesh
 from . import sv_geom_primitives
 from .utils_mat import GRADIENTS, COLORS
@@ -154,6 +156,73 @@ def gen_arrowObject(obj: types.Object, vdir:Vector, pos:Vector, context: types.C
 
 #-------------------------------------------------------------------
 
+def gen_fract(fract: MW_Fract, obj_root: types.Object, obj_original: types.Object, cfg: MW_gen_cfg, context: types.Context) -> tuple[bool, str]:
+    """ Fill the fract cont, links and sim from the object (cells objects included), returns (error, msg) """
+    prefs = getPrefs()
+
+    DEV.log_msg("Initial object setup", {'SETUP'})
+    if cfg.shape_useConvexHull:
+        # NOTE:: convex hull triangulates the faces... e.g. UV sphere ends with more!
+        obj_toFrac = copy_convex(obj_root, obj_original, context, prefs.names.original_convex, prefs.names.original_dissolve)
+    else: obj_toFrac = obj_original
+
+
+    DEV.log_msg("Start calc faces", {'CALC'})
+    bb, bb_center, bb_radius = utils_trans.get_bb_data(obj_toFrac, cfg.margin_box_bounds)
+    getStats().logDt(f"calc bb: [{bb_center[:]}] r {bb_radius:.3f} (margin {cfg.margin_box_bounds:.4f})")
+    if cfg.shape_useWalls:
+        faces4D = utils_trans.get_faces_4D(obj_toFrac, cfg.margin_face_bounds)
+    else: faces4D = []
+    getStats().logDt(f"calc faces4D: {len(faces4D)} (n_disp {cfg.margin_face_bounds:.4f})")
+
+
+    DEV.log_msg("Start calc points", {'CALC'})
+    mw_extraction.detect_points_from_object(obj_original, cfg, context)
+    points = mw_extraction.get_points_from_object_fallback(obj_original, cfg, context)
+    cfg.source_numFound = len(points)
+    if not points:
+        return True, "found no points..."
+
+    # Limit and rnd a bit the points
+    mw_extraction.points_transformCfg(points, cfg, bb_radius)
+
+    # Add some reference of the points to the scene
+    obj_points = gen_pointsObject(obj_root, points, context, prefs.names.source_points)
+    utils_scene.hide_objectRec(obj_points, prefs.mw_vis.cell_hide_points)
+    gen_boundsObject(obj_root, bb, context, prefs.names.source_wallsBB)
+    getStats().logDt("generated point and bound objects")
+
+
+    DEV.log_msg("Start calc cont", {'CALC', 'CONT'})
+    fract.cont = cont = MW_Cont(obj_root, points, bb, faces4D, precision=cfg.debug_precisionWalls)
+    if not cont.initialized:
+        return True, "found no cont or cells... recalc different params?"
+
+    #test some legacy or statistics cont stuff
+    if DEV.LEGACY_CONT_GEN:
+        gen_cells_LEGACY(cont.voro_cont, obj_root, context)
+        return False, "DEV.LEGACY_CONT_GEN stop..."
+
+    # precalculate/query neighs and other data with generated cells mesh
+    cells = gen_cellsObjects(fract, obj_root, context, scale=obj_root.mw_vis.cell_scale, flipN=cfg.debug_flipCellNormals)
+    cont.precalculations(cells)
+    if not cont.precalculated:
+        return True, "error during container precalculations!"
+
+
+    DEV.log_msg("Start calc links", {'CALC', 'LINKS'})
+    fract.links = links = MW_Links(cont)
+    if not links.initialized:
+        return True, "found no links... recalc different params?"
+
+
+    # create an empty simulation too
+    fract.sim = MW_Sim(fract.cont, fract.links)
+
+    return False, ""
+
+#-------------------------------------------------------------------
+
 def gen_cellsObjects(fract: MW_Fract, root: types.Object, context: types.Context, scale = 1.0, flipN = False):
     prefs = getPrefs()
     prefs.names.fmt_setAmount(len(fract.cont.voro_cont))
@@ -339,6 +408,8 @@ def gen_linksAll(context: types.Context):
     if not MW_global_selected.fract.links or not MW_global_selected.fract.links.initialized:
         return
 
+    # NOTE:: the probabilities shown come from the sim frozen cfg (the one of the last run), a refresh does not change the sim
+
     #vis_cfg : MW_vis_cfg = MW_global_selected.root.mw_vis
     vis_cfg : MW_vis_cfg = getPrefs().mw_vis
 
@@ -901,17 +972,23 @@ def gen_field_R(root: types.Object, context: types.Context, res = 8, smooth = Fa
         obj_field.active_material = utils_mat.gen_gradientMat("id_resist", name, resX, resZ, colorFn=GRADIENTS.lerp_common(COLORS.warm))
         obj_field.active_material.diffuse_color = utils_mat.COLORS.warm
 
-    # Encode resistance in world pos as UV and use texture for vis
+    # Encode resistance in world pos as UV and use texture for vis, evaluated in batch per vertex then spread to the loop corners
     numCornerVerts = len(mesh.loops)
-    id_resist : list[tuple[int,float]] = [None]*numCornerVerts
-    mToWorld = obj_field.matrix_world
-    for id, l in enumerate(mesh.loops):
-        id_normalized = id / float(numCornerVerts)
-        v = mToWorld @ mesh.vertices[l.vertex_index].co
-        id_resist[id]= (id_normalized, field_R_current().get2D(v.x, v.z))
+    verts = np.empty(len(mesh.vertices)*3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", verts)
+    loops_vert = np.empty(numCornerVerts, dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops_vert)
+
+    mToWorld = np.array(obj_field.matrix_world)
+    verts = verts.reshape((-1,3)) @ mToWorld[:3,:3].T + mToWorld[:3,3]
+    resist = field_R_current().get2D_np(verts[:,0], verts[:,2])
+
+    id_resist = np.empty((numCornerVerts, 2), dtype=np.float64)
+    id_resist[:,0] = np.arange(numCornerVerts) / float(numCornerVerts)
+    id_resist[:,1] = resist[loops_vert]
 
     # reset instead of creating!
-    utils_mat.set_meshUV(mesh, mesh.uv_layers.get("id_resist"), id_resist)
+    utils_mat.set_meshUV_np(mesh, mesh.uv_layers.get("id_resist"), id_resist)
 
 def gen_field_mesh(res = 8, name="grid", smooth=False, flipN = False):
     """ Generate a grid plane mesh, stores res, resX, resZ used as custom props """
@@ -1,6 +1,7 @@
 import bpy.types as types
 from mathutils import Vector, Matrix
-import random as rnd
+import numpy as np
+from time import time
 
 from .preferences import getPrefs
 from .properties import (
@@ -8,7 +9,13 @@ from .properties import (
 )
 
 from .mw_cont import MW_Cont
-from .mw_links import MW_Links, Link, LINK_STATE_ENUM, neigh_key_t
+from .mw_links import MW_Links, Link
+from .mw_state import LINK_STATE_ENUM, SIM_EXIT_FLAG, neigh_key_t
+from .mw_sim_batch import EntrySampler, NextAlignCache, MW_SimBatch
+from .mw_rng import SimRNG, STREAM_RESET, new_seed, get_cfg_seed, set_cfg_seed
+from .mw_trace import TraceRecorder
+from .mw_budget import SIM_BUDGET_ENUM, SimBudget
+from .mw_core import SimCfg
 
 from . import utils, utils_trans
 from .utils_trans import VECTORS
@@ -19,73 +26,16 @@ from .stats import getStats
 #-------------------------------------------------------------------
 # IDEA:: bridges neighbours? too aligned wall links, vertically aligned internal -> when broken? cannot go though?
 
-class SIM_EXIT_FLAG:
-    STILL_RUNNING      = -1
-    MAX_DEPTH          = 0
-    NO_WATER           = 1
-    NO_WATER_RND       = 2
-    NO_NEXT_LINK       = 3
-    NO_NEXT_LINK_WALL  = 4
-    NO_ENTRY_LINK      = 5
-    STOP_ON_LINK_BREAK = 6
-    STOP_ON_CELL_BREAK = 7
-
-    all = { MAX_DEPTH, NO_WATER, NO_WATER_RND, NO_NEXT_LINK, NO_NEXT_LINK_WALL, NO_ENTRY_LINK }
-
-    @classmethod
-    def to_str(cls, e:int):
-        if e == cls.STILL_RUNNING:      return "STILL_RUNNING"
-        if e == cls.MAX_DEPTH:          return "MAX_DEPTH"
-        if e == cls.NO_WATER:           return "NO_WATER"
-        if e == cls.NO_WATER_RND:       return "NO_WATER_RND"
-        if e == cls.NO_NEXT_LINK:       return "NO_NEXT_LINK"
-        if e == cls.NO_NEXT_LINK_WALL:  return "NO_NEXT_LINK_WALL"
-        if e == cls.NO_ENTRY_LINK:      return "NO_ENTRY_LINK"
-        if e == cls.STOP_ON_LINK_BREAK: return "STOP_ON_LINK_BREAK"
-        if e == cls.STOP_ON_CELL_BREAK: return "STOP_ON_CELL_BREAK"
-        return "none"
-        #raise ValueError(f"SIM_EXIT_FLAG: {e} is not in {cls.all}")
-    @classmethod
-    def from_str(cls, s:str):
-        if s == "STILL_RUNNING":        return cls.STILL_RUNNING
-        if s == "MAX_DEPTH":            return cls.MAX_DEPTH
-        if s == "NO_WATER":             return cls.NO_WATER
-        if s == "NO_WATER_RND":         return cls.NO_WATER_RND
-        if s == "NO_NEXT_LINK":         return cls.NO_NEXT_LINK
-        if s == "NO_NEXT_LINK_WALL":    return cls.NO_NEXT_LINK_WALL
-        if s == "NO_ENTRY_LINK":        return cls.NO_ENTRY_LINK
-        if s == "STOP_ON_LINK_BREAK":   return cls.STOP_ON_LINK_BREAK
-        if s == "STOP_ON_CELL_BREAK":   return cls.STOP_ON_CELL_BREAK
-        raise ValueError(f"SIM_EXIT_FLAG: {s} is not in {set(SIM_EXIT_FLAG.to_str(s) for s in cls.all)}")
-
-class SubStepData:
-    """ Information per sub step """
-    def __init__(self):
-        self.currentL             : Link        = None
-        self.currentL_deg         : float       = None
-        self.currentL_life        : float       = None
-        self.currentL_candidates  : list[Link]  = None
-        self.currentL_candidatesW : list[float] = None
-        self.water_abs            : float       = None
-        self.water                : float       = None
-
-class StepData:
-    """ Information per step """
-    def __init__(self):
-        self.subs               : list[SubStepData] = list()
-        self.entryL             : Link              = None
-        self.entryL_candidates  : list[Link]        = None
-        self.entryL_candidatesW : list[float]       = None
-        self.exitL              : Link              = None
-        self.break_flag         : int               = SIM_EXIT_FLAG.STILL_RUNNING
-
 #-------------------------------------------------------------------
 
 class MW_Sim:
     def __init__(self, cont: MW_Cont, links: MW_Links):
-        self.cfg : MW_sim_cfg = cont.root.mw_sim
+        self.cfg = cont.root.mw_sim
         self.cont : MW_Cont = cont
         self.links : MW_Links = links
+        self.entry_sampler = EntrySampler(links)
+        self.next_align = NextAlignCache(links)
+        self.rnd_restore()
 
         # empty trace data
         self.step_reset()
@@ -93,24 +43,40 @@ class MW_Sim:
 
     #-------------------------------------------------------------------
 
+    @property
+    def cfg(self) -> MW_sim_cfg:
+        return self._cfg
+    @cfg.setter
+    def cfg(self, cfg: MW_sim_cfg):
+        """ Set the props, the operators do it after copying new ones so the frozen snapshot is rebuilt too """
+        self._cfg = cfg
+        self.cfg_snapshot()
+
+    def cfg_snapshot(self):
+        """ Frozen values read per step, accessing the props goes through RNA and was a large share of the substep time
+            * the rest of the props (logs, budget, seed...) are only read once per run
+        """
+        self.cfg_frozen : SimCfg = SimCfg.from_props(self._cfg)
+        self.trace_on = self._cfg.debug_log_trace
+        self.trace_candidates = self._cfg.debug_log_trace_candidates
+
+    #-------------------------------------------------------------------
+
     def rnd_store(self):
-        #self.rndState = rnd.getstate()
-        s = None if self.cfg.debug_rnd.seed_regen else self.cfg.debug_rnd.seed
-        self.cfg.debug_rnd.seed = utils.rnd_reset_seed(s)
+        # optionally a new seed per OP call, stored in the cfg
+        if self.cfg.debug_rnd.seed_regen or self.cfg.debug_rnd.seed < 0:
+            set_cfg_seed(self.cfg.debug_rnd, new_seed())
+        self.rnd_restore()
 
     def rnd_restore(self):
-        # NOTE:: just call some amount of randoms to modify seed, could modify state but requires copying a 600 elemnt tuple
-        #rnd.setstate(self.rndState)
-        self.cfg.debug_rnd.seed = utils.rnd_reset_seed(self.cfg.debug_rnd.seed, self.cfg.debug_rnd.seed_mod)
+        # NOTE:: the streams are keyed by the infiltration index (step_id), so restoring the step_id and the seed is enough
+        seed = get_cfg_seed(self.cfg.debug_rnd)
+        self.rng = SimRNG(seed if seed >= 0 else None, self.cfg.debug_rnd.seed_mod)
 
     def backup_state(self):
-        # delegate backup to the links
-        for key in self.links.links_graph.nodes():
-            l = self.links.get_link(key)
-            l.backupState()
-
-        # store cells state too
-        self.cont.backupState()
+        # start journaling the links and cells modified from now on, instead of copying all
+        self.links.storage.journal_start()
+        self.cont.journal_start()
 
         # store random too
         self.rnd_store()
@@ -119,15 +85,13 @@ class MW_Sim:
         self.back_step_id = self.step_id
 
     def backup_state_restore(self):
-        # restore all
-        for key in self.links.links_graph.nodes():
-            l = self.links.get_link(key)
-            l.backupState_restore()
-        self.cont.backupState_restore()
+        # replay the journals back, only the touched links and cells
+        links = self.links.storage.journal_restore()
+        cells = self.cont.journal_restore()
         self.rnd_restore()
 
-        # global recalculation including graphs
-        self.links.comps_recalc()
+        # partial recalculation around the restored elements
+        self.links.comps_restore(cells, links)
 
         # restore some sim props
         self.step_id = self.back_step_id
@@ -143,10 +107,8 @@ class MW_Sim:
         self.step_reset_trace()
 
     def state_reset(self, life=1.0, picks=0):
-        # modify links direclty
-        for key in self.links.links_graph.nodes():
-            l = self.links.get_link(key)
-            l.reset(life, picks)
+        # modify links storage direclty
+        self.links.storage.reset(life, picks)
 
         # reset cells
         self.cont.reset()
@@ -155,10 +117,10 @@ class MW_Sim:
         self.links.comps_recalc()
 
     def state_reset_rnd(self, min_val=0, max_val=1, max_picks = 8, max_entry = 8):
-        # modify links direclty
-        for key in self.links.links_graph.nodes():
-            l = self.links.get_link(key)
-            r = lambda : rnd.random() * (max_val-min_val) + min_val
+        # modify links direclty, reserved stream so the infiltrations streams are not affected
+        stream = self.rng.stream(STREAM_RESET)
+        for l in self.links.link_views:
+            r = lambda : stream.random() * (max_val-min_val) + min_val
             life = r()
             picks = int(r()*max_picks)
             entry = int(r()*self.get_entryProbability(l)*max_entry)
@@ -173,7 +135,7 @@ class MW_Sim:
     def step_reset(self):
         self.currentL   : Link  = None
         self.prevL      : Link  = None
-        self.water      : float = self.cfg.water__start
+        self.water      : float = self.cfg_frozen.water__start
         self.water_abs  : float = 0
 
         self.entryL     : Link  = None
@@ -182,9 +144,16 @@ class MW_Sim:
 
     def step_reset_trace(self):
         self.step_id = self.step_depth = -1
-        self.trace_data : list[StepData] = list()
-        self.step_trace : StepData       = None
-        self.sub_trace  : SubStepData    = None
+        self.trace : TraceRecorder = None
+        self.trace_reset()
+
+    def trace_reset(self):
+        # keep the buffers unless the capacity changed
+        capacity = self.cfg.debug_log_trace_capacity
+        if self.trace is None or self.trace.capacity != capacity:
+            self.trace = TraceRecorder(capacity, capacity * self.cfg.debug_log_trace_capacity_candidates)
+        else:
+            self.trace.clear()
 
     def step_log_ui(self):
         s = f"({self.step_id},{self.step_depth}) : {SIM_EXIT_FLAG.to_str(self.exit_flag)} - w:{self.water:.2f}"
@@ -192,18 +161,79 @@ class MW_Sim:
 
     #-------------------------------------------------------------------
 
+    def run_iter(self, num: int):
+        """ Run num infiltrations (batched or not as set in the cfg), yields the infiltrations done after each step/batch
+            * the caller can stop anytime (e.g. a modal operator), check exit_flag after for NO_ENTRY_LINK
+        """
+        cfg = self.cfg
+
+        # batched alternative, all infiltrations run vectorized
+        if cfg.step_batch and not cfg.debug_util_uniformDeg:
+            # NOTE:: the particles are not stepped one by one so there are no trace rows to record
+            if self.trace_on:
+                DEV.log_msg(f"trace not recorded by the batched sim, disable step_batch to trace", {"SIM", "TRACE", "ERROR"}, cut=False)
+            yield from MW_SimBatch(self.links, self.cfg_frozen, self).run_iter(num, cfg.step_batch_size, log=cfg.debug_log)
+            return
+
+        for step_id in range(num):
+            # still alive msg
+            if cfg.debug_log_everyIters and step_id%cfg.debug_log_everyIters == 0:
+                DEV.log_msg(f"// ({step_id}) running...", {'SIM'})
+
+            log_step = cfg.debug_log and step_id+1 > num-cfg.debug_log_lastIters
+            if not cfg.debug_util_uniformDeg: self.step(log_step)
+            else: self.step_degradeAll() # alternative see erosion on all
+            yield step_id+1
+
+            # no entry link due to direction, or skip the rest of steps
+            if self.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK or self.exit_flag >= SIM_EXIT_FLAG.STOP_ON_LINK_BREAK:
+                break
+
+    def get_budget(self, slice_s: float) -> SimBudget|None:
+        """ Budget set in the cfg, None for the plain step_infiltrations run """
+        cfg = self.cfg
+        if cfg.step_budget == SIM_BUDGET_ENUM.COUNT: return None
+        elif cfg.step_budget == SIM_BUDGET_ENUM.TIME: limit = cfg.step_budget_time
+        elif cfg.step_budget == SIM_BUDGET_ENUM.LINKS: limit = cfg.step_budget_links
+        else: limit = cfg.step_budget_air
+        return SimBudget(cfg.step_budget, limit, cfg.step_budget_time, slice_s)
+
+    def run_budget_iter(self, budget: SimBudget):
+        """ Run chunks of infiltrations until the budget is spent, yields the infiltrations done after each chunk
+            * the chunks are sized from the measured steps/s to take about a slice, so the goal is checked at a steady pace
+            # NOTE:: batched chunks smaller than the batch size resolve the breaks more often (the draws stay the same)
+        """
+        budget.start(self)
+        while not budget.reached(self):
+            n = budget.next_chunk()
+            t = time()
+            done = 0
+            for done in self.run_iter(n):
+                pass
+            budget.update(done, time() - t)
+            yield budget.done
+
+            if self.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK or self.exit_flag >= SIM_EXIT_FLAG.STOP_ON_LINK_BREAK:
+                break
+
+        DEV.log_msg(f"budget: {budget.get_log_ui(self)}", {'SIM', 'BUDGET'})
+
     def step_degradeAll(self):
-        for l in self.links.internal:
-            l.degrade(self.cfg.link_deg)
+        # journal all at once, then degrade the storage directly (links listed once per side are degraded twice, as before)
+        s = self.links.storage
+        ids = self.links.frontier.get_ids_internal()
+        s.journal_touch_many(ids)
+        np.subtract.at(s.life, ids, self.cfg_frozen.link_deg)
 
     def step(self, log_step):
         self.step_reset()
         self.step_id += 1
+        self.stream = self.rng.stream(self.step_id)
 
         # LOG: config/limit logs
         self.logs_cutmsg_disabled_prev = DEV.logs_cutmsg_disabled
         self.log = log_step
-        self.log_trace = self.log and self.cfg.debug_log_trace
+        self.log_trace = self.log and self.trace_on
         log_links_prev = self.links.log
         self.links.log = self.log
         DEV.logs_cutmsg_disabled = True
@@ -213,10 +243,11 @@ class MW_Sim:
             DEV.log_msg_sep(DEV.logs_cutmsg * 0.75)
             DEV.log_msg(f" > ({self.step_id}) : starting water {self.water}", {"SIM", "STEP"})
 
-        # TRACE: writing the full trace slows down the process, even more when print to console!
-        if (self.log_trace):
-            self.step_trace = StepData()
-            self.trace_data.append(self.step_trace)
+        # TRACE: preallocated columns, printing to console is still slow
+        if self.trace_on:
+            if self.trace.capacity != self.cfg.debug_log_trace_capacity:
+                self.trace_reset()
+            self.trace.next_row(self.step_id, -1)
 
 
         # get entry
@@ -229,9 +260,8 @@ class MW_Sim:
             DEV.log_msg(f" > ({self.step_id}) : {self.currentL}", {"SIM", "ENTRY" })
         # TRACE: log entry
         if self.log_trace:
-            DEV.log_msg(f" >>> ENTRY CANDIDATES len({len(self.step_trace.entryL_candidates)})", {"SIM", "ENTRY"})
-            for (l,w) in zip(self.step_trace.entryL_candidates, self.step_trace.entryL_candidatesW):
-                DEV.log_msg(f"      [{w:.2f}] {l}", {"SIM", "ENTRY", "TRACE"})
+            DEV.log_msg(f" >>> ENTRY CANDIDATES len({self.trace.cand_len[self.trace.row]})", {"SIM", "ENTRY"})
+            self.trace_log_candidates(self.trace.row, {"SIM", "ENTRY", "TRACE"})
 
 
         # main loop with a break condition
@@ -246,10 +276,6 @@ class MW_Sim:
                 for i,(k,w) in enumerate(self.step_path):
                     DEV.log_msg(f"      [{i}] {self.links.get_link(k)} - w:{w:.2f}", {"SIM", "PATH"})
 
-        # TRACE: exitL
-        if self.cfg.debug_log_trace:
-            self.step_trace.exitL = self.currentL
-
         # LOG: exit cfg
         if self.log:
             DEV.log_msg_sep(DEV.logs_cutmsg * 0.75)
@@ -265,10 +291,9 @@ class MW_Sim:
         while self.check_continue():
             self.step_depth += 1
 
-            # TRACE: build step
-            if (self.cfg.debug_log_trace):
-                self.sub_trace = SubStepData()
-                self.step_trace.subs.append(self.sub_trace)
+            # TRACE: new row
+            if self.trace_on:
+                self.trace.next_row(self.step_id, self.step_depth)
 
             # choose next link to propagate
             self.get_nextLink()
@@ -280,36 +305,35 @@ class MW_Sim:
 
                 # TRACE: log step
                 if self.log_trace:
+                    t, row = self.trace, self.trace.row
                     DEV.log_msg(f" > ({self.step_id},{self.step_depth})"
-                                f" : {self.sub_trace.currentL}, n{len(self.sub_trace.currentL_candidates)}"
-                                f" - dw({self.sub_trace.water_abs:.3f}) dl({self.sub_trace.currentL_deg:.3f}) : w({self.sub_trace.water:.3f})"
-                                #f" : n{len(self.sub_trace.currentL_candidates)} {self.sub_trace.currentL_candidatesW[:32]}"
+                                f" : {self.currentL}, n{t.cand_len[row]}"
+                                f" - dw({t.water_abs[row]:.3f}) dl({t.deg[row]:.3f}) : w({t.water[row]:.3f})"
                                 ,{"SIM", "NEXT", "TRACE"})
-                    if self.cfg.debug_log_trace_candidates:
-                        for (l,w) in zip(self.sub_trace.currentL_candidates, self.sub_trace.currentL_candidatesW):
-                            DEV.log_msg(f"      [{w:.2f}] {l}", {"SIM", "NEXT", "TRACE"})
+                    self.trace_log_candidates(row, {"SIM", "NEXT", "TRACE"})
+
+    def trace_log_candidates(self, row: int, tags: set):
+        cands = self.trace.get_candidates(row)
+        if cands is None:
+            return
+        views = self.links.link_views
+        for id,w in zip(*cands):
+            DEV.log_msg(f"      [{w:.2f}] {views[id]}", tags)
 
     #-------------------------------------------------------------------
     #  https://docs.python.org/dev/library/random.html#random.choices
 
     def get_entryLink(self):
-        candidates = self.links.external
+        # maintained sampler over the external links, only updated when the frontier or the entry cfg change
+        sampler = self.entry_sampler
+        sampler.update(self.cfg_frozen)
 
-        # candidates not found
-        if not candidates:
-            self.entryL = None
-            prob_weights = []
-
-        # rnd.choices may fail due to all prob_weights being null etc
-        else:
-            prob_weights = [ self.get_entryProbability(l) for l in candidates ]
-            try:
-                picks = rnd.choices(candidates, prob_weights)
-                self.entryL = picks[0]
-                self.entryL.picks_entry +=1
-
-            except ValueError as e:
-                self.entryL = None
+        # no candidates or all prob weights being null etc
+        self.entryL = None
+        if sampler.total() > 0:
+            id = sampler.sample(self.stream.random())
+            self.entryL = self.links.link_views[id]
+            self.entryL.picks_entry +=1
 
         # found an entry
         if self.entryL:
@@ -317,11 +341,15 @@ class MW_Sim:
 
         self.infiltration_buildPath()
 
-        # TRACE: build entry
-        if self.cfg.debug_log_trace:
-            self.step_trace.entryL = self.entryL
-            self.step_trace.entryL_candidates = candidates
-            self.step_trace.entryL_candidatesW = prob_weights
+        # TRACE: entry row, the candidates are the external links with weight
+        if self.trace_on:
+            t, row = self.trace, self.trace.row
+            if self.entryL:
+                t.link[row] = self.entryL.id
+            t.water[row] = self.water
+            w = sampler.sampler.weights
+            ids = np.flatnonzero(w)
+            t.set_candidates(ids, w[ids], self.trace_candidates)
 
     def get_entryProbability(self, l:Link):
         # link dir align (face normal)
@@ -329,30 +357,33 @@ class MW_Sim:
         p = a
 
         # weight using face area (normalized)
-        if not self.cfg.debug_skip_entry_area:
+        if not self.cfg_frozen.debug_skip_entry_area:
             p*= l.areaFactor
 
         return p
 
     def get_entryAlign(self, vdir:Vector, bothDir=False):
-        # relative position water dir
-        water_dir_inv = -self.cfg.dir_entry.normalized()
-        a = vdir.dot(water_dir_inv)
+        # relative position water dir (precomputed inverted and normalized)
+        cfg = self.cfg_frozen
+        a = vdir.dot(cfg.dir_entry_inv)
         if bothDir: a = abs(a)
 
         # cut-off
-        if a < self.cfg.dir_entry_minAlign:
+        if a < cfg.dir_entry_minAlign:
             return 0
 
         # normalize including potential negative align
-        a_norm = (a - self.cfg.dir_entry_minAlign) / (1.0 - self.cfg.dir_entry_minAlign)
+        a_norm = (a - cfg.dir_entry_minAlign) * cfg.dir_entry_minAlign_inv
         return a_norm
 
     #-------------------------------------------------------------------
 
     def get_nextLink(self):
-        # merge neighs, the water could scape to the outer surface
-        candidates = self.links.get_link_neighs(self.currentL.key_cells)
+        # merge neighs, the water could scape to the outer surface (static CSR adjacency by link id)
+        views = self.links.link_views
+        start, end = self.links.neighs_offsets[self.currentL.id : self.currentL.id+2].tolist()
+        candidates = [ views[i] for i in self.links.neighs_ids[start:end].tolist() ]
+        aligns = self.next_align.get(self.cfg_frozen)[start:end].tolist()
 
         ## drop prev from candidates? implicit by gravity direction
         #if self.prevL: candidates -= [self.prevL]
@@ -362,13 +393,12 @@ class MW_Sim:
             self.currentL = None
             prob_weights = []
 
-        # rnd.choices may fail due to all prob_weights being null etc
+        # the choice may fail due to all prob_weights being null etc
         else:
-            prob_weights = [ self.get_nextProbability(l) for l in candidates ]
+            prob_weights = [ self.get_nextProbability(l, a) for l,a in zip(candidates, aligns) ]
             self.prevL = self.currentL
             try:
-                picks = rnd.choices(candidates, prob_weights)
-                self.currentL = picks[0]
+                self.currentL = candidates[self.stream.choice_index(prob_weights)]
                 self.currentL.picks += 1
 
             except ValueError as e:
@@ -377,46 +407,50 @@ class MW_Sim:
         self.infiltration_buildPath()
 
         # TRACE: build next
-        if self.cfg.debug_log_trace:
-            self.sub_trace.currentL = self.currentL
-            self.sub_trace.currentL_candidates = candidates
-            self.sub_trace.currentL_candidatesW = prob_weights
+        if self.trace_on:
+            t, row = self.trace, self.trace.row
+            if self.currentL:
+                t.link[row] = self.currentL.id
+            t.set_candidates([ l.id for l in candidates ], prob_weights, self.trace_candidates)
+
+    def get_nextProbability(self, l:Link, a:float = None):
+        cfg = self.cfg_frozen
 
-    def get_nextProbability(self, l:Link):
         # links hanging in the air are not valid (rare case)
         if not self.links.solid_link_check(l):
             return 0
 
-        # relative pos align
-        dpos = l.pos - self.currentL.pos
-        a = self.get_nextAlign(dpos.normalized())
-        p = a * self.cfg.link_next_dir_weight
+        # relative pos align, static so usually precomputed per edge
+        if a is None:
+            dpos = l.pos - self.currentL.pos
+            a = self.get_nextAlign(dpos.normalized())
+        p = a * cfg.link_next_dir_weight
 
         # weight by link resistance field
         if l.state == LINK_STATE_ENUM.SOLID:
             r = self.link_resistance(l)
-            if not self.cfg.debug_skip_next_maxResist:
+            if not cfg.debug_skip_next_maxResist:
                 r = min(r, 0.999)
             p *= 1-r
 
         # weight the probability of air links
         if l.state != LINK_STATE_ENUM.SOLID:
-            p *= self.cfg.link_next_exit_avoidance
+            p *= cfg.link_next_exit_avoidance
 
         return p
 
     def get_nextAlign(self, vdir:Vector, bothDir=False):
-        # relative pos align
-        water_dir_inv = self.cfg.dir_next.normalized()
-        a = vdir.normalized().dot(water_dir_inv)
+        # relative pos align (precomputed normalized)
+        cfg = self.cfg_frozen
+        a = vdir.normalized().dot(cfg.dir_next_normalized)
         if bothDir: a = abs(a)
 
         # cut-off
-        if a < self.cfg.dir_next_minAlign:
+        if a < cfg.dir_next_minAlign:
             return 0
 
         # normalize including potential negative align
-        a_norm = (a - self.cfg.dir_next_minAlign) / (1.0 - self.cfg.dir_next_minAlign)
+        a_norm = (a - cfg.dir_next_minAlign) * cfg.dir_next_minAlign_inv
         return a_norm
 
     #-------------------------------------------------------------------
@@ -426,7 +460,7 @@ class MW_Sim:
         r = max(l.life, 0.0)
 
         # mod by the resistance field at its center
-        r *= l.resistance * self.cfg.link_resist_weight
+        r *= l.resistance * self.cfg_frozen.link_resist_weight
 
         ## also consider area factor so area size affects the resistance opposed?
         #if self.cfg.debug_skip_next_area:
@@ -438,7 +472,7 @@ class MW_Sim:
         if self.currentL.state == LINK_STATE_ENUM.SOLID:
 
             # degradation depends on water abs but distributed over the link surface (cancels out area)
-            d = self.water_abs * self.cfg.link_deg / self.currentL.areaFactor
+            d = self.water_abs * self.cfg_frozen.link_deg / self.currentL.areaFactor
 
             # apply degradation -> potential break
             self.currentL.degrade(d)
@@ -451,22 +485,23 @@ class MW_Sim:
                 breaking = self.links.setState_link_check(self.currentL.key_cells, LINK_STATE_ENUM.AIR)
 
                 # stop simulation on break
-                if self.cfg.step_stopBreak:
-                    if "LINK" in self.cfg.step_stopBreak_event:
+                if self.cfg_frozen.step_stopBreak:
+                    if "LINK" in self.cfg_frozen.step_stopBreak_event:
                         self.exit_flag = SIM_EXIT_FLAG.STOP_ON_LINK_BREAK
-                    elif "CELL" in self.cfg.step_stopBreak_event:
+                    elif "CELL" in self.cfg_frozen.step_stopBreak_event:
                         if breaking:
                             self.exit_flag = SIM_EXIT_FLAG.STOP_ON_CELL_BREAK
 
         # TRACE: link deg
-        if self.cfg.debug_log_trace:
-            self.sub_trace.currentL_deg = d
-            self.sub_trace.currentL_life = self.currentL.life
+        if self.trace_on:
+            self.trace.deg[self.trace.row] = d
+            self.trace.life[self.trace.row] = self.currentL.life
 
     def link_rnd_break_event(self):
-        if self.currentL.life < self.cfg.link_rnd_break_minCheck:
-            minLife = self.currentL.life / self.cfg.link_rnd_break_minCheck
-            if minLife * self.cfg.link_rnd_break_resistProb < rnd.random():
+        cfg = self.cfg_frozen
+        if self.currentL.life < cfg.link_rnd_break_minCheck:
+            minLife = self.currentL.life / cfg.link_rnd_break_minCheck
+            if minLife * cfg.link_rnd_break_resistProb < self.stream.random():
                 if self.log: DEV.log_msg(f" *** ({self.step_id}) : link_rnd_break_event L{self.currentL}", {"SIM", "EVENT"})
                 return True
         return False
@@ -477,13 +512,13 @@ class MW_Sim:
 
             # minimun abs that happens when the water runs through a exterior face or an eroded interior one
             if self.currentL.state != LINK_STATE_ENUM.SOLID:
-                wa = self.cfg.water_abs_air * self.currentL.areaFactor
+                wa = self.cfg_frozen.water_abs_air * self.currentL.areaFactor
                 w = wa
 
             # interior solid abs takes into account resistance too
             else:
-                wr = self.link_resistance(self.currentL) * self.cfg.water_deg
-                wa = self.cfg.water_abs_solid * self.currentL.areaFactor
+                wr = self.link_resistance(self.currentL) * self.cfg_frozen.water_deg
+                wa = self.cfg_frozen.water_abs_solid * self.currentL.areaFactor
                 w = wa + wr
 
             # abs water
@@ -495,19 +530,20 @@ class MW_Sim:
                 self.water = 0
 
         # TRACE: water abs
-        if self.cfg.debug_log_trace:
-            self.sub_trace.water_abs = self.water_abs
-            self.sub_trace.water = self.water
+        if self.trace_on:
+            self.trace.water_abs[self.trace.row] = self.water_abs
+            self.trace.water[self.trace.row] = self.water
 
     def water_rnd_abs_event(self):
-        if self.water < self.cfg.water_rnd_abs_minCheck:
-            minAbsorb = self.water / self.cfg.water_rnd_abs_minCheck
-            if minAbsorb * self.cfg.water_rnd_abs_continueProb < rnd.random():
+        cfg = self.cfg_frozen
+        if self.water < cfg.water_rnd_abs_minCheck:
+            minAbsorb = self.water / cfg.water_rnd_abs_minCheck
+            if minAbsorb * cfg.water_rnd_abs_continueProb < self.stream.random():
                 self.exit_flag = SIM_EXIT_FLAG.NO_WATER_RND
                 if self.log: DEV.log_msg(f" *** ({self.step_id}) : water_rnd_abs_event w:{self.water}", {"SIM", "EVENT"})
 
                 # consider how much water was abs
-                self.water_abs = self.cfg.water_rnd_abs_damage * self.water
+                self.water_abs = cfg.water_rnd_abs_damage * self.water
                 self.water -= self.water_abs
                 return True
 
@@ -535,7 +571,7 @@ class MW_Sim:
                 self.exit_flag = SIM_EXIT_FLAG.NO_WATER
 
             # max iterations when enabled
-            elif self.cfg.step_maxDepth != -1 and self.step_depth >= self.cfg.step_maxDepth-1:
+            elif self.cfg_frozen.step_maxDepth != -1 and self.step_depth >= self.cfg_frozen.step_maxDepth-1:
                 self.exit_flag = SIM_EXIT_FLAG.MAX_DEPTH
 
         # the flag could be potentially set at other steps: link break, water rnd abs...
@@ -544,14 +580,14 @@ class MW_Sim:
     def check_exit_flag(self):
         # found msg means exit condition was met
         if self.exit_flag != SIM_EXIT_FLAG.STILL_RUNNING:
-            # TRACE: keep msg per trace
-            if self.cfg.debug_log_trace:
-                self.step_trace.break_flag = self.exit_flag
+            # TRACE: exit flag at the last row of the step
+            if self.trace_on:
+                self.trace.set_exit_flag(self.exit_flag)
 
             # set the log for at least the last iter
             if self.exit_flag >= SIM_EXIT_FLAG.STOP_ON_LINK_BREAK:
                 self.log = True
-                self.log_trace = self.cfg.debug_log_trace
+                self.log_trace = self.trace_on
 
             return False
 
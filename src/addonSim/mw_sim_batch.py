@@ -0,0 +1,410 @@
+import numpy as np
+
+from .mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM, SIM_EXIT_FLAG
+
+from .fenwick import FenwickSampler
+from .mw_rng import SimRNG
+from .utils_dev import DEV
+from .stats import getStats
+
+
+#-------------------------------------------------------------------
+
+class EntrySampler:
+    """ Maintained weighted sampler over the external links, indexed by link id
+        * the weights only change with the frontier (links.frontier_version) or the entry config, otherwise picks are O(log E)
+        * on frontier changes only the differing weights are updated (restores can also flip link dirs so all are recomputed)
+    """
+
+    def __init__(self, links):
+        self.links = links
+        self.sampler = FenwickSampler(len(links.storage.keys_cells))
+        self.key = None
+
+    @staticmethod
+    def get_probabilities(links, cfg, ids: np.ndarray) -> np.ndarray:
+        """ Vectorized MW_Sim.get_entryProbability """
+        s = links.storage
+        water_dir_inv = -np.array(cfg.dir_entry, dtype=np.float64)
+        water_dir_inv /= max(np.linalg.norm(water_dir_inv), 1e-12)
+
+        # link dir align (face normal), normalized including potential negative align
+        a = s.dir[ids] @ water_dir_inv
+        p = np.where(a < cfg.dir_entry_minAlign, 0.0, (a - cfg.dir_entry_minAlign) / (1.0 - cfg.dir_entry_minAlign))
+
+        # weight using face area (normalized)
+        if not cfg.debug_skip_entry_area:
+            p *= s.areaFactor[ids]
+        return p
+
+    def update(self, cfg):
+        """ Check the frontier version and the entry config, then update the weights that changed """
+        cfg_key = (tuple(cfg.dir_entry), cfg.dir_entry_minAlign, cfg.debug_skip_entry_area)
+        key = (self.links.frontier_version, cfg_key)
+        if key == self.key:
+            return
+
+        # external links weighted by multiplicity (a link could be listed twice)
+        ids = self.links.get_external_ids()
+        w = np.zeros(self.sampler.size, dtype=np.float64)
+        if ids.size:
+            count = np.bincount(ids, minlength=self.sampler.size).astype(np.float64)
+            unique = np.flatnonzero(count)
+            w[unique] = self.get_probabilities(self.links, cfg, unique) * count[unique]
+
+        if self.key is None or self.key[1] != cfg_key:
+            self.sampler.rebuild(w)
+        else:
+            changed = np.flatnonzero(w != self.sampler.weights)
+            self.sampler.update_many(changed, w[changed])
+        self.key = key
+
+    def total(self) -> float:
+        return self.sampler.total()
+
+    def sample(self, u: float) -> int:
+        return self.sampler.sample(u)
+
+    def sample_many(self, u: np.ndarray) -> np.ndarray|None:
+        return self.sampler.sample_many(u)
+
+class NextAlignCache:
+    """ Static direction term of the next link probability per CSR adjacency edge
+        * only depends on the links position and the next dir cfg, so it is recomputed only when those change
+        * indexed like links.neighs_ids, so the candidates of link id are [neighs_offsets[id], neighs_offsets[id+1])
+    """
+
+    def __init__(self, links):
+        self.links = links
+        self.align : np.ndarray = None
+        self.key = None
+
+    @staticmethod
+    def get_align(links, cfg) -> np.ndarray:
+        """ Vectorized MW_Sim.get_nextAlign of the relative position of each edge """
+        s = links.storage
+        src = np.repeat(np.arange(len(links.neighs_offsets)-1), np.diff(links.neighs_offsets))
+        dpos = s.pos[links.neighs_ids] - s.pos[src]
+        norm = np.linalg.norm(dpos, axis=1)
+
+        water_dir = np.array(cfg.dir_next, dtype=np.float64)
+        water_dir /= max(np.linalg.norm(water_dir), 1e-12)
+        a = (dpos @ water_dir) / np.where(norm > 0, norm, 1.0)
+
+        # cut-off and normalize including potential negative align
+        return np.where(a < cfg.dir_next_minAlign, 0.0, (a - cfg.dir_next_minAlign) / (1.0 - cfg.dir_next_minAlign))
+
+    def get(self, cfg) -> np.ndarray:
+        key = (tuple(cfg.dir_next), cfg.dir_next_minAlign)
+        if key != self.key:
+            self.align = self.get_align(self.links, cfg)
+            self.key = key
+        return self.align
+
+#-------------------------------------------------------------------
+
+class MW_SimBatch:
+    """ Lock-step batched infiltrations: advance N water particles per numpy pass
+        * same model as MW_Sim.step but entry/next sampling, water abs and link deg are vectorized over the batch
+        * the topology (link and cell states) is frozen during a batch, broken links are resolved between batches in link id order
+        * links reaching life <= 0 mid batch oppose no resistance but are still SOLID until the batch ends
+        # NOTE:: results are statistically equivalent to the sequential sim, not identical (the order of events differs)
+        # NOTE:: free of bpy, links/cfg are duck typed so the headless ensemble can also run it (sim only receives the UI state)
+    """
+
+    def __init__(self, links, cfg, sim = None):
+        self.links = links
+        self.cfg   = cfg
+        self.sim   = sim
+        self.entry_sampler = sim.entry_sampler if sim else EntrySampler(links)
+        self.next_align = sim.next_align if sim else NextAlignCache(links)
+
+        # batch stats
+        self.exit_flags : dict[int, int] = dict()
+        self.broken_links = 0
+        self.broken_cells = False
+        self.infiltrations = 0
+        self.depth_total = 0
+        self.flag = SIM_EXIT_FLAG.STILL_RUNNING
+
+    #-------------------------------------------------------------------
+
+    def run(self, num: int, batch_size: int, log = False, rng: SimRNG = None) -> int:
+        """ Run num infiltrations in batches, returns the last batch exit flag (only meaningful on stop/no entry) """
+        for _ in self.run_iter(num, batch_size, log, rng):
+            pass
+        return self.flag
+
+    def run_iter(self, num: int, batch_size: int, log = False, rng: SimRNG = None):
+        """ Same as run but yields the infiltrations done after each batch, e.g. to run time-sliced from a modal operator """
+        stats = getStats()
+        self.exit_flags = { flag: 0 for flag in SIM_EXIT_FLAG.all | {SIM_EXIT_FLAG.STOP_ON_LINK_BREAK, SIM_EXIT_FLAG.STOP_ON_CELL_BREAK} }
+        self.broken_links = 0
+        self.broken_cells = False
+        self.infiltrations = 0
+        self.depth_total = 0
+
+        # by default the sim streams so the sim seed config (rnd_store/rnd_restore) also applies
+        self.rng = rng if rng is not None else self.sim.rng if self.sim else SimRNG()
+
+        self.flag = SIM_EXIT_FLAG.STILL_RUNNING
+        done = 0
+        while done < num:
+            n = min(batch_size, num-done)
+            self.flag = self.run_batch(n)
+            done += n
+
+            if log: DEV.log_msg(f"batch ({done}/{num}) : broken links {self.broken_links}, cells {self.broken_cells}", {"SIM", "BATCH"})
+            yield done
+            if self.flag in { SIM_EXIT_FLAG.NO_ENTRY_LINK, SIM_EXIT_FLAG.STOP_ON_LINK_BREAK, SIM_EXIT_FLAG.STOP_ON_CELL_BREAK }:
+                break
+
+        stats.logDt(f"batched infiltrations: {done} / {num} (batch size {batch_size})")
+        if log: DEV.log_msg(f"exit flags: { {SIM_EXIT_FLAG.to_str(f):c for f,c in self.exit_flags.items() if c} }", {"SIM", "BATCH"}, cut=False)
+
+    def run_batch(self, n: int) -> int:
+        """ Simulate n infiltrations in lock-step, then resolve the link breaks """
+        cfg = self.cfg
+        s = self.links.storage
+        sim = self.sim
+        if sim: sim.step_reset()
+
+        # one stream per particle keyed by its infiltration index, so the draws do not depend on the batch grouping
+        first = sim.step_id+1 if sim else self.infiltrations
+        self.keys = self.rng.stream_keys(np.arange(first, first+n))
+        self.counters = np.zeros(n, dtype=np.uint64)
+
+        # get entries (entry links are not degraded, the water starts moving from there)
+        cur = self.get_entryLinks(n)
+        if cur is None:
+            if sim: sim.exit_flag = SIM_EXIT_FLAG.NO_ENTRY_LINK
+            self.exit_flags[SIM_EXIT_FLAG.NO_ENTRY_LINK] += n
+            return SIM_EXIT_FLAG.NO_ENTRY_LINK
+        entry = cur[n-1]
+        self.infiltrations += n
+
+        # particles state
+        water = np.full(n, cfg.water__start, dtype=np.float64)
+        exit_flag = np.full(n, SIM_EXIT_FLAG.STILL_RUNNING, dtype=np.int8)
+        alive = np.arange(n)
+        broken = []
+
+        # keep the path of the last particle of the batch for the visualization
+        tracked = n-1
+        path = [ (s.keys_cells[cur[tracked]], float(water[tracked])) ]
+
+        # cells state only changes between batches
+        cells_state = np.array(self.links.cont.cells_state, dtype=np.int64)
+
+        depth = -1
+        while alive.size:
+            depth += 1
+
+            # choose next link to propagate
+            cur_alive = cur[alive]
+            nxt = self.get_nextLinks(alive, cur_alive, cells_state)
+
+            # no next link found
+            stuck = nxt < 0
+            if stuck.any():
+                ids = alive[stuck]
+                walls = s.state[cur[ids]] == LINK_STATE_ENUM.WALL
+                exit_flag[ids] = np.where(walls, SIM_EXIT_FLAG.NO_NEXT_LINK_WALL, SIM_EXIT_FLAG.NO_NEXT_LINK)
+                alive = alive[~stuck]
+                nxt = nxt[~stuck]
+            if not alive.size:
+                break
+
+            cur[alive] = nxt
+            s.journal_touch_many(nxt)
+            np.add.at(s.picks, nxt, 1)
+            self.depth_total += alive.size
+            if exit_flag[tracked] == SIM_EXIT_FLAG.STILL_RUNNING:
+                path.append((s.keys_cells[cur[tracked]], float(water[tracked])))
+
+            # apply degradation etc
+            water_abs = self.water_degradation(alive, cur, water, exit_flag)
+            broken += self.link_degradation(alive, cur, water_abs, exit_flag)
+
+            # check continue: exit flags could be set by rnd events or link breaks
+            still = exit_flag[alive] == SIM_EXIT_FLAG.STILL_RUNNING
+            dry = still & (water[alive] <= 0)
+            exit_flag[alive[dry]] = SIM_EXIT_FLAG.NO_WATER
+            if cfg.step_maxDepth != -1 and depth >= cfg.step_maxDepth-1:
+                exit_flag[alive[still & ~dry]] = SIM_EXIT_FLAG.MAX_DEPTH
+            alive = alive[exit_flag[alive] == SIM_EXIT_FLAG.STILL_RUNNING]
+
+        for flag, count in zip(*np.unique(exit_flag, return_counts=True)):
+            self.exit_flags[int(flag)] += int(count)
+
+        # resolve the topology changes in a well defined order: sorted link id
+        flag = self.resolve_breaks(broken)
+
+        # keep the last particle info in the sim for the UI
+        if sim:
+            sim.step_id += n
+            sim.step_depth = depth
+            sim.step_path = path
+            sim.water = float(water[tracked])
+            sim.entryL = self.links.link_views[entry]
+            sim.currentL = self.links.link_views[cur[tracked]]
+            sim.exit_flag = int(exit_flag[tracked]) if flag == SIM_EXIT_FLAG.STILL_RUNNING else flag
+        return flag
+
+    def resolve_breaks(self, broken: list[np.ndarray]) -> int:
+        cfg = self.cfg
+        if not broken:
+            return SIM_EXIT_FLAG.STILL_RUNNING
+
+        s = self.links.storage
+        ids = np.unique(np.concatenate(broken))
+        breaking = False
+        for id in ids.tolist():
+            # could have been already set to air by a previous cell detach
+            if s.state[id] != LINK_STATE_ENUM.SOLID:
+                continue
+            self.broken_links += 1
+            breaking |= self.links.setState_link_check(s.keys_cells[id], LINK_STATE_ENUM.AIR)
+
+        self.broken_cells |= breaking
+        if cfg.step_stopBreak:
+            if "LINK" in cfg.step_stopBreak_event:
+                return SIM_EXIT_FLAG.STOP_ON_LINK_BREAK
+            elif "CELL" in cfg.step_stopBreak_event and breaking:
+                return SIM_EXIT_FLAG.STOP_ON_CELL_BREAK
+        return SIM_EXIT_FLAG.STILL_RUNNING
+
+    #-------------------------------------------------------------------
+
+    def random(self, particles: np.ndarray) -> np.ndarray:
+        """ Next draw of each particle stream """
+        counters = self.counters[particles]
+        u = SimRNG.random_many(self.keys[particles], counters)
+        self.counters[particles] = counters
+        return u
+
+    def get_entryLinks(self, n: int) -> np.ndarray|None:
+        """ Sample n entry links (with replacement) from the external links """
+        self.entry_sampler.update(self.cfg)
+        picks = self.entry_sampler.sample_many(self.random(np.arange(n)))
+        if picks is None:
+            return None
+
+        self.links.storage.journal_touch_many(picks)
+        np.add.at(self.links.storage.picks_entry, picks, 1)
+        return picks
+
+    def get_nextProbabilities(self, cand: np.ndarray, flat: np.ndarray, cells_state: np.ndarray) -> np.ndarray:
+        """ Vectorized MW_Sim.get_nextProbability for flattened candidates and their CSR edge index """
+        cfg = self.cfg
+        s = self.links.storage
+        state = s.state[cand]
+
+        # links hanging in the air are not valid (rare case), walls have no cell at the first key
+        c1, c2 = s.cells[cand, 0], s.cells[cand, 1]
+        solid = cells_state[c2] != CELL_STATE_ENUM.AIR
+        not_wall = state != LINK_STATE_ENUM.WALL
+        solid[not_wall] |= cells_state[c1[not_wall]] != CELL_STATE_ENUM.AIR
+
+        # relative pos align (static per edge)
+        p = self.next_align.get(cfg)[flat] * cfg.link_next_dir_weight
+
+        # weight by link resistance field
+        is_solid = state == LINK_STATE_ENUM.SOLID
+        r = self.link_resistance(cand)
+        if not cfg.debug_skip_next_maxResist:
+            r = np.minimum(r, 0.999)
+        p *= np.where(is_solid, 1-r, cfg.link_next_exit_avoidance)
+
+        p[~solid] = 0
+        return p
+
+    def get_nextLinks(self, alive: np.ndarray, cur: np.ndarray, cells_state: np.ndarray) -> np.ndarray:
+        """ Sample the next link per particle using the CSR adjacency, -1 when no candidate is valid """
+        offsets, neighs = self.links.neighs_offsets, self.links.neighs_ids
+        starts = offsets[cur].astype(np.int64)
+        lens = offsets[cur+1] - starts
+
+        # flatten all candidates, a segment per particle
+        total = int(lens.sum())
+        nxt = np.full(cur.size, -1, dtype=np.int64)
+        if not total:
+            return nxt
+        seg_first = np.cumsum(lens) - lens
+        flat = np.repeat(starts - seg_first, lens) + np.arange(total)
+        cand = neighs[flat]
+
+        # segmented sampling over the global cumsum (also the segment totals), segments with no weight find no next link
+        w = self.get_nextProbabilities(cand, flat, cells_state)
+        cw = np.cumsum(w)
+        base = np.where(seg_first > 0, cw[seg_first-1], 0.0)
+        end = np.where(lens > 0, cw[np.maximum(seg_first + lens - 1, 0)], base)
+
+        # side right never lands on the leading zero weights, and the target kept below the segment end skips the trailing ones
+        valid = end > base
+        target = base[valid] + self.random(alive[valid]) * (end[valid] - base[valid])
+        target = np.minimum(target, np.nextafter(end[valid], -np.inf))
+        picks = np.searchsorted(cw, target, side="right")
+        nxt[valid] = cand[picks]
+        return nxt
+
+    #-------------------------------------------------------------------
+
+    def link_resistance(self, ids: np.ndarray) -> np.ndarray:
+        """ Vectorized MW_Sim.link_resistance: dead links oppose no resistance (but never negative) """
+        s = self.links.storage
+        return np.maximum(s.life[ids], 0.0) * s.resistance[ids] * self.cfg.link_resist_weight
+
+    def water_degradation(self, alive: np.ndarray, cur: np.ndarray, water: np.ndarray, exit_flag: np.ndarray) -> np.ndarray:
+        """ Vectorized MW_Sim.water_degradation, returns the water absorbed per alive particle """
+        cfg = self.cfg
+        s = self.links.storage
+        ids = cur[alive]
+        w_prev = water[alive]
+
+        # minimun abs that happens when the water runs through a exterior face or an eroded interior one
+        aF = s.areaFactor[ids]
+        solid = s.state[ids] == LINK_STATE_ENUM.SOLID
+        w = np.where(solid, cfg.water_abs_solid * aF + self.link_resistance(ids) * cfg.water_deg, cfg.water_abs_air * aF)
+        w_new = w_prev - w
+        water_abs = np.where(w_new > 0, w, w_prev)
+        w_new = np.maximum(w_new, 0.0)
+
+        # check potential full water absorption
+        u = self.random(alive)
+        event = (w_prev < cfg.water_rnd_abs_minCheck) & ((w_prev / cfg.water_rnd_abs_minCheck) * cfg.water_rnd_abs_continueProb < u)
+        if event.any():
+            water_abs[event] = cfg.water_rnd_abs_damage * w_prev[event]
+            w_new[event] = w_prev[event] - water_abs[event]
+            exit_flag[alive[event]] = SIM_EXIT_FLAG.NO_WATER_RND
+
+        water[alive] = w_new
+        return water_abs
+
+    def link_degradation(self, alive: np.ndarray, cur: np.ndarray, water_abs: np.ndarray, exit_flag: np.ndarray) -> list[np.ndarray]:
+        """ Vectorized MW_Sim.link_degradation, returns the link ids that reached life <= 0 (resolved after the batch) """
+        cfg = self.cfg
+        s = self.links.storage
+        ids = cur[alive]
+        solid = s.state[ids] == LINK_STATE_ENUM.SOLID
+        if not solid.any():
+            return []
+
+        # degradation depends on water abs but distributed over the link surface (cancels out area), accumulate repeated links
+        ids = ids[solid]
+        s.journal_touch_many(ids)
+        np.subtract.at(s.life, ids, water_abs[solid] * cfg.link_deg / s.areaFactor[ids])
+
+        # potential rnd break
+        life = s.life[ids]
+        u = self.random(alive[solid])
+        event = (life < cfg.link_rnd_break_minCheck) & ((life / cfg.link_rnd_break_minCheck) * cfg.link_rnd_break_resistProb < u)
+        s.life[ids[event]] = -1
+
+        # broken links, optionally stopping the particles that broke them
+        breaking = s.life[ids] <= 0
+        if not breaking.any():
+            return []
+        if cfg.step_stopBreak and "LINK" in cfg.step_stopBreak_event:
+            exit_flag[alive[solid][breaking]] = SIM_EXIT_FLAG.STOP_ON_LINK_BREAK
+        return [ ids[breaking] ]
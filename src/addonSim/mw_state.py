@@ -0,0 +1,121 @@
+# Shared state enums and keys, kept free of bpy so the headless sim (workers, batch kernel) can import them
+#-------------------------------------------------------------------
+
+neigh_key_t      = tuple[int, int]
+neighFaces_key_t = tuple[int, int]
+
+class CELL_ERROR_ENUM:
+    """ Use leftover indices between cont boundaries and custom walls for filler error idx?
+        # NOTE:: could be using any number, sequentiality not used
+        # OPT:: sequential check of id in all, so in case of slow process just use a unique error etc
+    """
+    # could use original ID to preserve it? anyway need to be either very high or between 7-9 (walls id)
+    _zerosForHighlight = 1000000
+
+    MISSING = -1 *_zerosForHighlight
+    """ Missing a whole cell / object """
+    ASYMMETRY = -2 *_zerosForHighlight
+    """ Missing connection at in the supposed neighbour """
+    DELETED = -3 *_zerosForHighlight
+    """ Deleted from the scene """
+    #IGNORED = -4 *_zerosForHighlight
+    #""" Model debug ignored """
+
+    all = { MISSING, ASYMMETRY, DELETED }
+    build_process = { MISSING, ASYMMETRY }
+
+    @classmethod
+    def str(cls, idx):
+        if idx == cls.MISSING:   return "MISSING"
+        if idx == cls.ASYMMETRY: return "ASYMMETRY"
+        if idx == cls.DELETED:   return "DELETED"
+        #if idx == cls.IGNORED:   return "IGNORED"
+        return "unknown"
+
+class CELL_STATE_ENUM:
+    """ Current cell state, preserves some sequentiality"""
+    SOLID = 0
+    AIR = 1
+    CORE = 2
+
+    all = { SOLID, AIR, CORE }
+
+    @classmethod
+    def to_str(cls, e:int):
+        if e == cls.SOLID:  return "SOLID"
+        if e == cls.AIR:    return "AIR"
+        if e == cls.CORE:   return "CORE"
+        if e in CELL_ERROR_ENUM.all: return "ERROR_ENUM"
+        return "none"
+        #raise ValueError(f"CELL_STATE_ENUM: {e} is not in {cls.all}")
+    @classmethod
+    def from_str(cls, s:str):
+        if s == "SOLID":    return cls.SOLID
+        if s == "AIR":      return cls.AIR
+        if s == "CORE":     return cls.CORE
+        raise ValueError(f"CELL_STATE_ENUM: {s} is not in { set(CELL_STATE_ENUM.to_str(s) for s in cls.all) }")
+
+#-------------------------------------------------------------------
+
+class LINK_STATE_ENUM:
+    """ Current links state, preserves some sequentiality """
+    SOLID = 0
+    AIR = 1
+    WALL = 2
+
+    all = { SOLID, AIR, WALL }
+
+    @classmethod
+    def to_str(cls, e:int):
+        if e == cls.SOLID:  return "SOLID"
+        if e == cls.AIR:    return "AIR"
+        if e == cls.WALL:   return "WALL"
+        return "none"
+        #raise ValueError(f"CELL_STATE_ENUM: {e} is not in {cls.all}")
+    @classmethod
+    def from_str(cls, s:str):
+        if s == "SOLID":    return cls.SOLID
+        if s == "AIR":      return cls.AIR
+        if s == "WALL":     return cls.WALL
+        raise ValueError(f"CELL_STATE_ENUM: {s} is not in {set(LINK_STATE_ENUM.to_str(s) for s in cls.all)}")
+
+#-------------------------------------------------------------------
+
+class SIM_EXIT_FLAG:
+    STILL_RUNNING      = -1
+    MAX_DEPTH          = 0
+    NO_WATER           = 1
+    NO_WATER_RND       = 2
+    NO_NEXT_LINK       = 3
+    NO_NEXT_LINK_WALL  = 4
+    NO_ENTRY_LINK      = 5
+    STOP_ON_LINK_BREAK = 6
+    STOP_ON_CELL_BREAK = 7
+
+    all = { MAX_DEPTH, NO_WATER, NO_WATER_RND, NO_NEXT_LINK, NO_NEXT_LINK_WALL, NO_ENTRY_LINK }
+
+    @classmethod
+    def to_str(cls, e:int):
+        if e == cls.STILL_RUNNING:      return "STILL_RUNNING"
+        if e == cls.MAX_DEPTH:          return "MAX_DEPTH"
+        if e == cls.NO_WATER:           return "NO_WATER"
+        if e == cls.NO_WATER_RND:       return "NO_WATER_RND"
+        if e == cls.NO_NEXT_LINK:       return "NO_NEXT_LINK"
+        if e == cls.NO_NEXT_LINK_WALL:  return "NO_NEXT_LINK_WALL"
+        if e == cls.NO_ENTRY_LINK:      return "NO_ENTRY_LINK"
+        if e == cls.STOP_ON_LINK_BREAK: return "STOP_ON_LINK_BREAK"
+        if e == cls.STOP_ON_CELL_BREAK: return "STOP_ON_CELL_BREAK"
+        return "none"
+        #raise ValueError(f"SIM_EXIT_FLAG: {e} is not in {cls.all}")
+    @classmethod
+    def from_str(cls, s:str):
+        if s == "STILL_RUNNING":        return cls.STILL_RUNNING
+        if s == "MAX_DEPTH":            return cls.MAX_DEPTH
+        if s == "NO_WATER":             return cls.NO_WATER
+        if s == "NO_WATER_RND":         return cls.NO_WATER_RND
+        if s == "NO_NEXT_LINK":         return cls.NO_NEXT_LINK
+        if s == "NO_NEXT_LINK_WALL":    return cls.NO_NEXT_LINK_WALL
+        if s == "NO_ENTRY_LINK":        return cls.NO_ENTRY_LINK
+        if s == "STOP_ON_LINK_BREAK":   return cls.STOP_ON_LINK_BREAK
+        if s == "STOP_ON_CELL_BREAK":   return cls.STOP_ON_CELL_BREAK
+        raise ValueError(f"SIM_EXIT_FLAG: {s} is not in {set(SIM_EXIT_FLAG.to_str(s) for s in cls.all)}")
@@ -0,0 +1,114 @@
+# Parameter sweeps of the batched sim: variants of the MW_sim_cfg fanned out over worker processes from the same snapshot
+# the cont and links are built once (the snapshot), each variant starts from the same base state and the same seeds
+#-------------------------------------------------------------------
+
+import numpy as np
+import itertools
+
+from .mw_core import SimSnapshot
+from .mw_ensemble import run_members
+
+from .utils_dev import DEV
+from .stats import getStats
+
+
+def grid(params: dict[str, list]) -> list[dict]:
+    """ Cartesian product of the values per param, e.g. { "water_deg": [0.1, 0.2], "dir_entry": [(0,0,-1), (1,0,-1)] } """
+    names = list(params)
+    return [ dict(zip(names, values)) for values in itertools.product(*(params[n] for n in names)) ]
+
+def latin_hypercube(params: dict[str, tuple|list], num: int, seed = 64) -> list[dict]:
+    """ Latin hypercube of num variants, one stratum per variant and param
+        * (lo, hi) tuples of numbers are ranges, sampled uniformly inside each stratum (ints rounded when both are ints)
+        * lists are choices (e.g. vectors, even 2D ones) stratified over their index, so choices must be lists and not tuples
+    """
+    rng = np.random.default_rng(seed)
+    variants = [ dict() for _ in range(num) ]
+    for name, values in params.items():
+        u = (rng.permutation(num) + rng.random(num)) / num
+        if isinstance(values, tuple):
+            if len(values) != 2 or not all(isinstance(v, (int, float)) for v in values):
+                raise ValueError(f"range of {name} should be (lo, hi) numbers, use a list for choices: {values}")
+            lo, hi = values
+            col = (lo + u * (hi-lo)).tolist()
+            if isinstance(lo, int) and isinstance(hi, int): col = [ int(round(v)) for v in col ]
+        elif isinstance(values, list) and values:
+            col = [ values[i] for i in (u * len(values)).astype(int).tolist() ]
+        else:
+            raise ValueError(f"values of {name} should be a (lo, hi) range tuple or a non empty list of choices: {values}")
+        for v, value in zip(variants, col):
+            v[name] = value
+    return variants
+
+#-------------------------------------------------------------------
+
+class SweepResult:
+    """ Results table, one row per variant averaged over the repeats (same seeds for all variants) """
+
+    metrics = ("air_cells", "broken_links", "depth", "time")
+
+    def __init__(self, variants: list[dict], members: list[dict], repeats: int):
+        self.variants = variants
+        self.repeats = repeats
+        self.params = list(dict.fromkeys(k for v in variants for k in v))
+
+        rows = [ members[i*repeats : (i+1)*repeats] for i in range(len(variants)) ]
+        self.table = { m: np.zeros(len(variants)) for m in self.metrics }
+        self.table_std = { m: np.zeros(len(variants)) for m in self.metrics }
+        for i, row in enumerate(rows):
+            values = {
+                "air_cells": [ m["air"].sum() for m in row ],
+                "broken_links": [ m["broken"].sum() for m in row ],
+                "depth": [ m["depth"] for m in row ],
+                "time": [ m["time"] for m in row ],
+            }
+            for m in self.metrics:
+                self.table[m][i] = np.mean(values[m])
+                self.table_std[m][i] = np.std(values[m])
+
+    def get_order(self, metric = "air_cells", descending = True) -> np.ndarray:
+        order = np.argsort(self.table[metric], kind="stable")
+        return order[::-1] if descending else order
+
+    def get_rows(self) -> list[dict]:
+        return [ { **v, **{ m: float(self.table[m][i]) for m in self.metrics } } for i,v in enumerate(self.variants) ]
+
+    def to_csv(self, path: str):
+        """ Params (vectors as space separated values) then the metrics mean and std """
+        header = self.params + [ c for m in self.metrics for c in (m, f"{m}_std") ]
+        fmt = lambda v: " ".join(str(x) for x in v) if isinstance(v, (tuple, list, set)) else str(v)
+        with open(path, "w") as f:
+            f.write(",".join(header) + "\n")
+            for i, v in enumerate(self.variants):
+                cols = [ fmt(v.get(p, "")) for p in self.params ]
+                cols += [ f"{x:.6g}" for m in self.metrics for x in (self.table[m][i], self.table_std[m][i]) ]
+                f.write(",".join(cols) + "\n")
+
+    def __str__(self):
+        lines = [ f"sweep({len(self.variants)} x {self.repeats}) sorted by air cells:" ]
+        for i in self.get_order().tolist():
+            params = ", ".join(f"{p}={self.variants[i].get(p)}" for p in self.params)
+            lines.append(f"  [{i}] air {self.table['air_cells'][i]:.1f} broken {self.table['broken_links'][i]:.1f}"
+                         f" depth {self.table['depth'][i]:.2f} time {self.table['time'][i]:.3f}s : {params}")
+        return "\n".join(lines)
+
+#-------------------------------------------------------------------
+
+def run_sweep(snap: SimSnapshot, variants: list[dict], infiltrations: int, repeats = 1, seed = 64, batch_size = 256, workers: int = None) -> SweepResult:
+    """ Run every variant (cfg values over the snapshot cfg) repeats times, in parallel processes
+        * all variants use the same repeats seeds (common random numbers), so the differences come from the params
+    """
+    stats = getStats()
+    for v in variants:
+        unknown = set(v) - set(SimSnapshot.cfg_fields)
+        if unknown:
+            raise KeyError(f"params not used by the batched sim: {unknown}")
+
+    seeds = np.random.SeedSequence(seed).spawn(repeats)
+    cfgs = [ { **snap.cfg, **v } for v in variants for _ in range(repeats) ]
+    members = run_members(snap, seeds * len(variants), cfgs, infiltrations, batch_size, workers)
+
+    result = SweepResult(variants, members, repeats)
+    stats.logDt(f"sweep completed: {len(variants)} variants x {repeats} repeats x {infiltrations} infiltrations")
+    DEV.log_msg(f"{result}", {"SIM", "SWEEP"}, cut=False)
+    return result
@@ -0,0 +1,107 @@
+import numpy as np
+
+from .mw_state import SIM_EXIT_FLAG
+
+
+# Columnar trace of the sim sub steps, preallocated typed arrays used as a ring buffer (the oldest rows get overwritten)
+# candidates are optionally stored as offset ranges into a second ring buffer, rows whose candidates were overwritten just lose them
+#-------------------------------------------------------------------
+
+class TraceRecorder:
+    """ One row per sub step (the entry is depth -1), the fields are written directly into the current row
+        * memory is capped by the capacity, long runs only keep the latest rows
+    """
+
+    columns = ("step_id", "depth", "link", "water", "water_abs", "deg", "life", "exit_flag", "cand_len")
+    dtypes  = (np.int32,  np.int32, np.int32, np.float64, np.float64, np.float64, np.float64, np.int8, np.int32)
+    defaults = (-1, -1, -1, np.nan, np.nan, np.nan, np.nan, SIM_EXIT_FLAG.STILL_RUNNING, 0)
+
+    def __init__(self, capacity = 2**16, capacity_candidates = 2**18):
+        self.capacity = capacity
+        self.capacity_candidates = capacity_candidates
+        for name, dtype in zip(self.columns, self.dtypes):
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+
+        # candidates ranges (-1 when not stored) into the candidates ring
+        self.cand_start = np.empty(capacity, dtype=np.int64)
+        self.cands_ids = np.empty(capacity_candidates, dtype=np.int32)
+        self.cands_w   = np.empty(capacity_candidates, dtype=np.float64)
+        self.clear()
+
+    def clear(self):
+        self.written = 0
+        self.written_candidates = 0
+        self.row = -1
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    #-------------------------------------------------------------------
+
+    def next_row(self, step_id: int, depth: int) -> int:
+        """ Start a new row with the default values, returns its index """
+        self.row = row = self.written % self.capacity
+        self.written += 1
+        for name, default in zip(self.columns, self.defaults):
+            getattr(self, name)[row] = default
+        self.cand_start[row] = -1
+        self.step_id[row] = step_id
+        self.depth[row] = depth
+        return row
+
+    def set_candidates(self, ids, weights, store = True):
+        """ Count of candidates of the current row, optionally keeping them (skipped when they do not fit the ring) """
+        n = len(ids)
+        self.cand_len[self.row] = n
+        if not store or not n or n > self.capacity_candidates:
+            return
+
+        start = self.written_candidates
+        pos = np.arange(start, start+n) % self.capacity_candidates
+        self.cands_ids[pos] = ids
+        self.cands_w[pos] = weights
+        self.cand_start[self.row] = start
+        self.written_candidates += n
+
+    def get_candidates(self, row: int) -> tuple[np.ndarray, np.ndarray]|None:
+        """ Candidates of a row, None when not stored or already overwritten """
+        start, n = int(self.cand_start[row]), int(self.cand_len[row])
+        if start < 0 or start < self.written_candidates - self.capacity_candidates:
+            return None
+        pos = np.arange(start, start+n) % self.capacity_candidates
+        return self.cands_ids[pos], self.cands_w[pos]
+
+    def set_exit_flag(self, flag: int):
+        if self.row >= 0:
+            self.exit_flag[self.row] = flag
+
+    #-------------------------------------------------------------------
+
+    def get_order(self) -> np.ndarray:
+        """ Row indices from the oldest to the newest """
+        if self.written <= self.capacity:
+            return np.arange(self.written)
+        return (np.arange(self.capacity) + self.written) % self.capacity
+
+    def get_columns(self) -> dict[str, np.ndarray]:
+        order = self.get_order()
+        return { name: getattr(self, name)[order] for name in self.columns }
+
+    def to_csv(self, path: str):
+        cols = self.get_columns()
+        fmt = [ "%d" if np.issubdtype(dtype, np.integer) else "%.6g" for dtype in self.dtypes ]
+        np.savetxt(path, np.column_stack([ cols[name].astype(np.float64) for name in self.columns ]),
+                   fmt=fmt, delimiter=",", header=",".join(self.columns), comments="")
+
+    def to_npz(self, path: str):
+        """ Columnar file, the stored candidates are flattened with per row offsets (rows without them have an empty range) """
+        cols = self.get_columns()
+        order = self.get_order()
+        cands = [ self.get_candidates(row) for row in order.tolist() ]
+        lens = [ 0 if c is None else len(c[0]) for c in cands ]
+        offsets = np.zeros(len(cands)+1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lens)
+        cols["cands_offsets"] = offsets
+        cols["cands_ids"] = np.concatenate([ c[0] for c in cands if c is not None ] or [np.empty(0, dtype=np.int32)])
+        cols["cands_w"]   = np.concatenate([ c[1] for c in cands if c is not None ] or [np.empty(0, dtype=np.float64)])
+        np.savez_compressed(path, **cols)
@@ -18,11 +18,12 @@ from .properties import (
 from . import properties_utils
 from .operators_dm import _StartRefresh_OT, op_utils_classes
 
-from . import mw_setup, mw_extraction
+from . import mw_setup, mw_extraction, mw_checkpoint
 from .mw_links import MW_Links
 from .mw_cont import MW_Cont, CELL_STATE_ENUM
 from .mw_fract import MW_Fract
 from .mw_sim import MW_Sim, SIM_EXIT_FLAG
+from time import time
 
 from . import ui
 from . import utils, utils_scene, utils_trans
@@ -197,66 +198,11 @@ class MW_gen_OT(_StartRefresh_OT):
         self.last_storageID = MW_global_storage.addFract(fract, obj_root)
 
 
-        DEV.log_msg("Initial object setup", {'SETUP'})
-        if cfg.shape_useConvexHull:
-            # NOTE:: convex hull triangulates the faces... e.g. UV sphere ends with more!
-            obj_toFrac = mw_setup.copy_convex(obj_root, obj_original, self.context, prefs.names.original_convex, prefs.names.original_dissolve)
-        else: obj_toFrac = obj_original
-
-
-        DEV.log_msg("Start calc faces", {'CALC'})
-        bb, bb_center, bb_radius = utils_trans.get_bb_data(obj_toFrac, cfg.margin_box_bounds)
-        getStats().logDt(f"calc bb: [{bb_center[:]}] r {bb_radius:.3f} (margin {cfg.margin_box_bounds:.4f})")
-        if cfg.shape_useWalls:
-            faces4D = utils_trans.get_faces_4D(obj_toFrac, cfg.margin_face_bounds)
-        else: faces4D = []
-        getStats().logDt(f"calc faces4D: {len(faces4D)} (n_disp {cfg.margin_face_bounds:.4f})")
-
-
-        DEV.log_msg("Start calc points", {'CALC'})
-        mw_extraction.detect_points_from_object(obj_original, cfg, self.context)
-        points = mw_extraction.get_points_from_object_fallback(obj_original, cfg, self.context)
-        cfg.source_numFound = len(points)
-        if not points:
-            return self.end_op_error("found no points...")
-
-        # Limit and rnd a bit the points
-        mw_extraction.points_transformCfg(points, cfg, bb_radius)
-
-        # Add some reference of the points to the scene
-        obj_points = mw_setup.gen_pointsObject(obj_root, points, self.context, prefs.names.source_points)
-        utils_scene.hide_objectRec(obj_points, prefs.mw_vis.cell_hide_points)
-        mw_setup.gen_boundsObject(obj_root, bb, self.context, prefs.names.source_wallsBB)
-        getStats().logDt("generated point and bound objects")
-
-
-        DEV.log_msg("Start calc cont", {'CALC', 'CONT'})
-        fract.cont = cont = MW_Cont(obj_root, points, bb, faces4D, precision=cfg.debug_precisionWalls)
-        if not cont.initialized:
-            return self.end_op_error("found no cont or cells... recalc different params?")
-
-        #test some legacy or statistics cont stuff
-        if DEV.LEGACY_CONT_GEN:
-            mw_setup.gen_cells_LEGACY(cont.voro_cont, obj_root, self.context)
-            return self.end_op("DEV.LEGACY_CONT_GEN stop...")
-
-        # precalculate/query neighs and other data with generated cells mesh
-        cells = mw_setup.gen_cellsObjects(fract, obj_root, self.context, scale=obj_root.mw_vis.cell_scale, flipN=cfg.debug_flipCellNormals)
-        cont.precalculations(cells)
-        if not cont.precalculated:
-            return self.end_op_error("error during container precalculations!")
-
-
-        DEV.log_msg("Start calc links", {'CALC', 'LINKS'})
-        fract.links = links = MW_Links(cont)
-        if not links.initialized:
-            return self.end_op_error("found no links... recalc different params?")
-
-
-        # create an empty simulation too
-        fract.sim = MW_Sim(fract.cont, fract.links)
-
-        return self.end_op()
+        # the whole calculation is shared with the headless pipeline
+        error, msg = mw_setup.gen_fract(fract, obj_root, obj_original, cfg, self.context)
+        if error:
+            return self.end_op_error(msg)
+        return self.end_op(msg)
 
     def end_op(self, msg="", skipLog=False, retPass=False):
         """ # OVERRIDE:: end_op to perform stuff at the end """
@@ -353,6 +299,83 @@ class MW_gen_recalc_OT(_StartRefresh_OT):
         MW_global_selected.recheckSelected()
         return super().end_op(msg, skipLog, retPass)
 
+class MW_sim_trace_export_OT(_StartRefresh_OT):
+    bl_idname = "mw.sim_trace_export"
+    bl_label = "Export trace"
+    bl_description = "Write the simulation trace next to the .blend, as .csv and as columnar .npz (including candidates)"
+
+    bl_options = {'INTERNAL'}
+
+    @classmethod
+    def poll(cls, context):
+        return MW_global_selected.fract and MW_global_selected.fract.sim and len(MW_global_selected.fract.sim.trace)
+
+    def execute(self, context: types.Context):
+        self.start_op()
+        path = mw_checkpoint.get_path(MW_global_selected.root, "trace")
+        if not path:
+            return self.end_op_error("save the .blend file first...")
+
+        trace = MW_global_selected.fract.sim.trace
+        trace.to_csv(f"{path}.csv")
+        trace.to_npz(f"{path}.npz")
+        getStats().logDt(f"exported trace: {len(trace)} rows ({trace.written} written)")
+        return self.end_op()
+
+class MW_checkpoint_save_OT(_StartRefresh_OT):
+    bl_idname = "mw.checkpoint_save"
+    bl_label = "Save checkpoint"
+    bl_description = "For selected root. Write the fracture and simulation state next to the .blend"
+
+    bl_options = {'INTERNAL'}
+
+    @classmethod
+    def poll(cls, context):
+        return MW_global_selected.fract and MW_global_selected.fract.links
+
+    def execute(self, context: types.Context):
+        self.start_op()
+        path = mw_checkpoint.get_path(MW_global_selected.root)
+        if not path:
+            return self.end_op_error("save the .blend file first...")
+
+        mw_checkpoint.save(MW_global_selected.fract, path)
+        return self.end_op()
+
+class MW_checkpoint_load_OT(_StartRefresh_OT):
+    bl_idname = "mw.checkpoint_load"
+    bl_label = "Load checkpoint"
+    bl_description = "For selected root. Restore the fracture and simulation state instead of recalculating it"
+
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return MW_global_selected.root
+
+    def execute(self, context: types.Context):
+        self.start_op()
+        obj_root = MW_global_selected.root
+        path = mw_checkpoint.get_path(obj_root)
+        if not path:
+            return self.end_op_error("save the .blend file first...")
+
+        # same as recalc: replace the storage with a new fract
+        MW_global_storage.freeFract_attempt(obj_root)
+        fract = MW_Fract()
+        MW_global_storage.addFract(fract, obj_root)
+        if not mw_checkpoint.load(fract, obj_root, path):
+            return self.end_op_error("checkpoint not found or invalid... recalc instead?")
+
+        # redraw links and cells
+        mw_setup.update_cellsState(fract.cont, obj_root)
+        mw_setup.gen_linksAll(context)
+        return self.end_op()
+
+    def end_op(self, msg="", skipLog=False, retPass=False):
+        MW_global_selected.recheckSelected()
+        return super().end_op(msg, skipLog, retPass)
+
 #-------------------------------------------------------------------
 
 class MW_cell_state_OT(_StartRefresh_OT):
@@ -481,9 +504,7 @@ class MW_gen_field_r_OT(_StartRefresh_OT):
         # update links R
         if  MW_global_selected.fract and MW_global_selected.fract.links:
             links :MW_Links = MW_global_selected.fract.links
-            for key in links.links_graph.nodes():
-                l = links.get_link(key)
-                l.update_resistance()
+            links.update_resistance()
 
         return self.end_op()
 
@@ -513,6 +534,9 @@ class MW_sim_step_OT(_StartRefresh_OT):
         # step
         col.prop(cfg, "step_infiltrations")
         col.prop(cfg, "step_maxDepth")
+        row = col.split()
+        row.prop(cfg, "step_batch")
+        row.prop(cfg, "step_batch_size")
         col.prop(cfg, "water__start")
         col.prop(cfg, "water_deg")
         row = col.split()
@@ -569,6 +593,7 @@ class MW_sim_step_OT(_StartRefresh_OT):
             self.invoked_once = True
             DEV.log_msg("cfg found once: copying props to OP", {'SIM'})
             properties_utils.copyProps_groups_rec(MW_global_selected.root.mw_sim, self.cfg)
+            sim.cfg = MW_global_selected.root.mw_sim
         else:
             try:
                 properties_utils.copyProps_groups_rec(self.cfg, MW_global_selected.root.mw_sim)
@@ -584,22 +609,15 @@ class MW_sim_step_OT(_StartRefresh_OT):
         # steps
         sim_cfg : MW_sim_cfg= self.cfg
         DEV.log_msg(f"step_infiltrations({sim_cfg.step_infiltrations}), step_maxDepth({sim_cfg.step_maxDepth}), step_stopBreak({sim_cfg.step_stopBreak})", {'SIM'})
-        for step_id in range(sim_cfg.step_infiltrations):
-            # still alive msg
-            if sim_cfg.debug_log_everyIters and step_id%sim_cfg.debug_log_everyIters == 0:
-                DEV.log_msg(f"// ({step_id}) running...", {'SIM'})
-
-            log_step = sim_cfg.debug_log and step_id+1 > sim_cfg.step_infiltrations-sim_cfg.debug_log_lastIters
-            if not sim_cfg.debug_util_uniformDeg: sim.step(log_step)
-            else: sim.step_degradeAll() # alternative see erosion on all
 
-            # no entry link due to direction
-            if sim.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK:
-                return self.end_op_error("No entry link found... (probably due dir_entry)")
+        # budgeted run checked every slice, otherwise the fixed count
+        budget = sim.get_budget(prefs.sim_modal_slice_ms / 1000)
+        for _ in sim.run_budget_iter(budget) if budget else sim.run_iter(sim_cfg.step_infiltrations):
+            pass
 
-            # skip the rest of steps
-            if sim.exit_flag >= SIM_EXIT_FLAG.STOP_ON_LINK_BREAK:
-                break
+        # no entry link due to direction
+        if sim.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK:
+            return self.end_op_error("No entry link found... (probably due dir_entry)")
 
         getStats().logDt("completed simulation steps")
 
@@ -613,6 +631,95 @@ class MW_sim_step_OT(_StartRefresh_OT):
         MW_global_selected.recheckSelected()
         return super().end_op(msg, skipLog, retPass)
 
+class MW_sim_run_modal_OT(_StartRefresh_OT):
+    bl_idname = "mw.sim_run_modal"
+    bl_label = "Simulation run (modal)"
+    bl_description = "Same as step but time-sliced in the background, the UI keeps responding. ESC to stop keeping the progress, right click to undo it"
+
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    def __init__(self) -> None:
+        super().__init__()
+        # config some base class log flags...
+        self.end_log = True
+
+    @classmethod
+    def poll(cls, context):
+        return MW_global_selected.root and MW_global_selected.fract and MW_global_selected.fract.sim
+
+    def invoke(self, context, event):
+        self.start_op()
+        prefs = getPrefs()
+        self.sim : MW_Sim = MW_global_selected.fract.sim
+        self.sim.cfg = MW_global_selected.root.mw_sim
+        self.sim.backup_state()
+
+        # same iteration as the blocking step, only the slices differ
+        # NOTE:: the budget chunks are sized to the slice, so usually a single chunk runs per timer event
+        self.num = self.sim.cfg.step_infiltrations
+        self.budget = self.sim.get_budget(prefs.sim_modal_slice_ms / 1000)
+        self.it = self.sim.run_budget_iter(self.budget) if self.budget else self.sim.run_iter(self.num)
+        self.done = 0
+        self.time_start = self.time_refresh = time()
+        DEV.log_msg(f"step_infiltrations({self.num}), budget({self.sim.cfg.step_budget}), slice({prefs.sim_modal_slice_ms}ms) refresh({prefs.sim_modal_refresh}s)", {'SIM', 'MODAL'})
+
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(prefs.sim_modal_slice_ms / 1000, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context: types.Context, event: types.Event):
+        if event.type == 'ESC':
+            return self.finish(context, "stopped")
+        if event.type == 'RIGHTMOUSE':
+            self.sim.backup_state_restore()
+            self.sim.step_reset()
+            return self.finish(context, "cancelled", cancel=True)
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # run until the time slice is spent
+        prefs = getPrefs()
+        t_end = time() + prefs.sim_modal_slice_ms / 1000
+        try:
+            while time() < t_end:
+                self.done = next(self.it)
+        except StopIteration:
+            return self.finish(context)
+
+        # progress report and periodic refresh
+        if self.budget:
+            progress = self.budget.get_log_ui(self.sim)
+        else:
+            rate = self.done / max(time() - self.time_start, 1e-6)
+            progress = f"{self.done}/{self.num} infiltrations, {rate:.1f} steps/s"
+        context.workspace.status_text_set(f"MW sim: {progress} (ESC stop, right click cancel)")
+        if prefs.sim_modal_refresh >= 0 and time() - self.time_refresh > prefs.sim_modal_refresh:
+            self.refresh(context)
+        return {'RUNNING_MODAL'}
+
+    def refresh(self, context: types.Context):
+        mw_setup.update_cellsState(MW_global_selected.fract.cont, MW_global_selected.root)
+        if getPrefs().sim_calc_OT_links:
+            mw_setup.gen_linksAll(context)
+        self.time_refresh = time()
+
+    def finish(self, context: types.Context, msg = "completed", cancel = False):
+        context.window_manager.event_timer_remove(self.timer)
+        context.workspace.status_text_set(None)
+        rate = self.done / max(time() - self.time_start, 1e-6)
+        goal = f" {self.budget.mode} {self.budget.get_progress(self.sim)*100:.0f}%" if self.budget else f"/{self.num}"
+        getStats().logDt(f"{msg} simulation steps: {self.done}{goal} ({rate:.1f} steps/s)")
+
+        # no entry link due to direction
+        if not cancel and self.sim.exit_flag == SIM_EXIT_FLAG.NO_ENTRY_LINK:
+            return self.end_op_error("No entry link found... (probably due dir_entry)")
+
+        # redraw links and cells
+        self.refresh(context)
+        MW_global_selected.recheckSelected()
+        return self.end_op(cancel=cancel)
+
 class MW_sim_reset_OT(_StartRefresh_OT):
     bl_idname = "mw.sim_reset"
     bl_label = "Simulation reset"
@@ -632,6 +739,7 @@ class MW_sim_reset_OT(_StartRefresh_OT):
         self.start_op()
 
         sim : MW_Sim = MW_global_selected.fract.sim
+        sim.cfg = MW_global_selected.root.mw_sim
         sim.reset(MW_global_selected.root.mw_sim.debug_util_rndState)
 
         # redraw links and cells
@@ -868,14 +976,18 @@ class MW_util_resetCFG_OT(_StartRefresh_OT):
 classes = [
     MW_gen_OT,
     MW_gen_recalc_OT,
+    MW_checkpoint_save_OT,
+    MW_checkpoint_load_OT,
 
     MW_cell_state_OT,
     MW_gen_links_OT,
     MW_gen_field_r_OT,
 
     MW_sim_step_OT,
+    MW_sim_run_modal_OT,
     MW_sim_reset_OT,
     MW_sim_resetCFG_OT,
+    MW_sim_trace_export_OT,
     MW_sim_undoLast_OT,
 
     MW_util_comps_OT,
@@ -170,6 +170,13 @@ class MW_gen_PT(types.Panel):
             # recalculate fracture
             box.operator(ops.MW_gen_recalc_OT.bl_idname, icon="ZOOM_PREVIOUS")
 
+            # checkpoints next to the .blend
+            col_rowSplit = box.row().split(factor=col_split)
+            row = col_rowSplit.row(align=True)
+            row.operator(ops.MW_checkpoint_save_OT.bl_idname, icon="FILE_TICK")
+            row.operator(ops.MW_checkpoint_load_OT.bl_idname, icon="FILE_REFRESH")
+            col_rowSplit.prop(prefs, "checkpoint_autoSave")
+
             # delete all fractures
             boxLinks = box.box()
             col_rowSplit = boxLinks.row().split(factor=col_split)
@@ -185,7 +192,7 @@ class MW_gen_PT(types.Panel):
             for id, fract in MW_global_storage.id_fracts.items():
                 obj = MW_global_storage.id_fracts_obj[id]
                 icon = "X" if utils_scene.needsSanitize(obj) else "CHECKMARK"
-                col.label(text=f"{id}: {len(fract.cont.voro_cont if fract.cont else -1)} cells + {fract.links.links_len if fract.links else -1} links", icon=icon)
+                col.label(text=f"{id}: {len(fract.cont.cells_state) if fract.cont else -1} cells + {fract.links.links_len if fract.links else -1} links", icon=icon)
 
             # more stuff
             col = box.column()
@@ -288,6 +295,7 @@ class MW_sim_PT(types.Panel):
         # run sim
         col_rowSplit = col.row().split(factor=col_split)
         col_rowSplit.operator(ops.MW_sim_step_OT.bl_idname, text="STEP", icon="MOD_FLUIDSIM")
+        col_rowSplit.operator(ops.MW_sim_run_modal_OT.bl_idname, text="RUN", icon="PLAY")
 
         # additional running sim props
         if root:
@@ -296,12 +304,24 @@ class MW_sim_PT(types.Panel):
             row = col_rowSplit.row()
             row.prop(root.mw_sim, "step_stopBreak_event")
             col_rowSplit.prop(root.mw_sim, "step_stopBreak", text="stop")
+            row = col.row(align=True)
+            row.prop(root.mw_sim, "step_budget", text="")
+            if root.mw_sim.step_budget == 'LINKS':  row.prop(root.mw_sim, "step_budget_links")
+            elif root.mw_sim.step_budget == 'AIR':  row.prop(root.mw_sim, "step_budget_air")
+            if root.mw_sim.step_budget != 'COUNT':  row.prop(root.mw_sim, "step_budget_time")
+            row = col.row(align=True)
+            row.prop(prefs, "sim_modal_slice_ms")
+            row.prop(prefs, "sim_modal_refresh")
 
         # reset
         col_rowSplit = col.row().split(factor=col_split)
         col_rowSplit.operator(ops.MW_sim_reset_OT.bl_idname, text="RESET", icon="ORPHAN_DATA")
         col_rowSplit.operator(ops.MW_sim_resetCFG_OT.bl_idname, text="config")
 
+        # trace export
+        if root and root.mw_sim.debug_log_trace:
+            col.operator(ops.MW_sim_trace_export_OT.bl_idname, icon="EXPORT")
+
         # inspect root or selected?
         if root:
             #open, box = ui.draw_propsToggle_custom(root.mw_sim, prefs.sim_PT_meta_inspector, col, text="Parameters", propFilter="-step,-debug")
@@ -309,6 +309,14 @@ class MW_prefs(bpy.types.AddonPreferences):
         name="sim", description="Generate links mesh after every simulation",
         default=True,
     )
+    sim_modal_slice_ms: props.IntProperty(
+        name="slice", description="Time slice of simulation per UI update when running modal (ms)",
+        default=50, min=5, max=2000,
+    )
+    sim_modal_refresh: props.FloatProperty(
+        name="refresh", description="Refresh the cells and links visuals every N seconds while running modal, -1 only at the end",
+        default=2.0, min=-1.0,
+    )
 
     gen_duplicate_OT_hidePrev: props.BoolProperty(
         name="hide", description="Hide the original fractured object after duplication",
@@ -327,6 +335,10 @@ class MW_prefs(bpy.types.AddonPreferences):
         name="apply", description="Apply the modifier after adding it",
         default=False,
     )
+    checkpoint_autoSave: props.BoolProperty(
+        name="auto", description="Write the checkpoints of all fractures after saving the .blend",
+        default=False,
+    )
 
 
 #-------------------------------------------------------------------
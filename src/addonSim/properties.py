@@ -162,6 +162,44 @@ class MW_sim_cfg(types.PropertyGroup):
         options={'ENUM_FLAG'},
     )
 
+    step_batch: props.BoolProperty(
+        name="Batched infiltrations",
+        description="Advance several infiltrations in lock-step per numpy pass, breaks are resolved after each batch.",
+        default=False,
+    )
+    step_batch_size: props.IntProperty(
+        name="Batch size",
+        description="Number of infiltrations advanced together, smaller batches react faster to the topology changes.",
+        default=256, min=1, max=10000,
+    )
+
+    step_budget: props.EnumProperty(
+        name="Budget",
+        description="Run a fixed number of infiltrations or until a budget is spent, the chunks adapt to the measured steps/s",
+        items=(
+            ('COUNT', "COUNT", "Fixed number of infiltrations"),
+            ('TIME', "TIME", "Simulate for a wall-clock time"),
+            ('LINKS', "LINKS", "Simulate until a number of links is broken"),
+            ('AIR', "AIR", "Simulate until a percentage of the cells is AIR"),
+        ),
+        default='COUNT',
+    )
+    step_budget_time: props.FloatProperty(
+        name="Time (s)",
+        description="Wall-clock seconds of a TIME run, also caps the LINKS/AIR runs (-1 to disable it there)",
+        default=10.0, min=-1.0, max=3600.0,
+    )
+    step_budget_links: props.IntProperty(
+        name="Links",
+        description="Links broken during a LINKS run",
+        default=100, min=1, max=100000,
+    )
+    step_budget_air: props.FloatProperty(
+        name="Air %",
+        description="Percentage of AIR cells that ends an AIR run",
+        default=10.0, min=0.1, max=100.0,
+    )
+
     #-------------------------------------------------------------------
 
     # water start and abs
@@ -295,6 +333,14 @@ class MW_sim_cfg(types.PropertyGroup):
         description="SLOWER: Show all candidates and their probabilty per substep",
         default=False,
     )
+    debug_log_trace_capacity: props.IntProperty(
+        description="Max substeps kept in the trace, the oldest get overwritten",
+        default=2**16, min=64,
+    )
+    debug_log_trace_capacity_candidates: props.IntProperty(
+        description="Candidates kept in the trace per substep of capacity",
+        default=4, min=1, max=64,
+    )
 
     # custom sim/vis
     debug_skip_entry_area: props.BoolProperty(
@@ -555,7 +601,6 @@ class MW_vis_cfg(types.PropertyGroup):
 
 #-------------------------------------------------------------------
 
-# OPT:: text box with formula
 class MW_resistance_cfg(types.PropertyGroup):
     from .mw_resistance import field_R_current_switch as switchField
 
@@ -565,11 +610,65 @@ class MW_resistance_cfg(types.PropertyGroup):
             ('LAYERS_SIDE',  "SIDE",    "Sideways resistance layers, with a bit of inclination"),
             ('LAYERS_STACK', "STACK",   "Stacked resistance layers, with a bit of inclination"),
             ('POCKETS',      "POCKETS", "Repeating pockets of resistance"),
+            ('FORMULA',      "FORMULA", "User expression of the world x and z, numpy functions and noise(x,z)"),
+            ('IMAGE',        "IMAGE",   "Memory mapped map file over the world x and z, e.g. strata heightmaps"),
         ),
         default={'LAYERS_SIDE'},
         options={'ENUM_FLAG'},
         update= lambda self, context: MW_resistance_cfg.switchField()
     )
+    formula: props.StringProperty(
+        name="Formula",
+        description="Resistance in [0,1] of the world x and z (y only when baked in 3D), e.g. 0.5+0.5*sin(x*0.3)*noise(x,z). Functions: sin, cos, exp, sqrt, abs, clip, where, noise...",
+        default="0.5+0.5*sin(x*0.3)*noise(x,z)",
+        update= lambda self, context: MW_resistance_cfg.switchField()
+    )
+
+    image_path: props.StringProperty(
+        name="Map file", description="Resistance map of the IMAGE field (.npy, binary .pgm or headerless .raw), memory mapped so it can be huge",
+        subtype="FILE_PATH",
+        update= lambda self, context: MW_resistance_cfg.switchField()
+    )
+    image_origin: props.FloatVectorProperty(
+        name="Map origin", description="World x,z of the first texel of the map",
+        size=2, default=(0.0, 0.0),
+        update= lambda self, context: MW_resistance_cfg.switchField()
+    )
+    image_texel_size: props.FloatProperty(
+        name="Map texel size", description="World units covered by a texel of the map",
+        default=0.01, min=1e-6, precision=4,
+        update= lambda self, context: MW_resistance_cfg.switchField()
+    )
+    image_raw_width: props.IntProperty(
+        name="Raw width", description="Texels per row of .raw maps (the height is deduced from the file size)",
+        default=0, min=0,
+        update= lambda self, context: MW_resistance_cfg.switchField()
+    )
+    image_raw_dtype: props.EnumProperty(
+        name="Raw type", description="Texel type of .raw maps, integers are normalized by their max",
+        items=(
+            ('UINT16',  "UINT16",  "16 bit unsigned"),
+            ('UINT8',   "UINT8",   "8 bit unsigned"),
+            ('FLOAT32', "FLOAT32", "32 bit float already in [0,1]"),
+        ),
+        default='UINT16',
+        update= lambda self, context: MW_resistance_cfg.switchField()
+    )
+
+    bake: props.EnumProperty(
+        name="Bake",
+        description="Sample the field once on a grid over the fracture bounds, then the links only interpolate it",
+        items=(
+            ('NONE', "NONE", "Evaluate the field per link"),
+            ('2D', "2D", "Bilinear grid over the world x,z"),
+            ('3D', "3D", "Trilinear grid, also over the world y (formula fields)"),
+        ),
+        default='NONE',
+    )
+    bake_res: props.IntProperty(
+        name="Bake resolution", description="Samples per axis of the baked grid, 3D grids take res^3 samples so keep it lower",
+        default=128, min=2, max=1024,
+    )
 
     out_inv: props.BoolProperty(
         name="Inverse final val",
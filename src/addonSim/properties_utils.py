@@ -19,6 +19,10 @@ class RND_config(types.PropertyGroup):
         name="RND seed mod", description="Modify the current random generator",
         default=0, min=0, max=100,
     )
+    seed_full: props.StringProperty(
+        name="RND seed full", description="Full seed drawn by the sim (63 bits), the seed only displays its last digits. Editing the seed uses the edited value",
+        default="",
+    )
     seed_regen: props.BoolProperty(
         name="RND seed gen new", description="Use a new random seed per OP call",
         default=not DEV.FORCE_NO_RND_START,
@@ -248,6 +252,32 @@ def copyProps_groups_rec(src, dest, propFilter:str=None, groupFilter:str=None, a
 
 #-------------------------------------------------------------------
 
+def setProps_dict(dest, values: dict):
+    """ Set the properties from a plain dict (e.g. loaded from a json/toml file), inner groups as nested dicts """
+    for prop_name, value in values.items():
+        if not hasattr(dest, prop_name):
+            raise AttributeError(f"unknown property: {prop_name} ({type(dest).__name__})")
+        if isinstance(value, dict):
+            setProps_dict(getattr(dest, prop_name), value)
+        else:
+            # enum flags are sets, arrays accept lists
+            if isinstance(getattr(dest, prop_name), set): value = set(value)
+            setattr(dest, prop_name, value)
+
+def getProps_dict(src) -> dict:
+    """ All properties as a plain dict (json serializable), inner groups as nested dicts """
+    values = dict()
+    for prop_name in getProps_names(src):
+        value = getattr(src, prop_name)
+        if isinstance(value, set): value = sorted(value)
+        elif not isinstance(value, (bool, int, float, str)): value = list(value)
+        values[prop_name] = value
+    for group_name in getProps_groups(src):
+        values[group_name] = getProps_dict(getattr(src, group_name))
+    return values
+
+#-------------------------------------------------------------------
+
 def resetProps(src, propFilter:str=None):
     """ Reset filtered properties without touching inner groups """
     prop_names = getProps_namesFiltered(src, propFilter)
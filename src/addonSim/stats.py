@@ -31,6 +31,8 @@ class Stats:
         self.basemem = self._getmem()
         self.maxmem = self.lastmem = self.diffmem = 0
         self.elapsedtime = 0
+        self.stages : dict[str, dict] = dict()
+        self.stagetime = self.lasttime
         if log: self.logMsg(f"reset... (base mem: {self.basemem})")
 
     def _gettime(self):
@@ -84,6 +86,14 @@ class Stats:
         self.lastmem = d
         return d
 
+    def stage(self, name: str) -> dict:
+        """ Record the time/memory since the previous stage (independent of logDt), e.g. for the headless pipeline metrics """
+        t = self._gettime()
+        self.stages[name] = { "dt": t - self.stagetime, "t": t - self.firsttime, "mem_max": self.memory_max() }
+        self.stagetime = t
+        self.logT(f"stage: {name} ({self.stages[name]['dt']:.6f}s)")
+        return self.stages[name]
+
     #-------------------------------------------------------------------
 
     logType = { "STATS" }
@@ -24,7 +24,7 @@ def make_functions_dict(*functions):
     return dict([(function.__name__, function) for function in functions])
 
 from math import *
-from sv_math import sign
+from .sv_math import sign
 safe_names = make_functions_dict(
         # From math module
         acos, acosh, asin, asinh, atan, atan2,
@@ -1,6 +1,8 @@
 # ref: Diego Mateos (UPC) - MIRI-A3DM
 # OPT:: use networkx for alternative algorithms...
 
+import numpy as np
+
 class UnionFind:
     """ Simple union-find to count connected components w/ path compression
         * also added dynamic enlarging of the container
@@ -67,4 +69,71 @@ class UnionFind:
             except:
                 componets[parent] = [i]
 
-        return list(componets.values())
\ No newline at end of file
+        return list(componets.values())
+
+#-------------------------------------------------------------------
+
+class UnionFindArray:
+    """ Array backed union-find w/ union by rank and path compression (halving), fed directly with edge arrays
+        * elements are 0..size-1, labels() returns the root of every element as a numpy array
+    """
+
+    def __init__(self, size:int):
+        self.size = size
+        self.parents = np.arange(size, dtype=np.int64)
+        self.rank = np.zeros(size, dtype=np.int8)
+        self.num_components = size
+
+    def union_edges(self, a:np.ndarray, b:np.ndarray):
+        # plain lists inside the loop, indexing numpy scalars is much slower
+        parents = self.parents.tolist()
+        rank = self.rank.tolist()
+        num = self.num_components
+
+        for x,y in zip(a.tolist(), b.tolist()):
+            # find both roots halving the paths
+            while parents[x] != x:
+                parents[x] = parents[parents[x]]
+                x = parents[x]
+            while parents[y] != y:
+                parents[y] = parents[parents[y]]
+                y = parents[y]
+            if x == y: continue
+
+            # attach the lower rank tree
+            if rank[x] < rank[y]: x,y = y,x
+            parents[y] = x
+            if rank[x] == rank[y]: rank[x] += 1
+            num -= 1
+
+        self.parents = np.array(parents, dtype=np.int64)
+        self.rank = np.array(rank, dtype=np.int8)
+        self.num_components = num
+
+    def labels(self) -> np.ndarray:
+        # compress all the paths by pointer jumping
+        p = self.parents
+        while True:
+            pp = p[p]
+            if np.array_equal(pp, p): break
+            p = pp
+        self.parents = p
+        return p
+
+def connected_components_arrays(nodes:np.ndarray, a:np.ndarray, b:np.ndarray) -> list[set[int]]:
+    """ Connected components of the graph given by node ids (any int, e.g. negative walls) and edges between them
+        * returned sorted by their smallest node id, so the order does not depend on the edges order
+    """
+    nodes = np.unique(nodes)
+    if not nodes.size:
+        return []
+    uf = UnionFindArray(nodes.size)
+    uf.union_edges(np.searchsorted(nodes, a), np.searchsorted(nodes, b))
+
+    # group by root, the stable sort keeps the sorted node order inside each group
+    labels = uf.labels()
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    groups = np.split(nodes[order], bounds)
+    groups.sort(key=lambda g: g[0])
+    return [ set(g.tolist()) for g in groups ]
@@ -17,6 +17,8 @@ class DEV:
     SKIP_SANITIZE         = False   # skip attempt to keep up with the UNDO/REDO etc system
     SKIP_PATH_CHECK       = False   # skip checking if a path still exists before recalc all graphs
     SKIP_BUBBLE_CHECK     = False   # skip checking for air bubbles -> air cells inside model can get entry water!
+    DEBUG_CONNECTIVITY    = False   # assert the dynamic connectivity splits against a full components recount
+    DEBUG_COMPS_NX        = False   # also count the components with networkx and assert the union-find partitions match
 
     FORCE_NO_RND_START    = False   # skip random generation in certain places to help debugging
     FORCE_NEW_MATS        = False   # force regeneration of gradient images to avoid debugging confussion
@@ -26,6 +28,7 @@ class DEV:
 #
     LEGACY_CONT_ASSERT    = False   # assert some local and global pos match
     LEGACY_CONT_GEN       = False   # check some stats of legacy cont
+    LEGACY_LINKS_SCENE    = False   # build the links reading the cells meshes in the scene instead of the voro++ faces
 
     # tiny util to setup flags in reload time and then execute only once
     RELOAD_FLAGS : dict[str,bool] = dict()
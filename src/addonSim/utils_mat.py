@@ -235,6 +235,11 @@ def set_meshUV(mesh: types.Mesh, uv: types.MeshUVLoopLayer|str, uv_base:Vector|l
         val = uv_base[i_value]
         uv.data[i].uv = val
 
+def set_meshUV_np(mesh: types.Mesh, uv: types.MeshUVLoopLayer|str, uv_arr: np.ndarray):
+    """ Same as set_meshUV with a value per loop corner but in batch, uv_arr shaped (loops, 2) """
+    if isinstance(uv, str): uv = mesh.uv_layers[uv]
+    uv.data.foreach_set("uv", np.ascontiguousarray(uv_arr, dtype=np.float32).ravel())
+
 def set_meshUV_rnd(mesh: types.Mesh, uv: types.MeshUVLoopLayer|str, minC=0.0, maxC=1.0):
     if isinstance(uv, str): uv = mesh.uv_layers[uv]
     for i, faceL in enumerate(mesh.loops):
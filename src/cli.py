@@ -0,0 +1,30 @@
+import sys, os, argparse
+
+# Headless entry point, queue fracture + simulation jobs without UI:
+#   blender --background --python src/cli.py -- job.json [job2.toml ...] [--keep-going]
+# the addon package is imported from this folder and registered unless already enabled
+#-------------------------------------------------------------------
+
+def fixLocalEnv():
+    currentDir = os.path.dirname(os.path.abspath(__file__))
+    if not currentDir in sys.path: sys.path.append(currentDir)
+
+def main():
+    argv = sys.argv[sys.argv.index("--")+1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="blender --background --python src/cli.py --")
+    parser.add_argument("jobs", nargs="+", help="job files (.json or .toml)")
+    parser.add_argument("--keep-going", action="store_true", help="continue after a failed job")
+    args = parser.parse_args(argv)
+
+    fixLocalEnv()
+    import bpy
+    import addonSim
+    if not hasattr(bpy.types.Object, "mw_gen"):
+        addonSim.register()
+
+    from addonSim import mw_cli
+    failed = mw_cli.main(args.jobs, args.keep_going)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ from addonSim import utils
 importlib.reload(utils)
 from addonSim import utils_geo
 importlib.reload(utils_geo)
+from addonSim import unionfind
+importlib.reload(unionfind)
+import networkx as nx
 
 def bench_meshMaps(stats, me):
     stats.reset()
@@ -94,4 +97,39 @@ def bench_meshMaps_FtoF(stats, me):
         stats.reset()
         assert(ret1["FtoF"] == ret2)
         stats.logFull(t)
-    pass
\ No newline at end of file
+    pass
+
+def bench_comps(stats, links):
+    """ Components recount: union-find over the link arrays vs networkx graph """
+    stats.reset()
+    nodes, c1, c2 = links.comps_get_arrays()
+    stats.logFull(f"bench_comps: {len(nodes)} cells {len(c1)} links")
+    print()
+    nRep = 2
+    n = 20
+
+    ret1, ret2 = None, None
+    for i in range(nRep):
+        print()
+        print(f"rep {i}")
+
+        t = """ comps networkx """
+        stats.reset()
+        for _ in range(n):
+            graph = nx.Graph()
+            graph.add_nodes_from(nodes.tolist())
+            graph.add_edges_from(zip(c1.tolist(), c2.tolist()))
+            ret1 = list(nx.connected_components(graph))
+        stats.logFull(t)
+
+        t = """ comps union-find arrays """
+        stats.reset()
+        for _ in range(n):
+            ret2 = unionfind.connected_components_arrays(nodes, c1, c2)
+        stats.logFull(t)
+
+    t = """ assert equal results"""
+    stats.reset()
+    assert({ frozenset(c) for c in ret1 } == { frozenset(c) for c in ret2 })
+    stats.logFull(t)
+    pass
@@ -0,0 +1,26 @@
+# Tests of the addon modules over a fake scene, they need the blender python (bpy and mathutils) with pytest installed
+#   blender --background --python-expr "import sys, pytest; sys.exit(pytest.main(['src/test']))"
+#-------------------------------------------------------------------
+
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+collect_ignore = [ "_script.py", "bench.py", "voro.py" ]
+
+
+@pytest.fixture
+def prefs(monkeypatch):
+    """ Default resistance prefs, the addon is not registered so getPrefs is not available """
+    fakes = pytest.importorskip("fakes")
+    from addonSim import mw_resistance
+    p = fakes.FakePrefs()
+    monkeypatch.setattr(mw_resistance, "getPrefs", lambda: p)
+    return p
+
+@pytest.fixture
+def fract(prefs):
+    """ Grid of 4x4x4 boxes with its links and sim, unit scale root """
+    fakes = pytest.importorskip("fakes")
+    return fakes.FakeFract(4)
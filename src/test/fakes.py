@@ -0,0 +1,143 @@
+# Fake fracture without scene: voro like cells over a grid of boxes, their cell objects (legacy links path) and the root props
+#-------------------------------------------------------------------
+
+import numpy as np
+from mathutils import Matrix, Vector
+
+from addonSim import mw_core
+from addonSim.mw_cont import MW_Cont, CELL_STATE_ENUM
+from addonSim.mw_links import MW_Links
+from addonSim.mw_sim import MW_Sim
+
+
+# voro++ winding: inwards newell normal, so the blender faces are flipped (debug_flipCellNormals)
+BOX_FACES = [[0,1,2,3],[4,7,6,5],[0,4,5,1],[2,6,7,3],[0,3,7,4],[1,5,6,2]]
+BOX_SIZE  = (1.0, 1.0, 1.5)
+WALLS     = [-1, -2, -3, -4, -5, -6]
+
+class FakeCell:
+    """ Same queries as a tess/voro++ cell, world space in the cont root local space """
+    def __init__(self, id: int, pos: tuple):
+        self.id = id
+        (x,y,z), (dx,dy,dz) = pos, BOX_SIZE
+        self.verts = np.array([ [x,y,z], [x+dx,y,z], [x+dx,y+dy,z], [x,y+dy,z],
+                                [x,y,z+dz], [x+dx,y,z+dz], [x+dx,y+dy,z+dz], [x,y+dy,z+dz] ])
+        self.neighs : list[int] = None
+        _, n, self.areas = mw_core.faces_geometry(self.verts, BOX_FACES)
+        self.normals_out = -n
+
+    def vertices(self):       return self.verts.tolist()
+    def face_vertices(self):  return BOX_FACES
+    def normals(self):        return self.normals_out.tolist()
+    def face_areas(self):     return self.areas.tolist()
+    def centroid(self):       return self.verts.mean(axis=0).tolist()
+    def neighbors(self):      return self.neighs
+
+#-------------------------------------------------------------------
+
+class FakePoly:
+    def __init__(self, center, normal, area):
+        self.center, self.normal, self.area = Vector(center), Vector(normal), float(area)
+
+class FakeMesh:
+    def __init__(self, cell: FakeCell):
+        """ Blender mesh of the cell: vertices relative to the centroid and flipped faces """
+        faces = [ f[::-1] for f in BOX_FACES ]
+        c, n, a = mw_core.faces_geometry(cell.verts - cell.centroid(), faces)
+        self.polygons = [ FakePoly(*args) for args in zip(c.tolist(), n.tolist(), a.tolist()) ]
+
+class FakeId:
+    def __init__(self, id: int):
+        self.cell_id, self.cell_state = id, CELL_STATE_ENUM.SOLID
+
+class FakeObj:
+    """ Cell object placed at its centroid, keeps its parent transform as the scene children """
+    def __init__(self, cell: FakeCell, m_root: Matrix):
+        self.parent = None
+        self.matrix_world = self.matrix_basis = m_root @ Matrix.Translation(Vector(cell.centroid()))
+        self.data = FakeMesh(cell)
+        self.mw_id = FakeId(cell.id)
+
+class FakeGen:
+    debug_flipCellNormals = True
+
+class FakeRnd:
+    seed = 64; seed_full = ""; seed_mod = 0; seed_regen = False
+
+class FakeSimCfg:
+    """ Default MW_sim_cfg values """
+    def __init__(self):
+        self.step_infiltrations = 100; self.step_maxDepth = -1; self.step_stopBreak = False; self.step_stopBreak_event = {"LINK"}
+        self.step_batch = False; self.step_batch_size = 64
+        self.step_budget = "COUNT"; self.step_budget_time = 10.0; self.step_budget_links = 100; self.step_budget_air = 10.0
+        self.water__start = 1.0; self.water_deg = 0.25; self.water_abs_air = 0.05; self.water_abs_solid = 0.10
+        self.water_rnd_abs_minCheck = 0.25; self.water_rnd_abs_continueProb = 0.9; self.water_rnd_abs_damage = 0.75
+        self.link_deg = 0.5; self.link_resist_weight = 0.75
+        self.link_rnd_break_minCheck = 0.4; self.link_rnd_break_resistProb = 0.9
+        self.link_next_dir_weight = 0.75; self.link_next_exit_avoidance = 0.75
+        self.dir_entry = Vector((1,-0.5,-0.5)); self.dir_entry_minAlign = 0.05; self.dir_entry_fromArrow = True
+        self.dir_next = Vector((0,0,-1)); self.dir_next_minAlign = 0.05
+        self.debug_rnd = FakeRnd()
+        self.debug_log = False; self.debug_log_lastIters = 10; self.debug_log_everyIters = 100
+        self.debug_log_path = False; self.debug_log_trace = False; self.debug_log_trace_candidates = False
+        self.debug_log_trace_capacity = 2**16; self.debug_log_trace_capacity_candidates = 4
+        self.debug_skip_entry_area = False; self.debug_skip_next_maxResist = False
+        self.debug_util_rndState = False; self.debug_util_uniformDeg = False
+
+class FakeRoot:
+    def __init__(self, m_root: Matrix):
+        self.parent = None
+        self.matrix_world = self.matrix_basis = m_root
+        self.mw_gen = FakeGen()
+        self.mw_sim = FakeSimCfg()
+
+class FakeResistCfg:
+    field = {"LAYERS_SIDE"}; formula = "x"
+    in_flipX = False; in_flipY = False; out_inv = False; out_round = False
+    bake = "NONE"; bake_res = 128
+
+class FakePrefs:
+    def __init__(self):
+        self.resist_cfg = FakeResistCfg()
+
+#-------------------------------------------------------------------
+
+def fake_cont(N: int, m_root: Matrix = None) -> MW_Cont:
+    """ Precalculated cont of NxNxN boxes (walls -1..-6 as +-x +-y +-z), its cell objects and meshes already queried """
+    m_root = m_root if m_root is not None else Matrix.Identity(4)
+    idx = lambda i,j,k: (i*N + j)*N + k
+    cells = [ FakeCell(idx(i,j,k), (i*BOX_SIZE[0], j*BOX_SIZE[1], k*BOX_SIZE[2])) for i in range(N) for j in range(N) for k in range(N) ]
+
+    # neighbour per face, BOX_FACES order is -z +z -y +y -x +x
+    dirs = [ (0,0,-1), (0,0,1), (0,-1,0), (0,1,0), (-1,0,0), (1,0,0) ]
+    walls_dir = [ WALLS[5], WALLS[4], WALLS[3], WALLS[2], WALLS[1], WALLS[0] ]
+    for i in range(N):
+        for j in range(N):
+            for k in range(N):
+                q = [ (i+d[0], j+d[1], k+d[2]) for d in dirs ]
+                cells[idx(i,j,k)].neighs = [ idx(*p) if all(0 <= x < N for x in p) else w for p,w in zip(q, walls_dir) ]
+
+    cont = MW_Cont.__new__(MW_Cont)
+    cont.initialized = cont.precalculated = True
+    cont.root = FakeRoot(m_root)
+    cont.voro_cont = cells
+    cont.wallsId = list(WALLS)
+    cont.wallsId_edges = [ (WALLS[i], WALLS[(i+1)%len(WALLS)]) for i in range(len(WALLS)) ]
+    cont.keys_perWall = { w: [] for w in WALLS }
+    cont.foundId, cont.missingId, cont.deletedId, cont.deletedId_prev = list(range(len(cells))), [], [], []
+    cont.neighs = [ list(c.neighs) for c in cells ]
+    cont.neighs_faces, cont.keys_perCell, cont.neighs_keys_missing, cont.neighs_keys_asymmetry = mw_core.cells_neighs_faces(cont.neighs)
+    cont.cells_objs = [ FakeObj(c, m_root) for c in cells ]
+    cont.cells_meshes = [ obj.data for obj in cont.cells_objs ]
+    cont.cells_meshes_FtoF = [ mw_core.faces_FtoF(BOX_FACES) for c in cells ]
+    cont.cells_state = [ CELL_STATE_ENUM.SOLID ]*len(cells)
+    cont.cells_journal = None
+    cont.recalc_perState()
+    return cont
+
+class FakeFract:
+    """ Cont, links and sim as the fracture holds them """
+    def __init__(self, N: int, m_root: Matrix = None):
+        self.cont = fake_cont(N, m_root)
+        self.links = MW_Links(self.cont)
+        self.sim = MW_Sim(self.cont, self.links)
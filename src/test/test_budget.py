@@ -0,0 +1,100 @@
+# Budgeted runs: chunk sizing, the time cap of the LINKS/AIR goals and the links counted from the start
+#-------------------------------------------------------------------
+
+from types import SimpleNamespace
+import pytest
+
+from addonSim import mw_budget
+from addonSim.mw_budget import SimBudget
+from addonSim.mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ Manual time for the budget module """
+    clock = SimpleNamespace(t=100.0)
+    monkeypatch.setattr(mw_budget, "time", lambda: clock.t)
+    return clock
+
+def fake_sim(links_air = 0, cells_air = 0, cells = 100):
+    """ Only the state sets read by the budget """
+    return SimpleNamespace(
+        links=SimpleNamespace(storage=SimpleNamespace(ids_perState={ LINK_STATE_ENUM.AIR: set(range(links_air)) })),
+        cont=SimpleNamespace(cells_perState={ CELL_STATE_ENUM.AIR: set(range(cells_air)) }, foundId=list(range(cells))))
+
+#-------------------------------------------------------------------
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        SimBudget("STEPS", 10)
+
+def test_chunk_growth(clock):
+    budget = SimBudget("LINKS", 100, slice_s=0.05)
+    assert budget.next_chunk() == SimBudget.chunk_first
+
+    # fast steps: the slice would fit 4000 but the growth is limited per chunk
+    sizes = []
+    for _ in range(6):
+        budget.update(budget.chunk, budget.chunk / 80000)
+        sizes.append(budget.next_chunk())
+    assert sizes == [32, 128, 512, 2048, 4000, 4000]
+
+    # capped by the max even with a huge rate
+    budget.update(budget.chunk, 1e-9)
+    budget.next_chunk()
+    budget.update(budget.chunk, 1e-9)
+    assert budget.next_chunk() == SimBudget.chunk_max
+
+    # slow steps, always at least one
+    budget = SimBudget("LINKS", 100, slice_s=0.05)
+    budget.next_chunk()
+    budget.update(1, 10.0)
+    assert budget.next_chunk() == 1
+
+def test_chunk_remaining(clock):
+    budget = SimBudget("COUNT", 20)
+    budget.update(budget.next_chunk(), 0.001)
+    assert budget.next_chunk() == 12
+
+    # the remaining time at the measured rate (1000 steps/s, 0.01s left)
+    budget = SimBudget("TIME", 1.0)
+    budget.update(budget.next_chunk(), 0.008)
+    clock.t += 0.99
+    assert budget.next_chunk() == 11
+
+@pytest.mark.parametrize("mode, limit", [("LINKS", 10), ("AIR", 50.0)])
+def test_time_cap(clock, mode, limit):
+    """ Unreachable LINKS/AIR goals still end by time, unless disabled """
+    sim = fake_sim()
+    budget = SimBudget(mode, limit, time_max=2.0)
+    clock.t += 1.0
+    assert budget.get_progress(sim) == pytest.approx(0.5)
+    clock.t += 1.0
+    assert budget.reached(sim)
+
+    budget = SimBudget(mode, limit, time_max=-1)
+    clock.t += 1000.0
+    assert budget.get_progress(sim) == 0.0
+    assert not budget.reached(sim)
+
+def test_links_start(clock):
+    sim = fake_sim(links_air=5)
+    budget = SimBudget("LINKS", 10)
+    budget.start(sim)
+    assert budget.links_start == 5
+    assert budget.get_progress(sim) == 0.0
+
+    sim.links.storage.ids_perState[LINK_STATE_ENUM.AIR].update(range(5, 12))
+    assert budget.get_progress(sim) == pytest.approx(0.7)
+    sim.links.storage.ids_perState[LINK_STATE_ENUM.AIR].update(range(12, 15))
+    assert budget.reached(sim)
+
+    # restarting counts from the links broken by then
+    budget.start(sim)
+    assert budget.links_start == 15 and budget.done == 0
+    assert not budget.reached(sim)
+
+def test_air(clock):
+    sim = fake_sim(cells_air=20, cells=80)
+    budget = SimBudget("AIR", 50.0)
+    assert budget.get_progress(sim) == pytest.approx(0.5)
@@ -0,0 +1,55 @@
+# Checkpoint save -> load round trip
+#-------------------------------------------------------------------
+
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+pytest.importorskip("mathutils")
+from addonSim import mw_checkpoint
+from addonSim.mw_cont import MW_Cont
+from addonSim.mw_links import LinkStorage
+
+
+@pytest.fixture
+def query_fake(fract, monkeypatch):
+    """ The loaded cont queries the cells objects from the scene, take them from the fake fract instead """
+    def query_cells(cont, readState = True):
+        cont.cells_objs = list(fract.cont.cells_objs)
+        cont.cells_meshes = list(fract.cont.cells_meshes)
+        return False
+    monkeypatch.setattr(MW_Cont, "query_cells", query_cells)
+
+def run(sim, num: int):
+    for _ in sim.run_iter(num): pass
+
+def test_roundtrip(fract, query_fake, tmp_path):
+    run(fract.sim, 60)
+    path = str(tmp_path / "fract.mw.npz")
+    mw_checkpoint.save(fract, path)
+
+    loaded = SimpleNamespace(cont=None, links=None, sim=None)
+    assert mw_checkpoint.load(loaded, fract.cont.root, path)
+
+    for name in ("foundId", "missingId", "deletedId", "wallsId", "cells_state", "neighs", "neighs_faces", "keys_perCell", "keys_perWall", "cells_meshes_FtoF"):
+        assert getattr(loaded.cont, name) == getattr(fract.cont, name), name
+    for name in LinkStorage.arrays:
+        assert np.array_equal(getattr(loaded.links.storage, name), getattr(fract.links.storage, name)), name
+    assert np.array_equal(loaded.links.neighs_ids, fract.links.neighs_ids)
+    assert loaded.links.comps_len == fract.links.comps_len
+    assert loaded.sim.step_id == fract.sim.step_id and loaded.sim.rng == fract.sim.rng
+
+    # both continue the same
+    run(fract.sim, 40)
+    run(loaded.sim, 40)
+    assert np.array_equal(loaded.links.storage.life, fract.links.storage.life)
+    assert loaded.cont.cells_state == fract.cont.cells_state
+
+def test_load_unversioned(fract, tmp_path):
+    path = str(tmp_path / "other.npz")
+    np.savez_compressed(path, values=np.zeros(3))
+    assert not mw_checkpoint.load(SimpleNamespace(), fract.cont.root, path)
+
+def test_rows_fill():
+    rows = [ [1,2], -3, [], [4] ]
+    assert mw_checkpoint.unpack_rows(*mw_checkpoint.pack_rows(rows)) == rows
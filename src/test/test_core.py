@@ -0,0 +1,57 @@
+# Blender independent core: links build from plain cells data
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from addonSim import mw_core
+
+
+def cells_data(fract) -> list[dict]:
+    return [ {"vertices": c.vertices(), "faces": c.face_vertices(), "neighbors": c.neighbors(), "normals": c.normals(), "areas": c.face_areas()}
+             for c in fract.cont.voro_cont ]
+
+def test_build_resistance(fract, prefs):
+    """ Default field is the addon default, the rest of the options as documented """
+    from addonSim import mw_resistance
+    cells = cells_data(fract)
+    snap, build = mw_core.snapshot_from_cells(cells, fract.cont.wallsId, flipN=True)
+    pos = build.arrays["pos"]
+    assert np.allclose(build.arrays["resistance"], mw_resistance.LAYERS_SIDE.get2D_np(pos[:,0], pos[:,2]))
+    assert np.allclose(build.arrays["resistance"], fract.links.storage.resistance)
+
+    _, build = mw_core.snapshot_from_cells(cells, fract.cont.wallsId, flipN=True, resistance="POCKETS")
+    assert np.allclose(build.arrays["resistance"], mw_core.field_pockets(pos[:,0], pos[:,2]))
+    _, build = mw_core.snapshot_from_cells(cells, fract.cont.wallsId, flipN=True, resistance=lambda x,z: x*0 + 0.25)
+    assert np.all(build.arrays["resistance"] == 0.25)
+    _, build = mw_core.snapshot_from_cells(cells, fract.cont.wallsId, flipN=True, resistance=None)
+    assert not build.arrays["resistance"].any()
+    with pytest.raises(ValueError):
+        mw_core.eval_resistance(pos, np.zeros(3))
+
+def test_cfg_frozen():
+    cfg = mw_core.SimCfg(step_stopBreak_event={"CELL"}, dir_entry_minAlign=1.0, dir_next_minAlign=2.0)
+    assert isinstance(cfg.step_stopBreak_event, frozenset)
+    hash(cfg)
+    assert cfg.dir_entry_minAlign < 1 and cfg.dir_next_minAlign < 1
+    assert np.isfinite([cfg.dir_entry_minAlign_inv, cfg.dir_next_minAlign_inv]).all()
+
+def test_snapshot_links_match(fract):
+    """ The snapshot and the addon links share the topology rules: same seed, same links, cells, components and frontier """
+    from addonSim.mw_rng import SimRNG
+    from addonSim.mw_sim_batch import MW_SimBatch
+    cfg = mw_core.SimCfg(step_stopBreak=False, link_deg=2.0)
+    snap = mw_core.SimSnapshot.from_sim(fract.sim)
+
+    snap_links, _ = mw_core.simulate(snap, 400, cfg, SimRNG(7), batch_size=32)
+    MW_SimBatch(fract.links, cfg).run(400, 32, rng=SimRNG(7))
+
+    links = fract.links
+    assert links.cont.getCells_state(mw_core.CELL_STATE_ENUM.AIR)
+    for name in mw_core.LinkStorage.arrays:
+        assert np.array_equal(getattr(snap_links.storage, name), getattr(links.storage, name)), name
+    assert snap_links.storage.ids_perState == links.storage.ids_perState
+    assert snap_links.cont.cells_state == links.cont.cells_state
+    assert snap_links.comps_len == links.comps_len
+    assert np.array_equal(snap_links.frontier.get_ids_external(), links.frontier.get_ids_external())
+    assert np.array_equal(snap_links.frontier.get_ids_internal(), links.frontier.get_ids_internal())
@@ -0,0 +1,108 @@
+# Dynamic connectivity against the expected components
+#-------------------------------------------------------------------
+
+import random
+import pytest
+
+from addonSim.dynconn import DynamicConnectivity
+
+
+def test_remove_node_split():
+    # path 0-1-2-3 plus the cycle 3-4-5-3
+    dc = DynamicConnectivity.from_graph(range(6), [(0,1), (1,2), (2,3), (3,4), (4,5), (5,3)])
+    assert not dc.remove_node(0)            # leaf
+    assert not dc.remove_node(4)            # inside the cycle
+    assert dc.num_components() == 1
+    assert dc.remove_node(2)                # cut node
+    assert dc.num_components() == 2
+    assert not dc.connected(1, 3)
+    assert not dc.remove_node(1)            # isolated
+    assert not dc.remove_node(7)            # missing
+
+def test_remove_edge():
+    # square 0-1-2-3-0, the last edge is the only non tree one
+    dc = DynamicConnectivity.from_graph(range(4), [(0,1), (1,2), (2,3), (3,0)])
+    assert not dc.remove_edge(0, 2)         # missing
+    assert not dc.remove_edge(1, 2)         # tree edge with the non tree 3-0 as replacement
+    assert dc.has_edge(3, 0)
+    assert dc.connected(1, 2)
+    assert dc.num_components() == 1
+    assert dc.remove_edge(0, 1)             # tree edge without replacement
+    assert dc.num_components() == 2
+    assert not dc.connected(0, 1)
+    assert dc.connected(0, 2)
+
+    # non tree edge inside a triangle
+    dc = DynamicConnectivity.from_graph(range(3), [(0,1), (1,2), (2,0)])
+    assert not dc.remove_edge(2, 0)
+    assert dc.num_components() == 1
+
+def test_add_edge_after_split():
+    dc = DynamicConnectivity.from_graph(range(4), [(0,1), (1,2), (2,3)])
+    assert dc.remove_edge(1, 2)
+    dc.add_edge(1, 2)
+    assert dc.num_components() == 1
+    assert dc.connected(0, 3)
+    assert dc.remove_edge(1, 2)
+
+    # joined through another edge, then the new edge is the tree one
+    dc.add_edge(0, 3)
+    assert dc.connected(1, 2)
+    assert dc.remove_edge(0, 3)
+    assert not dc.connected(1, 2)
+
+def test_restore_node():
+    """ The cells back to SOLID: the node is added again and then its edges towards the non AIR cells """
+    edges = [(0,1), (1,2), (2,3), (3,4), (1,3)]
+    dc = DynamicConnectivity.from_graph(range(5), edges)
+    assert dc.remove_node(3)
+    assert dc.num_components() == 2
+
+    dc.add_node(3)
+    assert dc.num_components() == 3
+    for u,v in edges:
+        if 3 in (u,v): dc.add_edge(u, v)
+    assert dc.num_components() == 1
+    assert all(dc.has_edge(u, v) for u,v in edges)
+    assert not dc.remove_edge(1, 3)
+    assert dc.remove_node(3)
+
+def test_random_vs_nx():
+    """ Random edge/node removals and restores against networkx paths """
+    nx = pytest.importorskip("networkx")
+    rnd = random.Random(11)
+    nodes = list(range(40))
+    edges = { tuple(sorted(rnd.sample(nodes, 2))) for _ in range(70) }
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(edges)
+    dc = DynamicConnectivity.from_graph(nodes, edges)
+
+    for _ in range(400):
+        op = rnd.random()
+        if op < 0.4 and graph.number_of_edges():
+            u,v = rnd.choice(list(graph.edges))
+            graph.remove_edge(u, v)
+            assert dc.remove_edge(u, v) == (not nx.has_path(graph, u, v))
+        elif op < 0.7:
+            u,v = rnd.sample(list(graph.nodes), 2)
+            graph.add_edge(u, v)
+            dc.add_edge(u, v)
+        elif op < 0.85 and graph.number_of_nodes() > 2:
+            n = rnd.choice(list(graph.nodes))
+            neighs = list(graph.neighbors(n))
+            graph.remove_node(n)
+            split = len({ frozenset(nx.node_connected_component(graph, m)) for m in neighs }) > 1
+            assert dc.remove_node(n) == split
+        else:
+            n = rnd.choice([ n for n in nodes if n not in graph ] or [0])
+            graph.add_node(n)
+            dc.add_node(n)
+            for m in [ e[1] for e in edges if e[0] == n ] + [ e[0] for e in edges if e[1] == n ]:
+                if m in graph:
+                    graph.add_edge(n, m)
+                    dc.add_edge(n, m)
+
+        assert dc.num_components() == nx.number_connected_components(graph)
+        for u,v in (rnd.sample(list(graph.nodes), 2) for _ in range(10)):
+            assert dc.connected(u, v) == nx.has_path(graph, u, v)
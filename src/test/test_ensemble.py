@@ -0,0 +1,27 @@
+# Ensembles: the member seeds do not depend on the workers
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from addonSim.mw_core import SimSnapshot
+from addonSim.mw_ensemble import run_ensemble
+
+
+def test_workers_match(fract):
+    """ Same seed in process and over two spawned workers, same members """
+    snap = SimSnapshot.from_sim(fract.sim)
+    snap.cfg.update(link_deg=3.0, step_stopBreak=False)
+    serial = run_ensemble(snap, 4, 80, seed=9, batch_size=16, workers=1)
+    parallel = run_ensemble(snap, 4, 80, seed=9, batch_size=16, workers=2)
+
+    assert serial.air_cells.sum() and serial.broken_links.sum()
+    assert np.array_equal(serial.air_cells, parallel.air_cells)
+    assert np.array_equal(serial.broken_links, parallel.broken_links)
+    assert np.array_equal(serial.link_life_mean, parallel.link_life_mean)
+    assert np.array_equal(serial.cell_air_prob, parallel.cell_air_prob)
+    for a, b in zip(serial.members, parallel.members):
+        assert a["infiltrations"] == b["infiltrations"] and a["depth"] == b["depth"]
+
+    # distinct seeds per member
+    assert len({ m["life"].tobytes() for m in serial.members }) > 1
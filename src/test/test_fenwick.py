@@ -0,0 +1,106 @@
+# Fenwick tree weighted sampler: rebuilds, float drift fallbacks and the picks against a plain cumsum search
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from addonSim.fenwick import FenwickSampler
+
+
+def searchsorted_pick(weights: np.ndarray, u: np.ndarray) -> np.ndarray:
+    cw = np.cumsum(weights)
+    return np.searchsorted(cw, u * cw[-1], side="right")
+
+def assert_tree(sampler: FenwickSampler):
+    """ Every tree node holds the sum of its range of weights """
+    fresh = FenwickSampler(sampler.size)
+    fresh.rebuild(sampler.weights)
+    assert np.allclose(sampler.tree, fresh.tree)
+
+#-------------------------------------------------------------------
+
+def test_empty():
+    sampler = FenwickSampler(0)
+    sampler.rebuild()
+    assert sampler.total() == 0
+    assert sampler.sample(0.5) == -1
+    assert sampler.sample_many(np.array([0.1, 0.9])) is None
+
+def test_all_zero():
+    sampler = FenwickSampler(5)
+    sampler.update_many(np.arange(5), np.zeros(5))
+    assert sampler.sample(0.5) == -1
+    assert sampler.sample_many(np.array([0.5])) is None
+
+    # back to zero after having weights
+    sampler.update(3, 2.0)
+    assert sampler.sample(0.99) == 3
+    sampler.update(3, 0.0)
+    assert sampler.sample(0.5) == -1
+
+def test_update_many_rebuild():
+    """ Few ids go through the point updates, many through a full rebuild (that also resets the updates count) """
+    sampler = FenwickSampler(64)
+    sampler.rebuild(np.ones(64))
+
+    sampler.update_many(np.array([3, 10]), np.array([2.0, 0.0]))
+    assert sampler.updates == 2
+    assert_tree(sampler)
+
+    ids = np.arange(0, 64, 2)
+    sampler.update_many(ids, np.full(ids.size, 3.0))
+    assert sampler.updates == 0
+    assert sampler.weights[ids].tolist() == [3.0]*ids.size
+    assert_tree(sampler)
+
+def test_update_rebuild():
+    """ The point updates rebuild the tree once they outnumber the items """
+    sampler = FenwickSampler(4)
+    for i in range(4):
+        sampler.update(i, i + 1.0)
+    assert sampler.updates == 4
+    sampler.update(0, 5.0)
+    assert sampler.updates == 0
+    assert_tree(sampler)
+
+    # same weight is not an update
+    sampler.update(0, 5.0)
+    assert sampler.updates == 0
+
+def test_find_drift():
+    """ A tree drifted from the weights never picks an empty item, neither in the middle nor trailing """
+    sampler = FenwickSampler(3)
+    sampler.rebuild(np.array([1.0, 0.0, 1.0]))
+    sampler.tree[2] += 1e-12
+    assert sampler.find(1.0) == 2
+
+    sampler = FenwickSampler(4)
+    sampler.rebuild(np.array([1.0, 1.0, 0.0, 0.0]))
+    sampler.tree[4] += 1e-9
+    assert sampler.find(sampler.total()) == 1
+    assert sampler.sample(np.nextafter(1.0, 0.0)) == 1
+    assert sampler.sample_many(np.array([0.25, np.nextafter(1.0, 0.0)])).tolist() == [0, 1]
+
+@pytest.mark.parametrize("size", [1, 7, 64, 1000])
+def test_random_vs_cumsum(size):
+    """ Same picks as searching the cumsum, also after point updates (with zeros) and rebuilds """
+    rnd = np.random.default_rng(size)
+    weights = rnd.random(size) * (rnd.random(size) > 0.3)
+    weights[0] = 0.5
+    sampler = FenwickSampler(size)
+    sampler.rebuild(weights)
+
+    for _ in range(5):
+        ids = rnd.choice(size, size=max(size // 8, 1), replace=False)
+        w = rnd.random(ids.size) * (rnd.random(ids.size) > 0.5)
+        weights[ids] = w
+        sampler.update_many(ids, w)
+        if not weights.any():
+            continue
+
+        u = rnd.random(256)
+        expected = searchsorted_pick(weights, u)
+        assert np.array_equal(sampler.sample_many(u), expected)
+        assert [ sampler.sample(x) for x in u[:32].tolist() ] == expected[:32].tolist()
+        assert (weights[sampler.sample_many(u)] > 0).all()
+        assert sampler.total() == pytest.approx(weights.sum())
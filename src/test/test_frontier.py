@@ -0,0 +1,76 @@
+# Incremental frontier updates match a full recalc: cells to AIR, air bubbles and restores back to SOLID
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+pytest.importorskip("mathutils")
+from addonSim.mw_frontier import LinksFrontier
+from addonSim.mw_state import CELL_STATE_ENUM, LINK_STATE_ENUM
+
+
+def cell(i, j, k, N = 4):
+    return (i*N + j)*N + k
+
+def assert_recalc(links):
+    fresh = LinksFrontier(links.storage.keys_cells, links.storage, links.cont)
+    fresh.recalc()
+    assert links.frontier.outside == fresh.outside
+    assert np.array_equal(links.frontier.count_internal, fresh.count_internal)
+    assert np.array_equal(links.frontier.count_external, fresh.count_external)
+
+#-------------------------------------------------------------------
+
+def test_random_air(fract):
+    """ Random cells to AIR with some links broken in between (those only update the frontier on the next recalc) """
+    links = fract.links
+    rnd = np.random.default_rng(3)
+    for idx in rnd.permutation(fract.cont.foundId)[:24].tolist():
+        solid = sorted(links.storage.ids_perState[LINK_STATE_ENUM.SOLID])
+        for id in rnd.choice(solid, size=min(len(solid), 3), replace=False).tolist():
+            links.setState_link_check(links.storage.keys_cells[id], LINK_STATE_ENUM.AIR)
+
+        links.setState_cell_check(idx, CELL_STATE_ENUM.AIR)
+        assert not links.frontier_dirty_full
+        assert_recalc(links)
+
+def test_bubble(fract):
+    """ Inner AIR cells keep their links internal until the outside reaches them """
+    links = fract.links
+    bubble = [ cell(1,1,1), cell(1,1,2) ]
+    links.setState_cells_check(bubble, CELL_STATE_ENUM.AIR)
+    assert_recalc(links)
+    assert not links.frontier.outside
+
+    # the solid neighbours see the bubble links as internal (the link between both bubble cells has no owner)
+    state = links.storage.state
+    bubble_links = [ id for idx in bubble for id in links.get_cell_link_ids(idx) if not set(links.storage.keys_cells[id]) <= set(bubble) ]
+    assert (state[bubble_links] == LINK_STATE_ENUM.AIR).all()
+    assert (links.frontier.count_internal[bubble_links] > 0).all()
+    assert not links.frontier.count_external[bubble_links].any()
+
+    # open the bubble through a border cell
+    links.setState_cell_check(cell(0,1,1), CELL_STATE_ENUM.AIR)
+    assert_recalc(links)
+    assert set(bubble) <= links.frontier.outside
+    assert links.frontier.count_external[bubble_links].any()
+
+def test_restore_solid(fract):
+    links, sim = fract.links, fract.sim
+    links.setState_cells_check([ cell(1,1,1), cell(2,2,2) ], CELL_STATE_ENUM.AIR)
+
+    # journal restore back to SOLID closes the opened bubble again
+    sim.backup_state()
+    links.setState_cells_check([ cell(0,1,1), cell(0,2,2), cell(1,2,2) ], CELL_STATE_ENUM.AIR)
+    assert cell(1,1,1) in links.frontier.outside
+    sim.backup_state_restore()
+    assert_recalc(links)
+    assert links.frontier.outside == set()
+
+    # also the cells set back to SOLID one by one
+    rnd = np.random.default_rng(5)
+    air = rnd.permutation(fract.cont.foundId)[:20].tolist()
+    links.setState_cells_check(air, CELL_STATE_ENUM.AIR)
+    for idx in air[:10]:
+        links.setState_cell_check(idx, CELL_STATE_ENUM.SOLID)
+        assert_recalc(links)
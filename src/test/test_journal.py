@@ -0,0 +1,72 @@
+# Restoring the sim backup undoes the journaled link and cell changes
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+pytest.importorskip("mathutils")
+from addonSim.mw_state import CELL_STATE_ENUM
+
+
+def assert_perState(fract):
+    """ The incremental state sets of the cells and links match a full rebuild """
+    cont, s = fract.cont, fract.links.storage
+    cells = { state: set(ids) for state,ids in cont.cells_perState.items() }
+    links = { state: set(ids) for state,ids in s.ids_perState.items() }
+    cont.recalc_perState()
+    s.recalc_perState()
+    assert cont.cells_perState == cells
+    assert s.ids_perState == links
+
+
+def test_restore_after_steps(fract):
+    links, sim = fract.links, fract.sim
+    s = links.storage
+    sim.backup_state()
+    life, state, cells_state = s.life.copy(), s.state.copy(), list(fract.cont.cells_state)
+
+    for _ in sim.run_iter(50): pass
+    assert not np.array_equal(s.life, life)
+
+    sim.backup_state_restore()
+    assert np.array_equal(s.life, life)
+    assert np.array_equal(s.state, state)
+    assert fract.cont.cells_state == cells_state
+
+def test_restore_after_degradeAll(fract):
+    links, sim = fract.links, fract.sim
+    s = links.storage
+    sim.backup_state()
+    life = s.life.copy()
+
+    sim.step_degradeAll()
+    links.link_views[int(links.frontier.get_ids_external()[0])].degrade(0.25)
+    assert not np.array_equal(s.life, life)
+
+    sim.backup_state_restore()
+    assert np.array_equal(s.life, life)
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_perState(fract, batch):
+    sim = fract.sim
+    sim.cfg.link_deg = 3.0
+    sim.cfg.step_batch = batch
+    sim.cfg = sim.cfg
+
+    sim.backup_state()
+    for _ in sim.run_iter(200): pass
+    assert fract.cont.cells_perState[CELL_STATE_ENUM.AIR]
+    assert_perState(fract)
+
+    sim.backup_state_restore()
+    assert not fract.cont.cells_perState[CELL_STATE_ENUM.AIR]
+    assert_perState(fract)
+
+    for _ in sim.run_iter(200): pass
+    sim.reset()
+    assert not fract.cont.cells_perState[CELL_STATE_ENUM.AIR]
+    assert_perState(fract)
+
+    for _ in sim.run_iter(200): pass
+    sim.reset(rnd=True)
+    assert_perState(fract)
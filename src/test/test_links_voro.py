@@ -0,0 +1,44 @@
+# Links built from the voro++ faces match the legacy ones read from the scene cells objects
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from addonSim import mw_core
+from addonSim.utils_dev import DEV
+
+
+@pytest.fixture
+def m_root():
+    """ Translated, rotated and non uniformly scaled root """
+    from mathutils import Matrix, Vector
+    return Matrix.Translation(Vector((1.0, -2.0, 0.5))) @ Matrix.Rotation(0.3, 4, "Z") @ Matrix.Diagonal(Vector((2.0, 0.5, 1.5, 1.0)))
+
+def test_faces_scaled_root(prefs, m_root):
+    fakes = pytest.importorskip("fakes")
+    cont = fakes.fake_cont(3, m_root)
+    links = fakes.MW_Links(cont, build=False)
+    pos_v, normal_v, area_v = links.get_faces_voro(cont, cont.root.mw_gen.debug_flipCellNormals)
+    pos_s, normal_s, area_s = links.get_faces_scene(cont)
+    for idx in cont.foundId:
+        assert np.allclose(pos_v[idx], pos_s[idx])
+        assert np.allclose(normal_v[idx], normal_s[idx])
+        assert np.allclose(area_v[idx], area_s[idx])
+
+def test_links_scaled_root(prefs, m_root, monkeypatch):
+    fakes = pytest.importorskip("fakes")
+    monkeypatch.setattr(DEV, "LEGACY_LINKS_SCENE", True)
+    legacy = fakes.FakeFract(3, m_root).links.storage
+    monkeypatch.setattr(DEV, "LEGACY_LINKS_SCENE", False)
+    voro = fakes.FakeFract(3, m_root).links.storage
+    for name in ("cells", "pos", "dir", "area", "resistance", "state"):
+        assert np.allclose(getattr(voro, name), getattr(legacy, name)), name
+
+def test_faces_degenerate():
+    """ Null normals stay null and do not break the orientation """
+    verts = [[0,0,0], [1,0,0], [1,1,0], [0,1,0], [1,1,0]]
+    faces = [[0,1,2,3], [1,2,4]]
+    _, normals, _ = mw_core.faces_voro(verts, faces, [[0,0,-1], [0,0,0]], [1.0, 0.0], flipN=True)
+    assert np.array_equal(normals[1], [0,0,0])
+    assert np.allclose(normals[0], [0,0,-1])
+    assert not np.isnan(normals).any()
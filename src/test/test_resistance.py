@@ -0,0 +1,127 @@
+# Resistance fields: map files, formulas and baking
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from addonSim import mw_resistance
+
+
+def write(path, data: bytes) -> str:
+    path.write_bytes(data)
+    return str(path)
+
+@pytest.mark.parametrize("header", [ b"P5\n4 2\n255\n", b"P5\n# comment\n4 2 # other\n255\n", b"P5 4\t2\r255 " ])
+def test_pgm_valid(tmp_path, header):
+    pixels = np.arange(8, dtype=np.uint8).reshape((2,4)) * 30
+    data, norm = mw_resistance.open_memmap(write(tmp_path / "m.pgm", header + pixels.tobytes()))
+    assert np.array_equal(data, pixels)
+    assert norm == 1.0 / 255
+
+def test_pgm_16bit(tmp_path):
+    pixels = np.array([[0, 1000], [30000, 65535]], dtype=">u2")
+    data, norm = mw_resistance.open_memmap(write(tmp_path / "m.pgm", b"P5\n2 2\n65535\n" + pixels.tobytes()))
+    assert np.array_equal(data, pixels) and norm == 1.0 / 65535
+
+@pytest.mark.parametrize("header", [ b"P5\n4 4", b"P5\n4", b"", b"P5\n# comment without newline", b"P5\n4 4 255" ])
+def test_pgm_truncated(tmp_path, header):
+    with pytest.raises(ValueError, match="truncated"):
+        mw_resistance.open_memmap(write(tmp_path / "m.pgm", header))
+
+def test_pgm_short_data(tmp_path):
+    with pytest.raises(ValueError, match="m.pgm"):
+        mw_resistance.open_memmap(write(tmp_path / "m.pgm", b"P5\n4 4\n255\n" + bytes(10)))
+
+#-------------------------------------------------------------------
+
+@pytest.mark.parametrize("source", [ "x", "sin(x*0.3) + noise(x, z)", "clip(abs(x) / 10, 0, 1)", "where(z > 0, 1, 0.5)", "log(abs(x) + 1) / 2", "maximum(x, z) * pi" ])
+def test_formula_accepted(prefs, source):
+    field = mw_resistance.FORMULA(source)
+    r = field.get2D_np(np.linspace(-3, 3, 7), np.linspace(0, 1, 7))
+    assert r.shape == (7,) and np.all((r >= 0) & (r <= 1))
+
+@pytest.mark.parametrize("source", [ "radians(x)", "max(x)", "hypot(x, z)", "factorial(x)", "(lambda: 1)()", "[v for v in (x,)][0]",
+                                     "sum(v for v in x)", "1 if x else 0", "x.real", "__import__('os')", "w", "sin(x, z, y)" ])
+def test_formula_rejected(prefs, source):
+    with pytest.raises(ValueError):
+        mw_resistance.FORMULA(source)
+
+#-------------------------------------------------------------------
+
+LO, HI = (-2.0, -1.0, 0.0), (4.0, 3.0, 6.0)
+
+@pytest.fixture
+def baking(prefs, monkeypatch):
+    """ Prefs with the bake enabled and an empty bake cache """
+    monkeypatch.setattr(mw_resistance, "_baked", None)
+    monkeypatch.setattr(mw_resistance, "_baked_key", None)
+    prefs.resist_cfg.bake = "2D"
+    return prefs
+
+def random_pos(n: int, seed = 0) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(LO, HI, size=(n,3))
+
+def test_baked_error(baking):
+    """ The interpolation error of a smooth field shrinks with the grid resolution, exact at the grid nodes """
+    field = mw_resistance.get_formula("0.5 + 0.25 * sin(x) * cos(z)")
+    pos = random_pos(1000)
+    direct = field.get2D_np(pos[:,0], pos[:,2])
+
+    errors = []
+    for res in (16, 64, 256):
+        baking.resist_cfg.bake_res = res
+        baked = mw_resistance.get_baked(field, LO, HI)
+        errors.append(np.abs(baked.sample_np(pos) - direct).max())
+    assert errors[0] > errors[1] > errors[2]
+    assert errors[2] < 1e-4
+
+    nodes = np.array([ LO, HI, (LO[0], 0.0, HI[2]) ])
+    assert np.allclose(baked.sample_np(nodes), field.get2D_np(nodes[:,0], nodes[:,2]))
+
+    # outside the bounds clamped to the border
+    out = np.array([[HI[0] + 10, 0.0, LO[2] - 10]])
+    assert np.allclose(baked.sample_np(out), field.get2D_np(np.array([HI[0]]), np.array([LO[2]])))
+
+def test_baked_3D(baking):
+    baking.resist_cfg.bake = "3D"
+    baking.resist_cfg.bake_res = 64
+    field = mw_resistance.get_formula("0.5 + 0.25 * sin(x + y) * cos(z)")
+    pos = random_pos(500, seed=1)
+    baked = mw_resistance.get_baked(field, LO, HI)
+    assert baked.grid.shape == (64, 64, 64)
+    assert np.abs(baked.sample_np(pos) - field.get3D_np(pos[:,0], pos[:,1], pos[:,2])).max() < 5e-3
+
+def test_baked_eval(baking):
+    """ The links evaluation goes through the baked grid only when the bounds are given """
+    pos = random_pos(200, seed=2)
+    field = mw_resistance.field_R_current()
+    direct = field.get2D_np(pos[:,0], pos[:,2])
+    assert np.array_equal(mw_resistance.field_R_eval_np(pos), direct)
+    baked = mw_resistance.field_R_eval_np(pos, LO, HI)
+    assert np.array_equal(baked, mw_resistance.get_baked(field, LO, HI).sample_np(pos))
+    assert not np.array_equal(baked, direct)
+
+def test_baked_invalidation(baking):
+    field = mw_resistance.get_formula("0.5 + 0.25 * sin(x) * cos(z)")
+    baked = mw_resistance.get_baked(field, LO, HI)
+    assert mw_resistance.get_baked(field, LO, HI) is baked
+
+    # res, field, bounds and the in/out cfg rebake
+    baking.resist_cfg.bake_res = 32
+    rebaked = mw_resistance.get_baked(field, LO, HI)
+    assert rebaked is not baked and rebaked.grid.shape == (32, 32)
+
+    other = mw_resistance.get_formula("0.5 + 0.25 * cos(x)")
+    baked = mw_resistance.get_baked(other, LO, HI)
+    assert baked is not rebaked and baked.field is other
+    assert np.allclose(baked.grid[:,0], other.get2D_np(np.linspace(LO[0], HI[0], 32), np.zeros(32)))
+
+    rebaked = mw_resistance.get_baked(other, LO, (5.0, 3.0, 6.0))
+    assert rebaked is not baked
+
+    baking.resist_cfg.out_inv = True
+    inverted = mw_resistance.get_baked(other, LO, (5.0, 3.0, 6.0))
+    assert inverted is not rebaked and np.allclose(inverted.grid, 1 - rebaked.grid)
+
+    baking.resist_cfg.bake = "NONE"
+    assert mw_resistance.get_baked(other, LO, HI) is None
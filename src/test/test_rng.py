@@ -0,0 +1,24 @@
+# Sim seeds and random streams
+#-------------------------------------------------------------------
+
+from types import SimpleNamespace
+
+from addonSim import mw_rng
+
+
+def test_new_seed_width():
+    seeds = [ mw_rng.new_seed() for _ in range(64) ]
+    assert all(0 <= s < 2**63 for s in seeds)
+    assert max(seeds) >= 2**32
+
+def test_cfg_seed():
+    rnd = SimpleNamespace(seed=64, seed_full="")
+    assert mw_rng.get_cfg_seed(rnd) == 64
+    seed = mw_rng.new_seed()
+    mw_rng.set_cfg_seed(rnd, seed)
+    assert rnd.seed < mw_rng.SEED_DISPLAY and mw_rng.get_cfg_seed(rnd) == seed
+    assert mw_rng.SimRNG(mw_rng.get_cfg_seed(rnd)) == mw_rng.SimRNG(seed)
+
+    # editing the displayed seed overrides the full one
+    rnd.seed = (rnd.seed + 1) % mw_rng.SEED_DISPLAY
+    assert mw_rng.get_cfg_seed(rnd) == rnd.seed
@@ -0,0 +1,30 @@
+# Batched sim sampling edge cases
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+pytest.importorskip("mathutils")
+from addonSim.mw_sim_batch import MW_SimBatch
+
+
+@pytest.mark.parametrize("u", [0.0, 0.5, np.nextafter(1.0, 0.0)])
+def test_nextLinks_zero_weights(fract, u):
+    """ Never picks a zero weight candidate, e.g. a draw at the very end of the segment with trailing zeros """
+    links = fract.links
+    batch = MW_SimBatch(links, fract.sim.cfg_frozen, fract.sim)
+    cur = np.arange(links.storage.size, dtype=np.int64)
+    alive = np.arange(cur.size)
+
+    # only the middle candidate of each segment has weight, tiny so the cumsum rounds
+    rnd = np.random.default_rng(0)
+    batch.get_nextProbabilities = lambda cand, flat, cells_state: np.where(flat % 3 == 1, rnd.random(flat.size) * 1e-3 + 1e-9, 0.0)
+    batch.random = lambda particles: np.full(particles.size, u)
+
+    nxt = batch.get_nextLinks(alive, cur, np.asarray(fract.cont.cells_state))
+    offsets, neighs = links.neighs_offsets, links.neighs_ids
+    for c, n in zip(cur.tolist(), nxt.tolist()):
+        seg = np.arange(offsets[c], offsets[c+1])
+        weighted = neighs[seg[seg % 3 == 1]].tolist()
+        if weighted: assert n in weighted
+        else: assert n == -1
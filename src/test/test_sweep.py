@@ -0,0 +1,80 @@
+# Parameter sweeps: variants generation and the results table, run in process
+#-------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from addonSim import mw_sweep
+from addonSim.mw_core import SimSnapshot
+from addonSim.mw_ensemble import run_member
+
+
+def test_grid():
+    variants = mw_sweep.grid({ "water_deg": [0.1, 0.2, 0.3], "dir_entry": [(0,0,-1), (1,0,-1)] })
+    assert len(variants) == 6
+    assert { (v["water_deg"], v["dir_entry"]) for v in variants } == { (w, d) for w in (0.1, 0.2, 0.3) for d in ((0,0,-1), (1,0,-1)) }
+
+def test_latin_hypercube_strata():
+    """ One sample per stratum and param, the choices spread evenly """
+    num = 10
+    choices = [ (0,0,-1), (1,0,-1), (0,1,-1), (1,1,-1), (2,0,-1) ]
+    variants = mw_sweep.latin_hypercube({ "water_deg": (0.0, 0.5), "link_deg": (1.0, 3.0), "dir_entry": choices }, num, seed=3)
+    assert len(variants) == num
+
+    for name, (lo, hi) in (("water_deg", (0.0, 0.5)), ("link_deg", (1.0, 3.0))):
+        values = np.array([ v[name] for v in variants ])
+        assert ((values >= lo) & (values < hi)).all()
+        assert sorted(((values - lo) / (hi - lo) * num).astype(int).tolist()) == list(range(num))
+
+    # 2 variants per choice, also the 2D vectors when listed
+    picked = [ v["dir_entry"] for v in variants ]
+    assert all(picked.count(c) == 2 for c in choices)
+    picked = [ v["dir_next"] for v in mw_sweep.latin_hypercube({ "dir_next": [(0,-1), (1,2)] }, 4) ]
+    assert sorted(picked) == [(0,-1), (0,-1), (1,2), (1,2)]
+
+    assert mw_sweep.latin_hypercube({ "water_deg": (0.0, 0.5) }, num, seed=3) == mw_sweep.latin_hypercube({ "water_deg": (0.0, 0.5) }, num, seed=3)
+
+def test_latin_hypercube_ints():
+    values = [ v["step_maxDepth"] for v in mw_sweep.latin_hypercube({ "step_maxDepth": (0, 100) }, 20) ]
+    assert all(isinstance(x, int) and 0 <= x <= 100 for x in values)
+
+@pytest.mark.parametrize("values", [ (0.0, 0.5, 1.0), ("a", "b"), ((0,0,-1), (1,0,-1)), [], {0.1, 0.2} ])
+def test_latin_hypercube_invalid(values):
+    with pytest.raises(ValueError):
+        mw_sweep.latin_hypercube({ "water_deg": values }, 4)
+
+#-------------------------------------------------------------------
+
+@pytest.fixture
+def snap(fract):
+    return SimSnapshot.from_sim(fract.sim)
+
+def test_unknown_param(snap):
+    with pytest.raises(KeyError, match="water_speed"):
+        mw_sweep.run_sweep(snap, [ { "water_deg": 0.1 }, { "water_speed": 2.0 } ], 10, workers=1)
+
+def test_result_layout(snap, tmp_path):
+    """ Rows in the variants order averaged over the repeats, the same seeds for every variant """
+    variants = mw_sweep.grid({ "link_deg": [0.5, 3.0], "dir_entry": [(1,-0.5,-0.5), (0,0,-1)] })
+    result = mw_sweep.run_sweep(snap, variants, 60, repeats=2, seed=5, batch_size=16, workers=1)
+    assert result.params == ["link_deg", "dir_entry"]
+    assert all(result.table[m].shape == (4,) for m in result.metrics)
+
+    seeds = np.random.SeedSequence(5).spawn(2)
+    for i, v in enumerate(variants):
+        members = [ run_member(snap, s, 60, 16, { **snap.cfg, **v }) for s in seeds ]
+        air = [ m["air"].sum() for m in members ]
+        broken = [ m["broken"].sum() for m in members ]
+        assert result.table["air_cells"][i] == np.mean(air) and result.table_std["air_cells"][i] == np.std(air)
+        assert result.table["broken_links"][i] == np.mean(broken)
+        assert result.get_rows()[i]["link_deg"] == v["link_deg"]
+    assert result.table["broken_links"][2:].sum() > result.table["broken_links"][:2].sum()
+
+    path = tmp_path / "sweep.csv"
+    result.to_csv(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[0] == "link_deg,dir_entry,air_cells,air_cells_std,broken_links,broken_links_std,depth,depth_std,time,time_std"
+    assert len(lines) == 1 + len(variants)
+    cols = lines[4].split(",")
+    assert cols[:2] == ["3.0", "0 0 -1"]
+    assert float(cols[4]) == pytest.approx(result.table["broken_links"][3], rel=1e-5)
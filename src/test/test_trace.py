@@ -0,0 +1,91 @@
+# Trace ring buffers: rows order after wrapping, overwritten candidates and the exported files
+#-------------------------------------------------------------------
+
+import numpy as np
+
+from addonSim.mw_trace import TraceRecorder
+from addonSim.mw_state import SIM_EXIT_FLAG
+
+
+def record(trace: TraceRecorder, steps: int, cands: int = 0):
+    """ One row per step with the link id as the step and cands candidates each """
+    for i in range(steps):
+        trace.next_row(i, -1)
+        trace.link[trace.row] = i
+        trace.water[trace.row] = i / 2
+        if cands: trace.set_candidates(np.arange(cands) + i*10, np.full(cands, 0.5))
+        trace.set_exit_flag(SIM_EXIT_FLAG.NO_WATER)
+
+#-------------------------------------------------------------------
+
+def test_order_wrap():
+    trace = TraceRecorder(capacity=4)
+    assert len(trace) == 0 and not trace.get_order().size
+
+    record(trace, 3)
+    assert len(trace) == 3
+    assert trace.get_columns()["step_id"].tolist() == [0, 1, 2]
+
+    record(trace, 6)
+    assert len(trace) == 4 and trace.written == 9
+    assert trace.get_order().tolist() == [1, 2, 3, 0]
+    cols = trace.get_columns()
+    assert cols["step_id"].tolist() == [2, 3, 4, 5]
+    assert cols["water"].tolist() == [1.0, 1.5, 2.0, 2.5]
+    assert (cols["exit_flag"] == SIM_EXIT_FLAG.NO_WATER).all()
+
+def test_candidates_overwrite():
+    trace = TraceRecorder(capacity=8, capacity_candidates=5)
+    record(trace, 1, cands=3)
+    ids, w = trace.get_candidates(0)
+    assert ids.tolist() == [0, 1, 2] and w.tolist() == [0.5]*3
+
+    # the second row wraps the candidates ring over the first one
+    trace.next_row(1, 0)
+    trace.set_candidates(np.array([7, 8, 9]), np.array([0.1, 0.2, 0.7]))
+    assert trace.get_candidates(0) is None
+    assert trace.get_candidates(1)[0].tolist() == [7, 8, 9]
+
+    # only counted when not stored or too many for the ring
+    trace.next_row(2, 1)
+    trace.set_candidates(np.arange(6), np.ones(6))
+    assert trace.cand_len[trace.row] == 6 and trace.get_candidates(trace.row) is None
+    trace.next_row(3, 2)
+    trace.set_candidates(np.arange(2), np.ones(2), store=False)
+    assert trace.cand_len[trace.row] == 2 and trace.get_candidates(trace.row) is None
+
+def test_to_csv(tmp_path):
+    trace = TraceRecorder(capacity=4)
+    record(trace, 6)
+    path = tmp_path / "trace.csv"
+    trace.to_csv(str(path))
+
+    lines = path.read_text().splitlines()
+    assert lines[0] == ",".join(TraceRecorder.columns)
+    assert len(lines) == 1 + len(trace)
+    row = dict(zip(TraceRecorder.columns, lines[1].split(",")))
+    assert row["step_id"] == "2" and row["depth"] == "-1" and row["link"] == "2"
+    assert row["water"] == "1" and row["water_abs"] == "nan"
+    assert row["exit_flag"] == str(SIM_EXIT_FLAG.NO_WATER)
+
+def test_to_npz(tmp_path):
+    trace = TraceRecorder(capacity=4, capacity_candidates=8)
+    record(trace, 6, cands=2)
+    path = tmp_path / "trace.npz"
+    trace.to_npz(str(path))
+
+    data = np.load(str(path))
+    assert set(data.keys()) == set(TraceRecorder.columns) | {"cands_offsets", "cands_ids", "cands_w"}
+    assert data["step_id"].tolist() == [2, 3, 4, 5]
+
+    # the candidates ring only keeps the last 4 rows of 2, all of them listed
+    assert data["cands_offsets"].tolist() == [0, 2, 4, 6, 8]
+    assert data["cands_ids"].tolist() == [20, 21, 30, 31, 40, 41, 50, 51]
+
+    # rows whose candidates got overwritten have an empty range
+    trace = TraceRecorder(capacity=4, capacity_candidates=4)
+    record(trace, 3, cands=2)
+    trace.to_npz(str(path))
+    data = np.load(str(path))
+    assert data["cands_offsets"].tolist() == [0, 0, 2, 4]
+    assert data["cands_ids"].tolist() == [10, 11, 20, 21]